@@ -0,0 +1,65 @@
+"""Base class for the single-pass accumulators behind the analytics endpoints and rollups."""
+import copy
+
+
+class Accumulator:
+    """
+    Running totals filled one row at a time with add(), shared by StatsAccumulator
+    and TimelineAccumulator.
+
+    Accumulators for disjoint sets of rows can be combined with merge(), and
+    to_state()/from_state() round-trip the totals through plain JSON, so every
+    attribute a subclass sets in __init__ must be JSON-serializable. Extreme games
+    live in self.extremes as name -> [value, reported fields], picked by the max or
+    min in EXTREMES[name][0].
+    """
+
+    EXTREMES = {}  # name -> (max or min, ...)
+
+    def __init__(self):
+        self.total_matches = 0
+        self.extremes = {}
+
+    def add(self, row):
+        raise NotImplementedError
+
+    def add_all(self, rows):
+        for row in rows:
+            self.add(row)
+        return self
+
+    def merge(self, other):
+        """Fold in the extremes of a disjoint set of rows. Ties keep this accumulator's game."""
+        for name, (value, fields) in other.extremes.items():
+            if self._beats(name, value):
+                self.extremes[name] = [value, dict(fields)]
+        return self
+
+    def _beats(self, name, value):
+        """Whether `value` replaces the current extreme `name` (ties keep the current one, like max()/min())."""
+        best = self.extremes.get(name)
+        return best is None or (value > best[0] if self.EXTREMES[name][0] is max else value < best[0])
+
+    def to_state(self):
+        """Plain-JSON snapshot of every running total."""
+        return copy.deepcopy(vars(self))
+
+    @classmethod
+    def from_state(cls, state):
+        acc = cls()
+        for key, value in state.items():
+            if hasattr(acc, key):
+                setattr(acc, key, value)
+        return acc
+
+    def extreme_games(self):
+        return {name: dict(self.extremes[name][1]) for name in self.EXTREMES if name in self.extremes}
+
+
+def bump(counts, key, amount=1):
+    counts[key] = counts.get(key, 0) + amount
+
+
+def merge_counts(into, other):
+    for key, value in other.items():
+        bump(into, key, value)
@@ -1,22 +1,42 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 import requests
 import os
+import sys
 from dotenv import load_dotenv
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
-from time import sleep
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import asyncio
 import aiohttp
-from collections import defaultdict
-from psycopg2.extras import execute_values
+import multiprocessing
+import threading
+import queue
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import psycopg2
 from sqlalchemy.schema import UniqueConstraint
 import boto3
 import json
+import hashlib
 import traceback
 from botocore.exceptions import ClientError
+from riot_client import RiotClient
+from bulk_loader import copy_rows, write_rows_individually
+from stats_accumulator import StatsAccumulator
+from timeline_accumulator import TimelineAccumulator
+from stats_queries import aggregate_player_stats
+from rollups import (
+    TIMELINE_LOCK_SPACE, build_rollup, build_timeline_rollup, lock_players, merge_new_matches,
+    merge_new_summaries, read_rollup, read_timeline_rollup,
+)
+from payload_store import PayloadStore
+from response_cache import ResponseCache
+from timeline_features import process_timeline_payload
+from worker_pool import WorkerPool
+from jobs import FAILED, SUCCEEDED, JobQueue, Progress
+from ttl_cache import MISSING, TTLCache
 
 # Explicitly specify the .env file path to ensure it's loaded correctly
 load_dotenv(dotenv_path=".env")
@@ -28,6 +48,56 @@ CORS(app)
 # Riot API key (Reminder: Store this in a .env file for security!)
 RIOT_API_KEY = os.getenv("RIOT_API_KEY", "RGAPI-ab034026-0b86-4bc1-9d26-90762153f017")
 
+# Shared Riot API client: one pooled session and one rate limit budget for all requests
+riot = RiotClient(
+    RIOT_API_KEY,
+    app_limits=os.getenv("RIOT_APP_RATE_LIMIT", "20:1,100:120"),
+    max_connections=int(os.getenv("RIOT_MAX_CONNECTIONS", "50")),
+    timeout=float(os.getenv("RIOT_REQUEST_TIMEOUT", "30")),
+)
+
+# Number of concurrent workers for match-detail (/get-stats) and timeline (/process-timelines) fetches
+MATCH_DETAIL_WORKERS = int(os.getenv("MATCH_DETAIL_WORKERS", "15"))
+TIMELINE_WORKERS = int(os.getenv("TIMELINE_WORKERS", "10"))
+# Scored timelines stored per write in /process-timelines (each brings ~400 frame and event rows)
+TIMELINE_WRITE_BATCH = int(os.getenv("TIMELINE_WRITE_BATCH", "25"))
+
+# Processes that parse and score timelines off the event loop (0 = one per CPU core)
+TIMELINE_PROCESS_WORKERS = int(os.getenv("TIMELINE_PROCESS_WORKERS", "0")) or os.cpu_count()
+
+# Local copy of raw match/timeline payloads, consulted before any match-v5 request (empty disables)
+PAYLOAD_CACHE_DIR = os.getenv("PAYLOAD_CACHE_DIR", "payload_cache")
+payload_store = PayloadStore(PAYLOAD_CACHE_DIR) if PAYLOAD_CACHE_DIR else None
+
+# Built /get-stats, /get-timeline-stats and /generate-recap bodies, reused until the player's data changes
+# (kept in memory, plus on disk here unless empty)
+RESPONSE_CACHE_DIR = os.getenv("RESPONSE_CACHE_DIR", "response_cache")
+response_cache = ResponseCache(PayloadStore(RESPONSE_CACHE_DIR) if RESPONSE_CACHE_DIR else None)
+
+# Store rows for all ten participants of every fetched match, so later lookups for
+# friends/premades that share those games skip the Riot round trip
+INGEST_ALL_PARTICIPANTS = os.getenv("INGEST_ALL_PARTICIPANTS", "true").lower() == "true"
+
+# Time zone (IANA name) used to bucket matches into months for /get-stats
+STATS_TIMEZONE = os.getenv("STATS_TIMEZONE", "UTC")
+
+# Cells per side of the /get-timeline-stats kill heatmap, and the most matches per page of raw kill positions
+HEATMAP_GRID_SIZE = int(os.getenv("HEATMAP_GRID_SIZE", "64"))
+KILL_POSITIONS_MAX_PAGE_SIZE = 200
+
+# Background job worker threads per process for POST /get-stats and /process-timelines
+# (0 = none here; run `flask --app app run-jobs` in a separate process instead)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+
+# How long a resolved Riot ID -> PUUID / PUUID -> region is trusted (memory and the account
+# table), how long an unknown Riot ID (404) is remembered, and how many entries each in-memory cache holds
+ACCOUNT_CACHE_TTL = int(os.getenv("ACCOUNT_CACHE_TTL", "86400"))
+ACCOUNT_NEGATIVE_TTL = int(os.getenv("ACCOUNT_NEGATIVE_TTL", "300"))
+ACCOUNT_CACHE_SIZE = int(os.getenv("ACCOUNT_CACHE_SIZE", "10000"))
+
+# Seconds a Bedrock recap is reused for identical prompt inputs (new matches drop a player's recaps sooner)
+RECAP_CACHE_TTL = int(os.getenv("RECAP_CACHE_TTL", "604800"))
+
 # AWS Bedrock Model ID
 BEDROCK_MODEL_ID = "anthropic.claude-3-haiku-20240307-v1:0"
 
@@ -41,8 +111,19 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 # Update database configuration to include connection health checks
 app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
     'pool_pre_ping': True,  # Check if connections are alive before using them
-    'pool_recycle': 1800  # Recycle connections every 30 minutes
+    'pool_recycle': 1800,  # Recycle connections every 30 minutes
+    'pool_size': int(os.getenv("DB_POOL_SIZE", "10")),  # Connections kept open between requests
+    'max_overflow': int(os.getenv("DB_MAX_OVERFLOW", "20")),  # Extra connections allowed under burst load
+    'pool_timeout': int(os.getenv("DB_POOL_TIMEOUT", "30"))  # Seconds to wait for a free connection
 }
+if (os.getenv("DATABASE_URL") or "").startswith("postgres"):
+    # TCP keepalives so connections dropped by NATs/load balancers are noticed instead of hanging
+    app.config['SQLALCHEMY_ENGINE_OPTIONS']['connect_args'] = {
+        'keepalives': 1,
+        'keepalives_idle': 30,
+        'keepalives_interval': 10,
+        'keepalives_count': 5
+    }
 
 # Initialize SQLAlchemy and Flask-Migrate
 db = SQLAlchemy(app)
@@ -63,6 +144,7 @@ except Exception as e:
 
 # Updated Match model with analytics-ready schema
 class Match(db.Model):
+    # One row per (match, participant); rows for other participants are stored at ingestion
     id = db.Column(db.String, primary_key=True)
     game_mode = db.Column(db.String, nullable=False)
     duration = db.Column(db.Integer, nullable=False)
@@ -72,7 +154,9 @@ class Match(db.Model):
     # Identity
     role = db.Column(db.String, nullable=False)
     champion = db.Column(db.String, nullable=False)
-    puuid = db.Column(db.String, nullable=False)
+    puuid = db.Column(db.String, primary_key=True)
+    # True when the row came from this player's own match history (drives incremental fetching)
+    tracked = db.Column(db.Boolean, nullable=False, default=True, server_default=db.true())
 
     # Core Combat Stats
     kills = db.Column(db.Integer, nullable=False)
@@ -109,12 +193,17 @@ class Match(db.Model):
     team_gold = db.Column(db.Integer, nullable=False)
     team_vision = db.Column(db.Integer, nullable=False)
 
+    __table_args__ = (
+        # Per-player lookups and "latest tracked match" queries
+        db.Index("ix_match_puuid_timestamp", puuid, timestamp.desc()),
+    )
+
 # New MatchTimelineSummary model for aggregated timeline insights
 class MatchTimelineSummary(db.Model):
     __tablename__ = "match_timeline_summary"
 
     match_id = db.Column(db.String, primary_key=True)
-    puuid = db.Column(db.String, primary_key=True)
+    puuid = db.Column(db.String, primary_key=True, index=True)
 
     early_dominance_score = db.Column(db.Float)
     midgame_swing_score = db.Column(db.Float)
@@ -134,6 +223,123 @@ class MatchTimelineSummary(db.Model):
 
     comeback_type = db.Column(db.String)
     duration = db.Column(db.Integer)
+    updated_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now(), onupdate=db.func.now())
+
+# Per-frame stats for every participant of a processed match
+class MatchTimeline(db.Model):
+    __tablename__ = "match_timeline"
+    __table_args__ = (db.UniqueConstraint("match_id", "puuid", "frame_index", name="uq_match_puuid_frame"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    match_id = db.Column(db.String, nullable=False, index=True)
+    puuid = db.Column(db.String, nullable=False, index=True)
+    frame_index = db.Column(db.Integer, nullable=False)
+    timestamp = db.Column(db.BigInteger, nullable=False)
+
+    gold = db.Column(db.Integer, nullable=False)
+    xp = db.Column(db.Integer, nullable=False)
+    cs = db.Column(db.Integer, nullable=False)
+    jungle_cs = db.Column(db.Integer, nullable=False)
+    level = db.Column(db.Integer, nullable=False)
+    cc_time = db.Column(db.Integer, nullable=False)
+
+    position_x = db.Column(db.Float)
+    position_y = db.Column(db.Float)
+
+    # Difference from the enemy team average in the same frame
+    gold_diff = db.Column(db.Integer, nullable=False)
+    xp_diff = db.Column(db.Integer, nullable=False)
+    cs_diff = db.Column(db.Integer, nullable=False)
+
+# Kills and objectives from a processed match, attributed to the killer
+class MatchEvent(db.Model):
+    __tablename__ = "match_events"
+    __table_args__ = (
+        db.UniqueConstraint("match_id", "puuid", "timestamp", "event_type", name="uq_match_puuid_timestamp_event"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    match_id = db.Column(db.String, nullable=False, index=True)
+    puuid = db.Column(db.String, nullable=False, index=True)
+    timestamp = db.Column(db.BigInteger, nullable=False)
+    event_type = db.Column(db.String, nullable=False)
+
+    killer_champion = db.Column(db.String)
+    victim_champion = db.Column(db.String)
+    assisting_champions = db.Column(db.JSON)
+    objective_type = db.Column(db.String)
+
+    position_x = db.Column(db.Float)
+    position_y = db.Column(db.Float)
+
+# Running /get-stats totals per player, kept current as Match rows are inserted (see rollups.py)
+class PlayerRollup(db.Model):
+    __tablename__ = "player_rollup"
+
+    puuid = db.Column(db.String, primary_key=True)
+    timezone = db.Column(db.String, nullable=False)  # STATS_TIMEZONE the monthly buckets use
+    matches = db.Column(db.Integer, nullable=False)
+    state = db.Column(db.JSON, nullable=False)       # StatsAccumulator.to_state() minus the months
+    updated_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
+
+class PlayerMonthRollup(db.Model):
+    __tablename__ = "player_month_rollup"
+
+    puuid = db.Column(db.String, primary_key=True)
+    month = db.Column(db.String, primary_key=True)
+    sums = db.Column(db.JSON, nullable=False)
+    roles = db.Column(db.JSON, nullable=False)
+    champions = db.Column(db.JSON, nullable=False)
+
+# Running /get-timeline-stats totals per player, kept current by process_timelines
+class TimelineRollup(db.Model):
+    __tablename__ = "timeline_rollup"
+
+    puuid = db.Column(db.String, primary_key=True)
+    matches = db.Column(db.Integer, nullable=False)
+    state = db.Column(db.JSON, nullable=False)  # TimelineAccumulator.to_state()
+    updated_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
+
+# Queued/running/finished background ingest jobs (see jobs.py)
+class IngestJob(db.Model):
+    __tablename__ = "ingest_job"
+    __table_args__ = (db.Index("ix_ingest_job_status_created_at", "status", "created_at"),)
+
+    id = db.Column(db.String, primary_key=True)
+    kind = db.Column(db.String, nullable=False)  # "stats" or "timelines"
+    params = db.Column(db.JSON, nullable=False)
+    status = db.Column(db.String, nullable=False)  # queued, running, succeeded, failed
+    progress = db.Column(db.JSON)
+    result = db.Column(db.JSON)  # Response body the synchronous endpoint would have returned
+    result_status = db.Column(db.Integer)
+    error = db.Column(db.Text)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+
+    created_at = db.Column(db.DateTime, nullable=False)
+    started_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, nullable=False)  # Heartbeat while running
+    finished_at = db.Column(db.DateTime)
+
+# Riot ID -> PUUID and PUUID -> active region lookups, so repeat requests skip account-v1
+class Account(db.Model):
+    __tablename__ = "account"
+
+    puuid = db.Column(db.String, primary_key=True)
+    game_name = db.Column(db.String)
+    tag_line = db.Column(db.String)
+    riot_id = db.Column(db.String, unique=True)  # riot_id_key(game_name, tag_line); NULL once the ID moves on
+    resolved_at = db.Column(db.DateTime)
+    region = db.Column(db.String)
+    region_checked_at = db.Column(db.DateTime)
+
+# Bedrock recaps by digest of the model ID and request, so identical inputs skip the model call
+class StoredRecap(db.Model):
+    __tablename__ = "stored_recap"
+
+    digest = db.Column(db.String, primary_key=True)  # recap_digest(request body)
+    puuid = db.Column(db.String, nullable=False, index=True)
+    recap = db.Column(db.JSON, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
 
 # Add other models as needed
 
@@ -143,30 +349,207 @@ def home():
     """Returns a status message indicating the backend is online."""
     return jsonify({"status": "Rift Rewind Backend Online"})
 
-# Helper to reset database connection
-def reset_db_connection():
-    db.session.remove()
-    db.engine.dispose()
+# Bulk ingest through COPY; see bulk_loader.TABLES for the supported tables
+async def bulk_insert(table, rows, update=False, retries=3, on_written=None):
+    """
+    Write rows into `table` in a single transaction. Existing keys are skipped, or
+    overwritten when `update` is set. If the batch is rejected (e.g. one bad row),
+    rows are retried one at a time so only the offending ones are dropped.
+
+    on_written(cursor, written_rows), if given, runs in the same transaction just
+    before it commits, with the rows that were actually written.
+
+    The write runs on a worker thread so the calling event loop keeps serving;
+    connection failures are retried on a fresh connection up to `retries` times.
+
+    Returns (rows written, [(row, error), ...] for rows that failed).
+    """
+    rows = list(rows)
+    while True:
+        try:
+            return await asyncio.to_thread(write_batch, table, rows, update, on_written)
+        except psycopg2.OperationalError as e:
+            retries -= 1
+            print(f"Database operation failed. Retries left: {retries}. Error: {e}")
+            if retries == 0:
+                raise
+        await asyncio.sleep(2)  # Wait before retrying
+
 
-# New helper function to fetch active region from Riot API
-async def get_active_region(session, puuid):
-    """Fetch the active region for a given PUUID using Riot's region endpoint."""
+def write_batch(table, rows, update=False, on_written=None):
+    """One bulk_insert attempt on a pooled connection; a connection failure discards it and propagates."""
+    returning = on_written is not None
+    conn = db.engine.raw_connection()
     try:
-        region_url = f"https://americas.api.riotgames.com/riot/account/v1/region/by-game/lol/by-puuid/{puuid}"
-        async with session.get(region_url, headers={"X-Riot-Token": RIOT_API_KEY}) as response:
-            if response.status == 200:
-                data = await response.json()
-                region = data.get("region")
-                if region:
-                    print(f"Active region detected for {puuid}: {region}")
-                    return region.upper()
-                return None
-            else:
-                print(f"Failed to fetch active region for {puuid}: status {response.status}")
-                return None
+        try:
+            with conn.cursor() as cursor:
+                written = copy_rows(cursor, table, rows, update=update, returning=returning)
+                if returning:
+                    on_written(cursor, written)
+                    written = len(written)
+            conn.commit()
+            return written, []
+        except psycopg2.OperationalError:
+            raise
+        except psycopg2.Error as e:
+            conn.rollback()
+            print(f"[DB] Batch write to {table} failed ({e}); retrying row by row")
+            with conn.cursor() as cursor:
+                written, failed = write_rows_individually(cursor, table, rows, update=update, returning=returning)
+                if returning:
+                    on_written(cursor, written)
+                    written = len(written)
+            conn.commit()
+            for row, error in failed:
+                print(f"[DB] Skipped {table} row: {str(error).strip()}")
+            return written, failed
+    except psycopg2.OperationalError as e:
+        # Only this connection is suspect: drop it from the pool so the retry gets a fresh one
+        conn.invalidate(e)
+        raise
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+riot_id_cache = TTLCache(ACCOUNT_CACHE_SIZE, ACCOUNT_CACHE_TTL)  # riot_id_key -> puuid, or None for a 404
+region_cache = TTLCache(ACCOUNT_CACHE_SIZE, ACCOUNT_CACHE_TTL)   # puuid -> region, or None if it has none
+
+
+def utc_now():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def riot_id_key(game_name, tag_line):
+    """Riot IDs are case-insensitive, so every spelling of one shares a cache entry."""
+    return f"{game_name}#{tag_line}".strip().lower()
+
+
+def save_account(puuid, **fields):
+    """Upsert the account row for `puuid`. Best effort: a failed write only costs a later lookup."""
+    try:
+        if fields.get("riot_id"):
+            # A Riot ID belongs to one account at a time; release it from whoever had it before
+            Account.query.filter(Account.riot_id == fields["riot_id"], Account.puuid != puuid).update({"riot_id": None})
+        account = db.session.get(Account, puuid) or Account(puuid=puuid)
+        for name, value in fields.items():
+            setattr(account, name, value)
+        db.session.add(account)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Failed to save account {puuid}: {e}")
+
+
+async def resolve_puuid(game_name, tag_line):
+    """
+    Return (status, puuid) for a Riot ID, like the account-v1 by-riot-id call it
+    replaces: checks the in-memory cache, then the account table, then Riot. 404s are
+    remembered for ACCOUNT_NEGATIVE_TTL seconds; other failures aren't cached.
+    """
+    key = riot_id_key(game_name, tag_line)
+    puuid = riot_id_cache.get(key)
+    if puuid is not MISSING:
+        return (200, puuid) if puuid else (404, None)
+
+    account = Account.query.filter_by(riot_id=key).first()
+    if account and account.resolved_at and account.resolved_at > utc_now() - timedelta(seconds=ACCOUNT_CACHE_TTL):
+        riot_id_cache.set(key, account.puuid)
+        return 200, account.puuid
+
+    status, account_data = await riot.get(
+        "americas", f"/riot/account/v1/accounts/by-riot-id/{game_name}/{tag_line}", "account-v1.by-riot-id"
+    )
+    if status == 404:
+        riot_id_cache.set(key, None, ttl=ACCOUNT_NEGATIVE_TTL)
+        return status, None
+    if status != 200:
+        return status, None
+
+    puuid = account_data.get("puuid")
+    if puuid:
+        riot_id_cache.set(key, puuid)
+        save_account(
+            puuid, riot_id=key, resolved_at=utc_now(),
+            game_name=account_data.get("gameName", game_name), tag_line=account_data.get("tagLine", tag_line),
+        )
+    return status, puuid
+
+
+async def get_active_region(puuid):
+    """Return the active region for a PUUID (cached like resolve_puuid), or None."""
+    region = region_cache.get(puuid)
+    if region is not MISSING:
+        return region
+
+    account = db.session.get(Account, puuid)
+    if account and account.region_checked_at and account.region_checked_at > utc_now() - timedelta(seconds=ACCOUNT_CACHE_TTL):
+        region_cache.set(puuid, account.region)
+        return account.region
+
+    region = await fetch_active_region(puuid)
+    if region is not MISSING:
+        region_cache.set(puuid, region)
+        save_account(puuid, region=region, region_checked_at=utc_now())
+        return region
+    return None
+
+
+async def fetch_active_region(puuid):
+    """Fetch the active region for a given PUUID using Riot's region endpoint; MISSING if the lookup failed."""
+    try:
+        status, data = await riot.get(
+            "americas", f"/riot/account/v1/region/by-game/lol/by-puuid/{puuid}", "account-v1.region"
+        )
+        if status == 200:
+            region = data.get("region")
+            if region:
+                print(f"Active region detected for {puuid}: {region}")
+                return region.upper()
+            return None
+        else:
+            print(f"Failed to fetch active region for {puuid}: status {status}")
+            return None if status == 404 else MISSING
     except Exception as e:
         print(f"Error fetching active region for {puuid}: {e}")
-        return None
+        return MISSING
+
+async def resolve_stored_player(params):
+    """
+    Player lookup for the read endpoints, from the database where possible so they
+    keep working while Riot is throttling or down. `params` names the player by puuid,
+    or by gameName and tagLine of an account resolved before (by /get-stats or
+    /process-timelines), however long ago. Riot IDs resolved before the account table
+    existed aren't in it; those are looked up once through resolve_puuid, which stores
+    the answer. Returns ((puuid, game_name, tag_line), None) or (None, (error body, status)).
+    """
+    puuid = params.get("puuid")
+    if puuid:
+        account = db.session.get(Account, puuid)
+        return (puuid, account and account.game_name, account and account.tag_line), None
+
+    game_name = params.get("gameName")
+    tag_line = params.get("tagLine")
+    if not game_name or not tag_line:
+        return None, ({"error": "Missing required parameters: puuid, or gameName and tagLine."}, 400)
+
+    key = riot_id_key(game_name, tag_line)
+    puuid = riot_id_cache.get(key)
+    if puuid is MISSING:
+        account = Account.query.filter_by(riot_id=key).first()
+        if account:
+            return (account.puuid, game_name, tag_line), None
+        try:
+            status, puuid = await resolve_puuid(game_name, tag_line)
+        except aiohttp.ClientError as e:
+            print(f"Failed to resolve {game_name}#{tag_line}: {e}")
+            status = 502
+        if status not in (200, 404):
+            return None, ({"error": "Account not stored and Riot lookup failed."}, 502)
+    if not puuid:
+        return None, ({"error": "Account not found. Run /get-stats first."}, 404)
+    return (puuid, game_name, tag_line), None
 
 # Routing resolver function
 def get_routing_cluster(tag_line: str = None, active_region: str = None) -> str:
@@ -189,1252 +572,825 @@ def get_routing_cluster(tag_line: str = None, active_region: str = None) -> str:
     # Safe fallback
     return "americas"
 
+# Match-v5 payload fetcher backed by the local payload store
+async def fetch_raw_payload(routing, match_id, kind="match"):
+    """Return (status, raw JSON bytes) for a match or its timeline ("timeline"), reading the local payload store before Riot."""
+    if payload_store:
+        raw = await asyncio.to_thread(payload_store.load, kind, match_id)
+        if raw is not None:
+            return 200, raw
+
+    path = f"/lol/match/v5/matches/{match_id}" + ("/timeline" if kind == "timeline" else "")
+    status, raw = await riot.get(routing, path, f"match-v5.{kind}", raw=True)
+    if status != 200:
+        return status, None
+
+    if payload_store:
+        try:
+            await asyncio.to_thread(payload_store.save, kind, match_id, raw)
+        except OSError as e:
+            print(f"[PAYLOAD] Failed to store {kind} payload for {match_id}: {e}")
+    return status, raw
+
+async def fetch_match_payload(routing, match_id, kind="match"):
+    """Same as fetch_raw_payload, with the payload parsed."""
+    status, raw = await fetch_raw_payload(routing, match_id, kind)
+    return status, json.loads(raw) if raw is not None else None
+
+# Process pool for timeline parsing/scoring, created on first use
+_timeline_executor = None
+_timeline_executor_lock = threading.Lock()
+
+def get_timeline_executor():
+    global _timeline_executor
+    with _timeline_executor_lock:
+        if _timeline_executor is None:
+            print(f"[TIMELINE] Starting process pool with {TIMELINE_PROCESS_WORKERS} workers")
+            # By now this process runs the Riot client, job and request threads; forking it could
+            # copy a lock some thread holds, so workers come from a clean forkserver instead
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload(["timeline_features"])
+            _timeline_executor = ProcessPoolExecutor(max_workers=TIMELINE_PROCESS_WORKERS, mp_context=context)
+        return _timeline_executor
+
+def discard_timeline_executor(executor):
+    """Drop a broken process pool so the next call starts a fresh one."""
+    global _timeline_executor
+    with _timeline_executor_lock:
+        if _timeline_executor is executor:
+            _timeline_executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+# Build Match rows from a match-v5 payload
+def build_match_rows(match_id, match_data, puuid, all_participants=True):
+    """
+    Return Match rows for `puuid` and, when all_participants is set, for every other
+    participant too (marked tracked=False). Returns [] if `puuid` is not in the match.
+    """
+    info = match_data.get("info", {})
+    participants = info.get("participants", [])
+    teams = info.get("teams", [])
+
+    if not any(p["puuid"] == puuid for p in participants):
+        return []
+
+    # Compute team totals once per team
+    team_totals = {}
+    for p in participants:
+        totals = team_totals.setdefault(p["teamId"], {"kills": 0, "damage": 0, "gold": 0, "vision": 0})
+        totals["kills"] += p["kills"]
+        totals["damage"] += p["totalDamageDealtToChampions"]
+        totals["gold"] += p["goldEarned"]
+        totals["vision"] += p["visionScore"]
+
+    rows = []
+    for participant in participants:
+        if participant["puuid"] != puuid and not all_participants:
+            continue
+
+        team_id = participant["teamId"]
+        totals = team_totals[team_id]
+
+        # Extract objective stats
+        team_objectives = next((t for t in teams if t["teamId"] == team_id), {}).get("objectives", {})
+        dragons = team_objectives.get("dragon", {}).get("kills", 0)
+        barons = team_objectives.get("baron", {}).get("kills", 0)
+        heralds = team_objectives.get("riftHerald", {}).get("kills", 0)
+        towers = team_objectives.get("tower", {}).get("kills", 0)
+        inhibitors = team_objectives.get("inhibitor", {}).get("kills", 0)
+
+        rows.append(Match(
+            id=match_id,
+            game_mode=info.get("gameMode", "UNKNOWN"),
+            duration=info.get("gameDuration", 0),
+            win=participant.get("win", False),
+            timestamp=info.get("gameStartTimestamp", 0),
+
+            # Identity
+            role=participant.get("teamPosition", "UNKNOWN"),
+            champion=participant.get("championName", "Unknown"),
+            puuid=participant["puuid"],
+            tracked=participant["puuid"] == puuid,
+
+            # Core Combat Stats
+            kills=participant.get("kills", 0),
+            deaths=participant.get("deaths", 0),
+            assists=participant.get("assists", 0),
+            damage=participant.get("totalDamageDealtToChampions", 0),
+            damage_taken=participant.get("totalDamageTaken", 0),
+            time_dead=participant.get("totalTimeSpentDead", 0),
+
+            # Economy
+            gold=participant.get("goldEarned", 0),
+
+            # Farming
+            cs=participant.get("totalMinionsKilled", 0),
+            neutral_cs=participant.get("neutralMinionsKilled", 0),
+            enemy_jungle_cs=participant.get("totalEnemyJungleMinionsKilled", 0),
+            ally_jungle_cs=participant.get("totalAllyJungleMinionsKilled", 0),
+
+            # Vision
+            vision=participant.get("visionScore", 0),
+            wards_placed=participant.get("wardsPlaced", 0),
+            wards_killed=participant.get("wardsKilled", 0),
+
+            # Objectives
+            dragons=dragons,
+            barons=barons,
+            heralds=heralds,
+            towers=towers,
+            inhibitors=inhibitors,
+
+            # Team Totals
+            team_kills=totals["kills"],
+            team_damage=totals["damage"],
+            team_gold=totals["gold"],
+            team_vision=totals["vision"]
+        ))
+    return rows
+
+# Aggregate a player's stored matches for /get-stats and /generate-recap
+def load_player_stats(puuid):
+    """
+    Return a StatsAccumulator over every Match row for `puuid`. On PostgreSQL this is
+    the player's rollup, built with grouped SQL on first read and kept current by
+    get_stats' inserts; other databases stream the rows through Python.
+    """
+    if db.engine.dialect.name != "postgresql":
+        return StatsAccumulator(timezone=STATS_TIMEZONE).add_all(Match.query.filter_by(puuid=puuid).yield_per(1000))
+
+    with db.session.connection().connection.cursor() as cursor:
+        stats = read_rollup(cursor, puuid, STATS_TIMEZONE)
+        if stats is None:
+            lock_players(cursor, [puuid])
+            stats = read_rollup(cursor, puuid, STATS_TIMEZONE)  # built while we waited for the lock
+            if stats is None:
+                print(f"[ROLLUP] Building stats rollup for {puuid}")
+                stats = aggregate_player_stats(db.session, puuid, STATS_TIMEZONE)
+                build_rollup(cursor, puuid, stats)
+    db.session.commit()
+    return stats
+
+
+def after_match_insert(cursor, matches):
+    """bulk_insert hook for new Match rows: update the rollups and drop recaps of the old data."""
+    merge_into_rollups(cursor, matches)
+    drop_stored_recaps(cursor, matches)
+
+
+def merge_into_rollups(cursor, matches):
+    """bulk_insert hook: add newly inserted Match rows to their players' rollups."""
+    updated = merge_new_matches(cursor, matches, STATS_TIMEZONE)
+    if updated:
+        print(f"[ROLLUP] Updated {updated} player rollups")
+
+
+# Aggregate a player's timeline summaries for /get-timeline-stats and /generate-recap
+def load_timeline_stats(puuid):
+    """
+    Return a TimelineAccumulator over every MatchTimelineSummary row for `puuid`. On
+    PostgreSQL this is the player's timeline rollup, built on first read and kept
+    current by process_timelines; other databases stream the rows through Python.
+    """
+    if db.engine.dialect.name != "postgresql":
+        return TimelineAccumulator(HEATMAP_GRID_SIZE).add_all(
+            MatchTimelineSummary.query.filter_by(puuid=puuid).yield_per(1000)
+        )
+
+    with db.session.connection().connection.cursor() as cursor:
+        timeline = read_timeline_rollup(cursor, puuid, HEATMAP_GRID_SIZE)
+        if timeline is None:
+            lock_players(cursor, [puuid], TIMELINE_LOCK_SPACE)
+            timeline = read_timeline_rollup(cursor, puuid, HEATMAP_GRID_SIZE)  # built while we waited for the lock
+            if timeline is None:
+                print(f"[ROLLUP] Building timeline rollup for {puuid}")
+                timeline = build_timeline_rollup(cursor, puuid, HEATMAP_GRID_SIZE)
+    db.session.commit()
+    return timeline
+
+
+def merge_into_timeline_rollups(cursor, summaries):
+    """bulk_insert hook: add written timeline summaries to their players' timeline rollups."""
+    updated = merge_new_summaries(cursor, summaries, HEATMAP_GRID_SIZE)
+    if updated:
+        print(f"[ROLLUP] Updated {updated} timeline rollups")
+
+async def write_timeline_results(results):
+    """
+    Store process_timeline_payload results: summaries (upserted and folded into the
+    timeline rollups), frames and events, all in one transaction, so a failed write
+    leaves none of them behind. Frames/events are shared by every tracked player in a
+    match, so existing ones are kept. Returns bulk_insert's result for the summaries.
+    """
+    frames = [row for result in results for row in result["frames"]]
+    events = [row for result in results for row in result["events"]]
+
+    def write_rows(cursor, summaries):
+        merge_into_timeline_rollups(cursor, summaries)
+        copy_rows(cursor, "match_timeline", frames)
+        copy_rows(cursor, "match_events", events)
+
+    return await bulk_insert(
+        "match_timeline_summary", [result["summary"] for result in results], update=True, on_written=write_rows
+    )
+
+
+def data_version(puuid):
+    """
+    Version of everything the analytics endpoints report for `puuid`: changes whenever
+    a Match or timeline summary row of theirs is written, or the bucketing settings
+    change. Once a player has rollups this is two primary-key reads, since every write
+    that changes their data bumps the rollup's matches/updated_at; before that it
+    falls back to aggregating their rows (summary upserts bump the row's updated_at).
+    """
+    stats = db.session.query(PlayerRollup.matches, PlayerRollup.updated_at).filter_by(puuid=puuid).first()
+    if stats is None:
+        stats = db.session.query(db.func.count(), db.func.max(Match.timestamp)).filter(Match.puuid == puuid).one()
+    timeline = db.session.query(TimelineRollup.matches, TimelineRollup.updated_at).filter_by(puuid=puuid).first()
+    if timeline is None:
+        timeline = db.session.query(db.func.count(), db.func.max(MatchTimelineSummary.updated_at)).filter(
+            MatchTimelineSummary.puuid == puuid
+        ).one()
+    return [list(stats), list(timeline), STATS_TIMEZONE, HEATMAP_GRID_SIZE]
+
+
+def cached_insights(endpoint, key, puuid, build):
+    """
+    Return build()'s (body, status) for `key`, or the body stored for the player's
+    current data version if there is one. 200 bodies are stored.
+    """
+    etag = ResponseCache.etag(endpoint, key, data_version(puuid))
+    body = response_cache.get(endpoint, key, etag)
+    if body is not None:
+        return body, 200
+    body, status = build()
+    if status == 200:
+        response_cache.put(endpoint, key, etag, body)
+    return body, status
+
+
+def cached_response(endpoint, key, puuid, build, store_if=lambda body: True):
+    """
+    Answer a read endpoint through the response cache with an ETag for the player's
+    current data version: 304 if the client already has the stored body, else that
+    body, else build()'s (response, status), stored if it is a 200 and passes
+    store_if. Only stored bodies carry the ETag, so one that store_if rejected is
+    rebuilt on the next request instead of being revalidated.
+    """
+    etag = ResponseCache.etag(endpoint, key, data_version(puuid))
+    body = response_cache.get(endpoint, key, etag)
+    if body is None:
+        response, status = build()
+        if status != 200:
+            return response, status
+        body = response.get_json()
+        if not store_if(body):
+            return response, status
+        response_cache.put(endpoint, key, etag, body)
+    elif etag in request.if_none_match:
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    response = jsonify(body)
+    response.set_etag(etag)
+    return response
+
 # Updated `/get-stats` endpoint to use dynamic routing
-@app.route("/get-stats", methods=["GET"])
+@app.route("/get-stats", methods=["GET", "POST"])
 async def get_stats():
-    """Fetches stats for the last year, updates the database incrementally, and generates insights."""
-    game_name = request.args.get("gameName")
-    tag_line = request.args.get("tagLine")
+    """
+    Fetches stats for the last year, updates the database incrementally, and generates insights.
+
+    POST queues the same work as a background job and answers 202 with its ID (see /jobs/<id>).
+    """
+    params = request.get_json(silent=True) or request.args
+    game_name = params.get("gameName")
+    tag_line = params.get("tagLine")
 
     if not game_name or not tag_line:
         return jsonify({"error": "Missing required parameters: gameName and tagLine."}), 400
 
+    if request.method == "POST":
+        return queued_job_response("stats", {"game_name": game_name, "tag_line": tag_line})
+    body, status = await run_stats_ingest(game_name, tag_line)
+    response = jsonify(body)
+    if status == 200:
+        # The ingestion block differs on every run; the ETag covers the insights only
+        insights = {key: value for key, value in body.items() if key != "ingestion"}
+        response.set_etag(hashlib.sha1(json.dumps(insights, sort_keys=True).encode()).hexdigest())
+        return response.make_conditional(request)
+    return response, status
+
+
+async def run_stats_ingest(game_name, tag_line, progress=None):
+    """The /get-stats pipeline; returns (response body, HTTP status). Reports progress to `progress`."""
+    progress = progress or Progress()
     try:
-        async with aiohttp.ClientSession() as session:
-            # Step 1: Get PUUID using Riot Account-V1 API
-            account_url = f"https://americas.api.riotgames.com/riot/account/v1/accounts/by-riot-id/{game_name}/{tag_line}"
-            async with session.get(account_url, headers={"X-Riot-Token": RIOT_API_KEY}) as account_response:
-                if account_response.status == 403:
-                    return jsonify({"error": "Invalid or expired API key."}), 403
-                elif account_response.status == 404:
-                    return jsonify({"error": "Account not found."}), 404
-                elif account_response.status != 200:
-                    return jsonify({"error": "Failed to fetch account data."}), account_response.status
-
-                account_data = await account_response.json()
-                puuid = account_data.get("puuid")
-
-                if not puuid:
-                    return jsonify({"error": "PUUID not found in account data."}), 500
-
-            # Get active region from Riot API
-            active_region = await get_active_region(session, puuid)
-            routing = get_routing_cluster(tag_line=tag_line, active_region=active_region)
-
-            # Step 2: Determine the start time for fetching matches
-            last_match = Match.query.filter_by(puuid=puuid).order_by(Match.timestamp.desc()).first()
-            start_time = (
-                int(last_match.timestamp / 1000)
-                if last_match
-                else int((datetime.now() - timedelta(days=365)).timestamp())
+        # Step 1: Get PUUID using Riot Account-V1 API
+        status, puuid = await resolve_puuid(game_name, tag_line)
+        if status == 403:
+            return {"error": "Invalid or expired API key."}, 403
+        elif status == 404:
+            return {"error": "Account not found."}, 404
+        elif status != 200:
+            return {"error": "Failed to fetch account data."}, status
+
+        if not puuid:
+            return {"error": "PUUID not found in account data."}, 500
+
+        # Get active region from Riot API
+        active_region = await get_active_region(puuid)
+        routing = get_routing_cluster(tag_line=tag_line, active_region=active_region)
+
+        # Step 2: Determine the start time for fetching matches
+        last_match = Match.query.filter_by(puuid=puuid, tracked=True).order_by(Match.timestamp.desc()).first()
+        start_time = (
+            int(last_match.timestamp / 1000)
+            if last_match
+            else int((datetime.now() - timedelta(days=365)).timestamp())
+        )
+
+        # Step 3: Fetch match IDs incrementally
+        matches_path = f"/lol/match/v5/matches/by-puuid/{puuid}/ids"
+
+        async def fetch_match_ids(start):
+            status, batch_ids = await riot.get(
+                routing, matches_path, "match-v5.ids",
+                params={"startTime": start_time, "start": start, "count": 100}
             )
-
-            # Step 3: Fetch match IDs incrementally
-            matches_url = f"https://{routing}.api.riotgames.com/lol/match/v5/matches/by-puuid/{puuid}/ids"
-            match_ids = []
-            start = 0
-
-            async def fetch_match_ids(start):
-                paginated_url = f"{matches_url}?startTime={start_time}&start={start}&count=100"
-                retries = 0
-                while retries < 5:
-                    async with session.get(paginated_url, headers={"X-Riot-Token": RIOT_API_KEY}) as matches_response:
-                        if matches_response.status == 429:
-                            retry_after = int(matches_response.headers.get("Retry-After", 120))
-                            print(f"Rate limit hit. Retrying after {retry_after} seconds.")
-                            await asyncio.sleep(retry_after)
-                            retries += 1
-                            continue
-                        elif matches_response.status in {400, 401, 403, 404, 405, 415, 500, 502, 503, 504}:
-                            print(f"Error fetching match IDs. HTTP Status: {matches_response.status}")
-                            return []
-                        elif matches_response.status != 200:
-                            print(f"Unexpected error. HTTP Status: {matches_response.status}")
-                            return []
-                        return await matches_response.json()
-                    retries += 1
-                    await asyncio.sleep(2 ** retries)  # Exponential backoff
-                print("Max retries reached for fetching match IDs.")
+            if status != 200:
+                print(f"Error fetching match IDs. HTTP Status: {status}")
                 return []
+            return batch_ids
+
+        # Define the detail fetcher
+        details_fetched = 0
+
+        async def fetch_match_details(match_id, puuid):
+            nonlocal details_fetched
+            status, match_data = await fetch_match_payload(routing, match_id)
+            details_fetched += 1
+            progress.emit("match_details", match_details_fetched=details_fetched)
+            if status != 200:
+                print(f"Failed match {match_id}, status {status}")
+                return None
+            rows = build_match_rows(match_id, match_data, puuid, all_participants=INGEST_ALL_PARTICIPANTS)
+            if not rows:
+                print(f"No participant for {puuid} in match {match_id}")
+                return None
+            return rows
 
-            request_count = 0
-            start_time_window = datetime.now()
+        # Step 4: Pipeline ID pages into detail fetching. Each page is filtered against the DB
+        # and queued for the detail workers while the next page is being requested.
+        match_ids = []
+        new_ids = []
+        existing_for_this_user = 0
+        existing_for_other_players = 0
 
+        async def page_producer(pool):
+            nonlocal existing_for_this_user, existing_for_other_players
+            start = 0
+            pages = 0
             while True:
-                # Check rate limits
-                if request_count >= 20:
-                    elapsed_time = (datetime.now() - start_time_window).total_seconds()
-                    if elapsed_time < 1:
-                        await asyncio.sleep(1 - elapsed_time)
-                    request_count = 0
-                    start_time_window = datetime.now()
-
                 batch_ids = await fetch_match_ids(start)
-                request_count += 1
 
                 if not batch_ids:
                     print("No more matches returned by the API.")
                     break
                 match_ids.extend(batch_ids)
-                print(f"Fetched {len(batch_ids)} matches in this batch. Total so far: {len(match_ids)}")
-                await asyncio.sleep(1.2)  # small delay between ID pages
-                start += 100
-
-            # Debugging: Log the total number of match IDs fetched
-            print(f"Total match IDs fetched: {len(match_ids)}")
-
-            # Step 4: Fetch match details for new matches only
-            existing_pairs = set(
-                (m.id, m.puuid)
-                for m in db.session.query(Match.id, Match.puuid)
-                .filter(Match.id.in_(match_ids))
-                .all()
-            )
-            # Debug: distinguish between matches for THIS PLAYER vs OTHER PLAYERS
-            existing_for_this_user = [
-                (mid, p) for (mid, p) in existing_pairs if p == puuid
-            ]
 
-            existing_for_other_players = [
-                (mid, p) for (mid, p) in existing_pairs if p != puuid
-            ]
+                existing_pairs = set(
+                    (m.id, m.puuid)
+                    for m in db.session.query(Match.id, Match.puuid)
+                    .filter(Match.id.in_(batch_ids))
+                    .all()
+                )
+                # Debug: distinguish between matches for THIS PLAYER vs OTHER PLAYERS
+                existing_for_this_user += sum(1 for (mid, p) in existing_pairs if p == puuid)
+                existing_for_other_players += sum(1 for (mid, p) in existing_pairs if p != puuid)
+
+                page_new_ids = [mid for mid in batch_ids if (mid, puuid) not in existing_pairs]
+
+                # Rows stored while ingesting someone else's games are now part of this player's history
+                adopted = Match.query.filter(
+                    Match.puuid == puuid, Match.id.in_(batch_ids), Match.tracked.is_(False)
+                ).update({"tracked": True}, synchronize_session=False)
+                # End the transaction so the pooled connection isn't held while the next page is fetched
+                db.session.commit()
+                if adopted:
+                    print(f"Reused {adopted} stored rows from other players' matches")
+                new_ids.extend(page_new_ids)
+                for mid in page_new_ids:
+                    pool.submit(mid)
+                pages += 1
+                progress.emit("id_page", pages_fetched=pages, match_ids=len(match_ids), new_matches=len(new_ids))
+
+                print(f"Fetched {len(batch_ids)} matches in this batch ({len(page_new_ids)} new). Total so far: {len(match_ids)}")
+                if len(batch_ids) < 100:
+                    break  # Short page means this was the last one
+                start += 100
 
-            print(f"Existing match_id+puuid pairs for THIS player: {len(existing_for_this_user)}")
-            print(f"Existing match_id+puuid pairs for OTHER players: {len(existing_for_other_players)}")
-            print(f"Total overlapping match IDs: {len(existing_pairs)}")
-            new_ids = [
-                mid for mid in match_ids
-                if (mid, puuid) not in existing_pairs
-            ]
-            print(f"New match IDs to fetch details for: {len(new_ids)}")
-
-            # Define the detail fetcher
-            async def fetch_match_details(match_id, session, puuid):
-                match_url = f"https://{routing}.api.riotgames.com/lol/match/v5/matches/{match_id}"
-                retries = 0
-                while retries < 5:
-                    async with session.get(match_url, headers={"X-Riot-Token": RIOT_API_KEY}) as match_response:
-                        if match_response.status == 429:
-                            retry_after = int(match_response.headers.get("Retry-After", 120))
-                            print(f"Rate limit hit for {match_id}, retrying in {retry_after}s")
-                            await asyncio.sleep(retry_after)
-                            retries += 1
-                            continue
-                        if match_response.status != 200:
-                            print(f"Failed match {match_id}, status {match_response.status}")
-                            return None
-                        match_data = await match_response.json()
-                        info = match_data.get("info", {})
-                        participants = info.get("participants", [])
-                        teams = info.get("teams", [])
-
-                        # Locate the participant with the matching PUUID
-                        participant = next((p for p in participants if p["puuid"] == puuid), None)
-                        if not participant:
-                            print(f"No participant for {puuid} in match {match_id}")
-                            return None
-
-                        # Compute team totals
-                        team_id = participant["teamId"]
-                        team_participants = [p for p in participants if p["teamId"] == team_id]
-                        team_kills = sum(p["kills"] for p in team_participants)
-                        team_damage = sum(p["totalDamageDealtToChampions"] for p in team_participants)
-                        team_gold = sum(p["goldEarned"] for p in team_participants)
-                        team_vision = sum(p["visionScore"] for p in team_participants)
-
-                        # Extract objective stats
-                        team_objectives = next((t for t in teams if t["teamId"] == team_id), {}).get("objectives", {})
-                        dragons = team_objectives.get("dragon", {}).get("kills", 0)
-                        barons = team_objectives.get("baron", {}).get("kills", 0)
-                        heralds = team_objectives.get("riftHerald", {}).get("kills", 0)
-                        towers = team_objectives.get("tower", {}).get("kills", 0)
-                        inhibitors = team_objectives.get("inhibitor", {}).get("kills", 0)
-
-                        # Return a Match instance with all fields populated
-                        return Match(
-                            id=match_id,
-                            game_mode=info.get("gameMode", "UNKNOWN"),
-                            duration=info.get("gameDuration", 0),
-                            win=participant.get("win", False),
-                            timestamp=info.get("gameStartTimestamp", 0),
-
-                            # Identity
-                            role=participant.get("teamPosition", "UNKNOWN"),
-                            champion=participant.get("championName", "Unknown"),
-                            puuid=puuid,
-
-                            # Core Combat Stats
-                            kills=participant.get("kills", 0),
-                            deaths=participant.get("deaths", 0),
-                            assists=participant.get("assists", 0),
-                            damage=participant.get("totalDamageDealtToChampions", 0),
-                            damage_taken=participant.get("totalDamageTaken", 0),
-                            time_dead=participant.get("totalTimeSpentDead", 0),
-
-                            # Economy
-                            gold=participant.get("goldEarned", 0),
-
-                            # Farming
-                            cs=participant.get("totalMinionsKilled", 0),
-                            neutral_cs=participant.get("neutralMinionsKilled", 0),
-                            enemy_jungle_cs=participant.get("totalEnemyJungleMinionsKilled", 0),
-                            ally_jungle_cs=participant.get("totalAllyJungleMinionsKilled", 0),
-
-                            # Vision
-                            vision=participant.get("visionScore", 0),
-                            wards_placed=participant.get("wardsPlaced", 0),
-                            wards_killed=participant.get("wardsKilled", 0),
-
-                            # Objectives
-                            dragons=dragons,
-                            barons=barons,
-                            heralds=heralds,
-                            towers=towers,
-                            inhibitors=inhibitors,
-
-                            # Team Totals
-                            team_kills=team_kills,
-                            team_damage=team_damage,
-                            team_gold=team_gold,
-                            team_vision=team_vision
-                        )
-                    retries += 1
-                    await asyncio.sleep(2 ** retries)
-                print(f"Max retries reached for match {match_id}")
-                return None
+        async with WorkerPool(
+            lambda mid: fetch_match_details(mid, puuid), MATCH_DETAIL_WORKERS, label="match details"
+        ) as detail_pool:
+            await page_producer(detail_pool)
 
-            # --- Limit concurrency to avoid 429 ---
-            semaphore = asyncio.Semaphore(15)
+        print(f"Total match IDs fetched: {len(match_ids)}")
+        print(f"Existing match_id+puuid pairs for THIS player: {existing_for_this_user}")
+        print(f"Existing match_id+puuid pairs for OTHER players: {existing_for_other_players}")
+        print(f"New match IDs fetched details for: {len(new_ids)}")
 
-            async def safe_fetch(mid):
-                async with semaphore:
-                    data = await fetch_match_details(mid, session, puuid)
-                    await asyncio.sleep(1.3)
-                    return data
+        new_matches = [m for rows in detail_pool.results for m in rows]
+        print(f"Total new matches processed: {len(detail_pool.results)} ({detail_pool.rate:.2f} matches/sec), "
+              f"{len(new_matches)} participant rows")
 
-            results = []
-            for i in range(0, len(new_ids), 15):
-                batch = new_ids[i:i+15]
-                batch_results = await asyncio.gather(*(safe_fetch(mid) for mid in batch))
-                results.extend(batch_results)
-                print(f"Processed batch {i//15 + 1}/{(len(new_ids)+14)//15}")
+        # Step 5: Bulk-insert new match rows (COPY + ON CONFLICT DO NOTHING), fold them
+        # into the player rollups and drop stale recaps, in one transaction
+        if new_matches:
+            try:
+                inserted, _ = await bulk_insert("match", new_matches, on_written=after_match_insert)
+                progress.emit("rows_inserted", match_rows_stored=inserted)
+                print(f"Successfully inserted {inserted} match rows into the database "
+                      f"({len(new_matches) - inserted} already stored).")
+            except Exception as e:
+                print(f"Error inserting matches into the database: {e}")
+
+        # Step 6: Combine all matches (existing + new) and generate insights, unless they
+        # were already generated for exactly this data
+        body, status = cached_insights(
+            "stats", [puuid, game_name, tag_line], puuid, lambda: stats_insights(puuid, game_name, tag_line)
+        )
+        if "profile" in body:
+            body = {**body, "ingestion": {
+                "new_matches": len(detail_pool.results),
+                "matches_per_sec": round(detail_pool.rate, 2)
+            }}
+        return body, status
 
-            new_matches = [m for m in results if m]
-            print(f"Total new matches processed: {len(new_matches)}")
+    except aiohttp.ClientError as e:
+        return {"error": "An error occurred while communicating with the Riot Games API.", "details": str(e)}, 500
 
-            # Step 5: Insert new matches into the database in smaller batches using execute_values
-            if new_matches:
-                batch_size = 50  # Define the batch size
-                try:
-                    for i in range(0, len(new_matches), batch_size):
-                        batch = new_matches[i:i + batch_size]
-
-                        # Corrected values to match the Match model schema
-                        values = [
-                            (
-                                match.id,
-                                match.game_mode,
-                                match.duration,
-                                match.win,
-                                match.timestamp,
-
-                                # Identity
-                                match.role,
-                                match.champion,
-                                match.puuid,
-
-                                # Core Combat Stats
-                                match.kills,
-                                match.deaths,
-                                match.assists,
-                                match.damage,
-                                match.damage_taken,
-                                match.time_dead,
-
-                                # Economy
-                                match.gold,
-
-                                # Farming
-                                match.cs,
-                                match.neutral_cs,
-                                match.enemy_jungle_cs,
-                                match.ally_jungle_cs,
-
-                                # Vision
-                                match.vision,
-                                match.wards_placed,
-                                match.wards_killed,
-
-                                # Objectives
-                                match.dragons,
-                                match.barons,
-                                match.heralds,
-                                match.towers,
-                                match.inhibitors,
-
-                                # Team Totals
-                                match.team_kills,
-                                match.team_damage,
-                                match.team_gold,
-                                match.team_vision
-                            )
-                            for match in batch
-                        ]
-
-                        retries = 3
-                        while retries > 0:
-                            try:
-                                conn = db.engine.raw_connection()
-                                try:
-                                    with conn.cursor() as cursor:
-                                        execute_values(
-                                            cursor,
-                                            """
-                                            INSERT INTO match (
-                                                id, game_mode, duration, win, timestamp,
-                                                role, champion, puuid,
-                                                kills, deaths, assists, damage, damage_taken, time_dead,
-                                                gold,
-                                                cs, neutral_cs, enemy_jungle_cs, ally_jungle_cs,
-                                                vision, wards_placed, wards_killed,
-                                                dragons, barons, heralds, towers, inhibitors,
-                                                team_kills, team_damage, team_gold, team_vision
-                                            )
-                                            VALUES %s
-                                            """,
-                                            values
-                                        )
-                                    conn.commit()
-                                finally:
-                                    conn.close()
-
-                                print(f"Inserted batch {i // batch_size + 1}/{(len(new_matches) + batch_size - 1) // batch_size}")
-                                break  # Exit retry loop on success
-                            except psycopg2.OperationalError as e:
-                                retries -= 1
-                                print(f"Database operation failed. Retries left: {retries}. Error: {e}")
-                                if retries == 0:
-                                    raise
-                                await asyncio.sleep(2)  # Wait before retrying
-
-                    print(f"Successfully inserted {len(new_matches)} matches into the database.")
-                    reset_db_connection()
+    except Exception as e:
+        return {"error": "An unexpected error occurred.", "details": str(e)}, 500
 
-                except Exception as e:
-                    print(f"Error inserting matches into the database: {e}")
-
-            # Step 6: Combine all matches (existing + new) and generate insights
-            reset_db_connection()
-            all_matches = Match.query.filter_by(puuid=puuid).all()
-            print(f"Total matches in database after insertion: {len(all_matches)}")
-
-            total_matches = len(all_matches)
-            if total_matches == 0:
-                return jsonify({
-                    "gameName": game_name,
-                    "tagLine": tag_line,
-                    "puuid": puuid,
-                    "total_matches": 0,
-                    "message": "No matches found for this player."
-                })
-
-            total_wins = sum(1 for match in all_matches if match.win)
-            total_kills = sum(m.kills for m in all_matches)
-            total_deaths = sum(m.deaths for m in all_matches)
-            total_assists = sum(m.assists for m in all_matches)
-
-            champion_count = defaultdict(int)
-            game_mode_count = defaultdict(int)
-
-            for match in all_matches:
-                champion_count[match.champion] += 1
-                game_mode_count[match.game_mode] += 1
-
-            avg_kills = total_kills / total_matches
-            avg_deaths = total_deaths / total_matches
-            avg_assists = total_assists / total_matches
-            win_rate = (total_wins / total_matches) * 100
-
-            most_played_champion = max(champion_count, key=champion_count.get, default="Unknown")
-
-            # --- Enhanced Analytics ---
-            role_stats = defaultdict(lambda: defaultdict(float))
-            role_count = defaultdict(int)
-
-            total_kp = 0
-            total_damage_share = 0
-            total_gold_share = 0
-            total_vision_share = 0
-            total_cs_per_min = 0
-
-            for match in all_matches:
-                # Kill Participation
-                kp = (match.kills + match.assists) / match.team_kills if match.team_kills > 0 else 0
-                total_kp += kp
-
-                # Damage Share
-                damage_share = match.damage / match.team_damage if match.team_damage > 0 else 0
-                total_damage_share += damage_share
-
-                # Gold Share
-                gold_share = match.gold / match.team_gold if match.team_gold > 0 else 0
-                total_gold_share += gold_share
-
-                # Vision Share
-                vision_share = match.vision / match.team_vision if match.team_vision > 0 else 0
-                total_vision_share += vision_share
-
-                # CS Per Minute
-                cs_per_min = (match.cs + match.neutral_cs) / (match.duration / 60) if match.duration > 0 else 0
-                total_cs_per_min += cs_per_min
-
-                # Role Breakdown
-                role = match.role
-                role_count[role] += 1
-                role_stats[role]['kills'] += match.kills
-                role_stats[role]['deaths'] += match.deaths
-                role_stats[role]['assists'] += match.assists
-                role_stats[role]['damage'] += match.damage
-                role_stats[role]['cs'] += match.cs + match.neutral_cs
-                role_stats[role]['kp'] += kp
-
-            # Compute averages for roles
-            for role, stats in role_stats.items():
-                count = role_count[role]
-                if count > 0:
-                    role_stats[role]['avg_kills'] = round(stats['kills'] / count, 2)
-                    role_stats[role]['avg_deaths'] = round(stats['deaths'] / count, 2)
-                    role_stats[role]['avg_assists'] = round(stats['assists'] / count, 2)
-                    role_stats[role]['avg_damage'] = round(stats['damage'] / count, 2)
-                    role_stats[role]['avg_cs'] = round(stats['cs'] / count, 2)
-                    role_stats[role]['avg_kp'] = round((stats['kp'] / count) * 100, 2)
-
-            # --- Role Impact Stats ---
-            role_impact_stats = defaultdict(lambda: defaultdict(float))
-            role_impact_counts = defaultdict(int)
-
-            for match in all_matches:
-                role = match.role
-
-                # Skip matches where the denominator is 0
-                if match.team_damage > 0:
-                    damage_share = match.damage / match.team_damage
-                    role_impact_stats[role]['damage_share'] += damage_share
-                if match.team_gold > 0:
-                    gold_share = match.gold / match.team_gold
-                    role_impact_stats[role]['gold_share'] += gold_share
-                if match.team_vision > 0:
-                    vision_share = match.vision / match.team_vision
-                    role_impact_stats[role]['vision_share'] += vision_share
-                if match.team_kills > 0:
-                    kp = (match.kills + match.assists) / match.team_kills
-                    role_impact_stats[role]['kp'] += kp
-
-                role_impact_counts[role] += 1
-
-            # Compute averages for role impact stats
-            for role, stats in role_impact_stats.items():
-                count = role_impact_counts[role]
-                if count > 0:
-                    role_impact_stats[role]['avg_damage_share'] = round((stats['damage_share'] / count) * 100, 2)
-                    role_impact_stats[role]['avg_gold_share'] = round((stats['gold_share'] / count) * 100, 2)
-                    role_impact_stats[role]['avg_vision_share'] = round((stats['vision_share'] / count) * 100, 2)
-                    role_impact_stats[role]['avg_kp'] = round((stats['kp'] / count) * 100, 2)
-
-            # Ensure all required variables are defined
-            avg_kills = total_kills / total_matches if total_matches > 0 else 0
-            avg_deaths = total_deaths / total_matches if total_matches > 0 else 0
-            avg_assists = total_assists / total_matches if total_matches > 0 else 0
-            avg_cs_min = round(total_cs_per_min / total_matches, 2) if total_matches > 0 else 0
-            avg_kp = round((total_kp / total_matches) * 100, 2) if total_matches > 0 else 0
-            avg_damage_share = round((total_damage_share / total_matches) * 100, 2) if total_matches > 0 else 0
-            avg_gold_share = round((total_gold_share / total_matches) * 100, 2) if total_matches > 0 else 0
-            avg_vision_share = round((total_vision_share / total_matches) * 100, 2) if total_matches > 0 else 0
-
-            # --- Extreme Game Analytics ---
-            def kda(match):
-                return (match.kills + match.assists) / match.deaths if match.deaths > 0 else match.kills + match.assists
-
-            highest_kill_game = max(all_matches, key=lambda m: m.kills)
-            highest_death_game = max(all_matches, key=lambda m: m.deaths)
-            highest_assist_game = max(all_matches, key=lambda m: m.assists)
-            highest_damage_game = max(all_matches, key=lambda m: m.damage)
-            highest_damage_taken_game = max(all_matches, key=lambda m: m.damage_taken)
-            highest_cs_game = max(all_matches, key=lambda m: m.cs + m.neutral_cs)
-            highest_cs_per_min_game = max(all_matches, key=lambda m: (m.cs + m.neutral_cs) / (m.duration / 60) if m.duration > 0 else 0)
-            best_kda_game = max(all_matches, key=kda)
-            worst_kda_game = min(all_matches, key=kda)
-            fastest_game = min(all_matches, key=lambda m: m.duration)
-            longest_game = max(all_matches, key=lambda m: m.duration)
-
-            extreme_games = {
-                "highest_kill_game": {
-                    "match_id": highest_kill_game.id,
-                    "kills": highest_kill_game.kills,
-                    "champion": highest_kill_game.champion,
-                    "role": highest_kill_game.role
-                },
-                "highest_death_game": {
-                    "match_id": highest_death_game.id,
-                    "deaths": highest_death_game.deaths,
-                    "champion": highest_death_game.champion,
-                    "role": highest_death_game.role
-                },
-                "highest_assist_game": {
-                    "match_id": highest_assist_game.id,
-                    "assists": highest_assist_game.assists,
-                    "champion": highest_assist_game.champion,
-                    "role": highest_assist_game.role
-                },
-                "highest_damage_game": {
-                    "match_id": highest_damage_game.id,
-                    "damage": highest_damage_game.damage,
-                    "champion": highest_damage_game.champion,
-                    "role": highest_damage_game.role
-                },
-                "highest_damage_taken_game": {
-                    "match_id": highest_damage_taken_game.id,
-                    "damage_taken": highest_damage_taken_game.damage_taken,
-                    "champion": highest_damage_taken_game.champion,
-                    "role": highest_damage_taken_game.role
-                },
-                "highest_cs_game": {
-                    "match_id": highest_cs_game.id,
-                    "cs": highest_cs_game.cs + highest_cs_game.neutral_cs,
-                    "champion": highest_cs_game.champion,
-                    "role": highest_cs_game.role
-                },
-                "highest_cs_per_min_game": {
-                    "match_id": highest_cs_per_min_game.id,
-                    "cs_per_min": round((highest_cs_per_min_game.cs + highest_cs_per_min_game.neutral_cs) / (highest_cs_per_min_game.duration / 60), 2) if highest_cs_per_min_game.duration > 0 else 0,
-                    "champion": highest_cs_per_min_game.champion,
-                    "role": highest_cs_per_min_game.role
-                },
-                "best_kda_game": {
-                    "match_id": best_kda_game.id,
-                    "kda": round(kda(best_kda_game), 2),
-                    "kills": best_kda_game.kills,
-                    "deaths": best_kda_game.deaths,
-                    "assists": best_kda_game.assists,
-                    "champion": best_kda_game.champion,
-                    "role": best_kda_game.role
-                },
-                "worst_kda_game": {
-                    "match_id": worst_kda_game.id,
-                    "kda": round(kda(worst_kda_game), 2),
-                    "kills": worst_kda_game.kills,
-                    "deaths": worst_kda_game.deaths,
-                    "assists": worst_kda_game.assists,
-                    "champion": worst_kda_game.champion,
-                    "role": worst_kda_game.role
-                },
-                "fastest_game": {
-                    "match_id": fastest_game.id,
-                    "duration": fastest_game.duration,
-                    "champion": fastest_game.champion,
-                    "role": fastest_game.role
-                },
-                "longest_game": {
-                    "match_id": longest_game.id,
-                    "duration": longest_game.duration,
-                    "champion": longest_game.champion,
-                    "role": longest_game.role
-                }
-            }
 
-            # --- Monthly Visualization Data ---
-            monthly_stats = {}
-            monthly_roles = {}
-            monthly_champions = {}
+def stats_insights(puuid, game_name, tag_line):
+    """Build the /get-stats insights for every stored match of `puuid`; returns (body, status)."""
+    # Aggregates for all analytics sections below
+    stats = load_player_stats(puuid)
+    total_matches = stats.total_matches
+    print(f"Total matches in database after insertion: {total_matches}")
 
-            for match in all_matches:
-                month = datetime.fromtimestamp(match.timestamp / 1000).strftime("%Y-%m")
-                
-                # Initialize month if not exists
-                if month not in monthly_stats:
-                    monthly_stats[month] = {
-                        "matches": 0,
-                        "wins": 0,
-                        "total_kills": 0,
-                        "total_deaths": 0,
-                        "total_assists": 0,
-                        "total_cs": 0,
-                        "total_duration": 0,
-                        "total_kp": 0,
-                        "total_damage_share": 0,
-                        "total_gold_share": 0
-                    }
-                    monthly_roles[month] = defaultdict(int)
-                    monthly_champions[month] = defaultdict(int)
-                
-                # Update monthly stats
-                monthly_stats[month]["matches"] += 1
-                if match.win:
-                    monthly_stats[month]["wins"] += 1
-                monthly_stats[month]["total_kills"] += match.kills
-                monthly_stats[month]["total_deaths"] += match.deaths
-                monthly_stats[month]["total_assists"] += match.assists
-                monthly_stats[month]["total_cs"] += match.cs + match.neutral_cs
-                monthly_stats[month]["total_duration"] += match.duration
-                
-                # KP
-                if match.team_kills > 0:
-                    monthly_stats[month]["total_kp"] += (match.kills + match.assists) / match.team_kills
-                
-                # Damage share
-                if match.team_damage > 0:
-                    monthly_stats[month]["total_damage_share"] += match.damage / match.team_damage
-                
-                # Gold share
-                if match.team_gold > 0:
-                    monthly_stats[month]["total_gold_share"] += match.gold / match.team_gold
-                
-                # Monthly roles
-                monthly_roles[month][match.role] += 1
-                
-                # Monthly champions
-                monthly_champions[month][match.champion] += 1
-
-            # Compute monthly averages
-            for month, stats in monthly_stats.items():
-                matches_count = stats["matches"]
-                if matches_count > 0:
-                    stats["winrate"] = round((stats["wins"] / matches_count) * 100, 2)
-                    stats["avg_kills"] = round(stats["total_kills"] / matches_count, 2)
-                    stats["avg_deaths"] = round(stats["total_deaths"] / matches_count, 2)
-                    stats["avg_assists"] = round(stats["total_assists"] / matches_count, 2)
-                    stats["avg_cs_per_min"] = round((stats["total_cs"] / matches_count) / ((stats["total_duration"] / matches_count) / 60), 2) if stats["total_duration"] > 0 else 0
-                    stats["avg_kp"] = round((stats["total_kp"] / matches_count) * 100, 2)
-                    stats["avg_damage_share"] = round((stats["total_damage_share"] / matches_count) * 100, 2)
-                    stats["avg_gold_share"] = round((stats["total_gold_share"] / matches_count) * 100, 2)
-                    
-                    # Clean up intermediate totals
-                    del stats["total_kills"]
-                    del stats["total_deaths"]
-                    del stats["total_assists"]
-                    del stats["total_cs"]
-                    del stats["total_duration"]
-                    del stats["total_kp"]
-                    del stats["total_damage_share"]
-                    del stats["total_gold_share"]
-
-            # Convert defaultdicts to regular dicts
-            monthly_roles = {month: dict(roles) for month, roles in monthly_roles.items()}
-            monthly_champions = {month: dict(champions) for month, champions in monthly_champions.items()}
-
-            # Final JSON response
-            return jsonify({
-                "profile": {
-                    "gameName": game_name,
-                    "tagLine": tag_line,
-                    "puuid": puuid,
-                    "total_matches": total_matches,
-                    "total_wins": total_wins,
-                    "total_losses": total_matches - total_wins,
-                    "win_rate": f"{win_rate:.2f}"
-                },
-                "core_averages": {
-                    "kills": round(avg_kills, 2),
-                    "deaths": round(avg_deaths, 2),
-                    "assists": round(avg_assists, 2),
-                    "cs_per_min": avg_cs_min
-                },
-                "impact_stats": {
-                    "kill_participation": avg_kp,
-                    "damage_share": avg_damage_share,
-                    "gold_share": avg_gold_share,
-                    "vision_share": avg_vision_share
-                },
-                "role_distribution": dict(role_count),
-                "role_performance": {role: dict(stats) for role, stats in role_stats.items()},
-                "role_impact_stats": {role: dict(stats) for role, stats in role_impact_stats.items()},
-                "most_played_champion": most_played_champion,
-                "game_mode_distribution": dict(game_mode_count),
-                "extreme_games": extreme_games,
-                "monthly_stats": monthly_stats,
-                "monthly_roles": monthly_roles,
-                "monthly_champions": monthly_champions
-            })
-
-    except aiohttp.ClientError as e:
-        return jsonify({"error": "An error occurred while communicating with the Riot Games API.", "details": str(e)}), 500
+    if total_matches == 0:
+        return {
+            "gameName": game_name,
+            "tagLine": tag_line,
+            "puuid": puuid,
+            "total_matches": 0,
+            "message": "No matches found for this player."
+        }, 200
+
+    # Final JSON response
+    return {
+        "profile": {
+            "gameName": game_name,
+            "tagLine": tag_line,
+            "puuid": puuid,
+            "total_matches": total_matches,
+            "total_wins": stats.total_wins,
+            "total_losses": total_matches - stats.total_wins,
+            "win_rate": f"{stats.win_rate:.2f}"
+        },
+        "core_averages": stats.core_averages(),
+        "impact_stats": stats.impact_stats(),
+        "role_distribution": dict(stats.role_count),
+        "role_performance": stats.role_performance(),
+        "role_impact_stats": stats.role_impact_stats(),
+        "most_played_champion": stats.most_played_champion(),
+        "game_mode_distribution": dict(stats.game_mode_count),
+        "extreme_games": stats.extreme_games(),
+        "monthly_stats": stats.monthly_stats(),
+        "monthly_roles": stats.monthly_roles,
+        "monthly_champions": stats.monthly_champions
+    }, 200
 
-    except Exception as e:
-        return jsonify({"error": "An unexpected error occurred.", "details": str(e)}), 500
 
 # ================================================================================================
 # NEW TIMELINE SYSTEM - Single Model, Two Endpoints
 # ================================================================================================
 
 # `/process-timelines` - Fetch and process timeline insights for all existing matches
-@app.route("/process-timelines", methods=["GET"])
+@app.route("/process-timelines", methods=["GET", "POST"])
 async def process_timelines():
-    """Process timeline insights for all existing matches in the database."""
-    game_name = request.args.get("gameName")
-    tag_line = request.args.get("tagLine")
+    """
+    Process timeline insights for all existing matches in the database.
 
-    print(f"[TIMELINE] ==================== STARTING TIMELINE PROCESSING ====================")
-    print(f"[TIMELINE] Fetching account data for gameName={game_name} tagLine={tag_line}")
+    POST queues the same work as a background job and answers 202 with its ID (see /jobs/<id>).
+    """
+    params = request.get_json(silent=True) or request.args
+    game_name = params.get("gameName")
+    tag_line = params.get("tagLine")
+    # reprocess=true rescores every match (e.g. after a scoring change) and overwrites stored summaries
+    reprocess = str(params.get("reprocess", "false")).lower() == "true"
 
     if not game_name or not tag_line:
         print("[TIMELINE] ERROR: Missing required parameters")
         return jsonify({"error": "Missing required parameters: gameName and tagLine."}), 400
 
+    if request.method == "POST":
+        return queued_job_response(
+            "timelines", {"game_name": game_name, "tag_line": tag_line, "reprocess": reprocess}
+        )
+    body, status = await run_timeline_processing(game_name, tag_line, reprocess)
+    return jsonify(body), status
+
+
+async def run_timeline_processing(game_name, tag_line, reprocess=False, progress=None):
+    """The /process-timelines pipeline; returns (response body, HTTP status). Reports progress to `progress`."""
+    progress = progress or Progress()
+    print(f"[TIMELINE] ==================== STARTING TIMELINE PROCESSING ====================")
+    print(f"[TIMELINE] Fetching account data for gameName={game_name} tagLine={tag_line}")
+
     try:
-        async with aiohttp.ClientSession() as session:
-            # Step 1: Get PUUID using Riot Account-V1 API
-            account_url = f"https://americas.api.riotgames.com/riot/account/v1/accounts/by-riot-id/{game_name}/{tag_line}"
-            print(f"[TIMELINE] Account API URL: {account_url}")
+        # Step 1: Get PUUID using Riot Account-V1 API (or the account cache)
+        try:
+            status, puuid = await resolve_puuid(game_name, tag_line)
+            print(f"[TIMELINE] Account resolution status: {status}")
+            if status != 200:
+                print(f"[TIMELINE] ERROR: Failed to fetch account, status={status}")
+                return {"error": "Failed to fetch account"}, status
+            if not puuid:
+                print("[TIMELINE] ERROR: PUUID not found in response")
+                return {"error": "PUUID not found"}, 500
+            print(f"[TIMELINE] PUUID resolved: {puuid}")
+        except Exception as e:
+            print(f"[TIMELINE] ERROR: Exception during account fetch: {e}")
+            raise
+
+        # Get active region and routing
+        print(f"[TIMELINE] Fetching active region for PUUID={puuid}")
+        active_region = await get_active_region(puuid)
+        print(f"[TIMELINE] Active region: {active_region}")
+        
+        routing = get_routing_cluster(tag_line=tag_line, active_region=active_region)
+        print(f"[TIMELINE] Routing cluster: {routing}")
+
+        # Step 2: Get ALL match_ids from database for this PUUID
+        print(f"[TIMELINE] Querying database for matches with puuid={puuid}")
+        matches = Match.query.filter_by(puuid=puuid).all()
+        match_ids = [m.id for m in matches]
+        print(f"[TIMELINE] Total matches in DB: {len(match_ids)}")
+        
+        if not match_ids:
+            print("[TIMELINE] ERROR: No matches found in database")
+            return {"error": "No matches found in database. Run /get-stats first."}, 404
+
+        # Step 3: Check which matches already have timeline summaries
+        print(f"[TIMELINE] Checking existing timeline summaries for puuid={puuid}")
+        existing_summaries = set(
+            (s.match_id, s.puuid) 
+            for s in MatchTimelineSummary.query.filter_by(puuid=puuid).all()
+        )
+        print(f"[TIMELINE] Existing summaries count: {len(existing_summaries)}")
+        
+        if reprocess:
+            new_match_ids = list(match_ids)
+            existing_summaries = set()
+            print(f"[TIMELINE] Reprocessing all {len(new_match_ids)} matches")
+        else:
+            new_match_ids = [mid for mid in match_ids if (mid, puuid) not in existing_summaries]
+        print(f"[TIMELINE] Matches without timeline summaries: {len(new_match_ids)}")
+        print(f"[TIMELINE] Total matches: {len(match_ids)}, Already processed: {len(existing_summaries)}, To process: {len(new_match_ids)}")
+
+        # Step 4: Process each new match
+        processed = 0
+        failed = 0
+        skipped = len(existing_summaries)
+        progress.emit("timelines_queued", matches=len(match_ids), to_process=len(new_match_ids), skipped=skipped)
+
+        match_requests_saved = 0  # Stored match payloads reused instead of a second Riot request
+
+        async def process_single_match(match_id, match_duration, index, total):
+            """Process timeline for a single match and extract insights."""
+            nonlocal match_requests_saved
+            print(f"[TIMELINE] Processing match {match_id} ({index}/{total})")
+            print(f"[TIMELINE] Fetching timeline for {match_id}")
             
             try:
-                async with session.get(account_url, headers={"X-Riot-Token": RIOT_API_KEY}) as account_response:
-                    print(f"[TIMELINE] Account response status: {account_response.status}")
-                    if account_response.status != 200:
-                        print(f"[TIMELINE] ERROR: Failed to fetch account, status={account_response.status}")
-                        return jsonify({"error": "Failed to fetch account"}), account_response.status
-                    account_data = await account_response.json()
-                    puuid = account_data.get("puuid")
-                    if not puuid:
-                        print("[TIMELINE] ERROR: PUUID not found in response")
-                        return jsonify({"error": "PUUID not found"}), 500
-                    print(f"[TIMELINE] PUUID resolved: {puuid}")
-            except Exception as e:
-                print(f"[TIMELINE] ERROR: Exception during account fetch: {e}")
-                raise
-
-            # Get active region and routing
-            print(f"[TIMELINE] Fetching active region for PUUID={puuid}")
-            active_region = await get_active_region(session, puuid)
-            print(f"[TIMELINE] Active region: {active_region}")
-            
-            routing = get_routing_cluster(tag_line=tag_line, active_region=active_region)
-            print(f"[TIMELINE] Routing cluster: {routing}")
-
-            # Step 2: Get ALL match_ids from database for this PUUID
-            print(f"[TIMELINE] Querying database for matches with puuid={puuid}")
-            matches = Match.query.filter_by(puuid=puuid).all()
-            match_ids = [m.id for m in matches]
-            print(f"[TIMELINE] Total matches in DB: {len(match_ids)}")
-            
-            if not match_ids:
-                print("[TIMELINE] ERROR: No matches found in database")
-                return jsonify({"error": "No matches found in database. Run /get-stats first."}), 404
-
-            # Step 3: Check which matches already have timeline summaries
-            print(f"[TIMELINE] Checking existing timeline summaries for puuid={puuid}")
-            existing_summaries = set(
-                (s.match_id, s.puuid) 
-                for s in MatchTimelineSummary.query.filter_by(puuid=puuid).all()
-            )
-            print(f"[TIMELINE] Existing summaries count: {len(existing_summaries)}")
-            
-            new_match_ids = [mid for mid in match_ids if (mid, puuid) not in existing_summaries]
-            print(f"[TIMELINE] Matches without timeline summaries: {len(new_match_ids)}")
-            print(f"[TIMELINE] Total matches: {len(match_ids)}, Already processed: {len(existing_summaries)}, To process: {len(new_match_ids)}")
-
-            # Step 4: Process each new match
-            processed = 0
-            skipped = len(existing_summaries)
-
-            async def process_single_match(match_id, match_duration, index, total):
-                """Process timeline for a single match and extract insights."""
-                print(f"[TIMELINE] Processing match {match_id} ({index}/{total})")
-                timeline_url = f"https://{routing}.api.riotgames.com/lol/match/v5/matches/{match_id}/timeline"
-                print(f"[TIMELINE] Fetching timeline URL: {timeline_url}")
-                retries = 0
+                status, raw_timeline = await fetch_raw_payload(routing, match_id, "timeline")
+                print(f"[TIMELINE] Timeline status {status} for match {match_id}")
+                if status != 200:
+                    print(f"[TIMELINE] ERROR: Failed to fetch timeline for {match_id}: {status}")
+                    return None
                 
-                while retries < 5:
-                    try:
-                        async with session.get(timeline_url, headers={"X-Riot-Token": RIOT_API_KEY}) as response:
-                            print(f"[TIMELINE] Timeline status {response.status} for match {match_id}")
-                            if response.status == 429:
-                                retry_after = int(response.headers.get("Retry-After", 120))
-                                print(f"[TIMELINE] Rate limit hit for {match_id}, retrying in {retry_after}s")
-                                await asyncio.sleep(retry_after)
-                                retries += 1
-                                continue
-                            elif response.status != 200:
-                                print(f"[TIMELINE] ERROR: Failed to fetch timeline for {match_id}: {response.status}")
-                                return None
-                            
-                            timeline = await response.json()
-                            print(f"[TIMELINE] Timeline data received for {match_id}")
-                            
-                            # Extract participant mappings
-                            print(f"[TIMELINE] Extracting participant->puuid map for {match_id}")
-                            info = timeline.get("info", {})
-                            if not info:
-                                print(f"[TIMELINE] ERROR: No 'info' key in timeline for {match_id}")
-                                return None
-                            
-                            participants_meta = info.get("participants", [])
-                            if not participants_meta:
-                                print(f"[TIMELINE] ERROR: No participants metadata for {match_id}")
-                                return None
-                            
-                            pid_to_puuid = {p["participantId"]: p["puuid"] for p in participants_meta}
-                            print(f"[TIMELINE] Built participantId->PUUID map with {len(pid_to_puuid)} entries")
-                            
-                            my_pid = next((pid for pid, p in pid_to_puuid.items() if p == puuid), None)
-                            if not my_pid:
-                                print(f"[TIMELINE] ERROR: Player PUUID {puuid} not found in match {match_id}")
-                                return None
-                            print(f"[TIMELINE] my_pid resolved = {my_pid}")
-
-                            # Fetch match data to get team info
-                            match_data = None
-                            participants = []
-                            my_team_id = None
-                            
-                            match_url = f"https://{routing}.api.riotgames.com/lol/match/v5/matches/{match_id}"
-                            print(f"[TIMELINE] Fetching match data URL: {match_url}")
-                            try:
-                                async with session.get(match_url, headers={"X-Riot-Token": RIOT_API_KEY}) as m_response:
-                                    print(f"[TIMELINE] Match data status: {m_response.status}")
-                                    if m_response.status == 200:
-                                        match_data = await m_response.json()
-                                        participants = match_data.get("info", {}).get("participants", [])
-                                        print(f"[TIMELINE] Got {len(participants)} participants from match data")
-                                        my_team_id = next((p.get("teamId") for p in participants if p.get("puuid") == puuid), None)
-                                        print(f"[TIMELINE] my_team_id resolved = {my_team_id}")
-                                    else:
-                                        print(f"[TIMELINE] WARNING: Failed to fetch match data, status={m_response.status}")
-                            except Exception as e:
-                                print(f"[TIMELINE] ERROR: Exception fetching match data: {e}")
-
-                            # Process frames
-                            frames = info.get("frames", [])
-                            print(f"[TIMELINE] Frames count: {len(frames)}")
-                            
-                            gold_diffs = []
-                            level_6_time = None
-                            level_11_time = None
-                            level_16_time = None
-                            positions = []
-                            
-                            for frame_idx, frame in enumerate(frames):
-                                ts = frame.get("timestamp", 0)
-                                if frame_idx % 50 == 0:
-                                    print(f"[TIMELINE] Frame {frame_idx}: ts={ts}")
-                                
-                                pf_all = frame.get("participantFrames", {})
-                                if not pf_all:
-                                    if frame_idx % 50 == 0:
-                                        print(f"[TIMELINE] WARNING: No participantFrames at frame {frame_idx}")
-                                    continue
-                                
-                                if frame_idx % 50 == 0:
-                                    print(f"[TIMELINE] pf keys: {list(pf_all.keys())}")
-                                
-                                pf = pf_all.get(str(my_pid))
-                                if not pf:
-                                    if frame_idx % 50 == 0:
-                                        print(f"[TIMELINE] WARNING: No data for my_pid={my_pid} at frame {frame_idx}")
-                                    continue
-                                
-                                # Track level milestones
-                                level = pf.get("level", 1)
-                                if level >= 6 and level_6_time is None:
-                                    level_6_time = ts
-                                    print(f"[TIMELINE] MILESTONE: Level 6 reached at {ts}ms")
-                                if level >= 11 and level_11_time is None:
-                                    level_11_time = ts
-                                    print(f"[TIMELINE] MILESTONE: Level 11 reached at {ts}ms")
-                                if level >= 16 and level_16_time is None:
-                                    level_16_time = ts
-                                    print(f"[TIMELINE] MILESTONE: Level 16 reached at {ts}ms")
-                                
-                                # Calculate gold diff
-                                my_gold = int(pf.get("totalGold", 0))
-                                enemy_golds = []
-                                
-                                for pid_str, other_pf in pf_all.items():
-                                    pid_int = int(pid_str)
-                                    if pid_int == my_pid:
-                                        continue
-                                    
-                                    other_puuid = pid_to_puuid.get(pid_int)
-                                    if other_puuid and match_data and my_team_id:
-                                        for p in participants:
-                                            if p.get("puuid") == other_puuid and p.get("teamId") != my_team_id:
-                                                enemy_golds.append(int(other_pf.get("totalGold", 0)))
-                                                break
-                                
-                                if enemy_golds:
-                                    avg_enemy_gold = sum(enemy_golds) // len(enemy_golds)
-                                    gold_diff = my_gold - avg_enemy_gold
-                                    gold_diffs.append((ts, gold_diff))
-                                    if frame_idx % 50 == 0:
-                                        print(f"[TIMELINE] Frame {frame_idx}: my_gold={my_gold} enemy_gold_avg={avg_enemy_gold} diff={gold_diff}")
-                                
-                                # Track position for roam score
-                                pos = pf.get("position", {})
-                                if pos.get("x") is not None and pos.get("y") is not None:
-                                    positions.append((pos.get("x"), pos.get("y")))
-
-                            print(f"[TIMELINE] Completed frame processing. Total gold_diffs: {len(gold_diffs)}, positions: {len(positions)}")
-
-                            # Process events
-                            print(f"[TIMELINE] Processing events for {match_id}")
-                            kill_positions = []
-                            objective_counts = {"dragon": 0, "baron": 0, "herald": 0, "tower": 0, "inhibitor": 0}
-                            
-                            for frame in frames:
-                                for event in frame.get("events", []):
-                                    event_type = event.get("type")
-                                    
-                                    if event_type == "CHAMPION_KILL":
-                                        killer_pid = event.get("killerId")
-                                        if killer_pid == my_pid:
-                                            pos = event.get("position", {})
-                                            if pos.get("x") is not None and pos.get("y") is not None:
-                                                kill_positions.append({"x": pos.get("x"), "y": pos.get("y")})
-                                                print(f"[EVENT] Kill at x={pos.get('x')} y={pos.get('y')}")
-                                    
-                                    elif event_type == "ELITE_MONSTER_KILL" and my_team_id:
-                                        killer_pid = event.get("killerId")
-                                        killer_puuid = pid_to_puuid.get(killer_pid)
-                                        if killer_puuid:
-                                            killer_team = next((p.get("teamId") for p in participants if p.get("puuid") == killer_puuid), None)
-                                            if killer_team == my_team_id:
-                                                monster_type = event.get("monsterType", "").lower()
-                                                if "dragon" in monster_type:
-                                                    objective_counts["dragon"] += 1
-                                                    print(f"[EVENT] Dragon +1 (total: {objective_counts['dragon']})")
-                                                elif "baron" in monster_type:
-                                                    objective_counts["baron"] += 1
-                                                    print(f"[EVENT] Baron +1 (total: {objective_counts['baron']})")
-                                                elif "herald" in monster_type or "riftherald" in monster_type:
-                                                    objective_counts["herald"] += 1
-                                                    print(f"[EVENT] Herald +1 (total: {objective_counts['herald']})")
-                                    
-                                    elif event_type == "BUILDING_KILL" and my_team_id:
-                                        killer_pid = event.get("killerId")
-                                        killer_puuid = pid_to_puuid.get(killer_pid)
-                                        if killer_puuid:
-                                            killer_team = next((p.get("teamId") for p in participants if p.get("puuid") == killer_puuid), None)
-                                            if killer_team == my_team_id:
-                                                building_type = event.get("buildingType", "").lower()
-                                                if "tower" in building_type:
-                                                    objective_counts["tower"] += 1
-                                                    print(f"[EVENT] Tower +1 (total: {objective_counts['tower']})")
-                                                elif "inhibitor" in building_type:
-                                                    objective_counts["inhibitor"] += 1
-                                                    print(f"[EVENT] Inhibitor +1 (total: {objective_counts['inhibitor']})")
-
-                            print(f"[TIMELINE] Event processing complete. Kills: {len(kill_positions)}, Objectives: {objective_counts}")
-
-                            # Calculate insights
-                            if not gold_diffs:
-                                print(f"[TIMELINE] ERROR: No gold diffs calculated for {match_id}, cannot compute insights")
-                                return None
-                            
-                            print(f"[TIMELINE] Computing insights for {match_id}")
-                            
-                            # Early dominance (0-10 min)
-                            early_diffs = [diff for ts, diff in gold_diffs if ts <= 600000]
-                            early_dominance = sum(early_diffs) / len(early_diffs) if early_diffs else 0
-                            print(f"[INSIGHT] early_dominance={early_dominance:.2f} (computed from {len(early_diffs)} samples)")
-                            
-                            # Midgame swing (10-20 min)
-                            mid_diffs = [diff for ts, diff in gold_diffs if 600000 < ts <= 1200000]
-                            midgame_swing = max(mid_diffs) - min(mid_diffs) if len(mid_diffs) > 1 else 0
-                            print(f"[INSIGHT] midgame_swing={midgame_swing:.2f} (computed from {len(mid_diffs)} samples)")
-                            
-                            # Consistency score (variance)
-                            all_diffs = [diff for ts, diff in gold_diffs]
-                            mean_diff = sum(all_diffs) / len(all_diffs) if all_diffs else 0
-                            variance = sum((x - mean_diff) ** 2 for x in all_diffs) / len(all_diffs) if all_diffs else 0
-                            consistency = 100 - min(variance / 100, 100)
-                            print(f"[INSIGHT] consistency={consistency:.2f} (variance={variance:.2f}, mean={mean_diff:.2f})")
-                            
-                            # Biggest spike/throw
-                            deltas = [all_diffs[i] - all_diffs[i-1] for i in range(1, len(all_diffs))]
-                            biggest_spike = max(deltas) if deltas else 0
-                            biggest_throw = min(deltas) if deltas else 0
-                            print(f"[INSIGHT] spike={biggest_spike:.2f} throw={biggest_throw:.2f}")
-                            
-                            # Roam score (position changes)
-                            roam_score = 0
-                            if len(positions) > 1:
-                                significant_moves = 0
-                                for i in range(1, len(positions)):
-                                    x1, y1 = positions[i-1]
-                                    x2, y2 = positions[i]
-                                    dist = ((x2-x1)**2 + (y2-y1)**2) ** 0.5
-                                    if dist > 3000:  # Significant movement
-                                        significant_moves += 1
-                                roam_score = significant_moves / (len(positions) / 10)  # Normalize per 10 frames
-                                print(f"[INSIGHT] roam_score={roam_score:.2f} (from {significant_moves} significant moves in {len(positions)} positions)")
-                            else:
-                                print(f"[INSIGHT] roam_score=0 (insufficient position data)")
-                            
-                            # Comeback type
-                            comeback_type = "neutral"
-                            if early_dominance > 100 and all_diffs[-1] > 500:
-                                comeback_type = "dominated"
-                            elif early_dominance < -100 and all_diffs[-1] > 500:
-                                comeback_type = "comeback"
-                            elif early_dominance > 100 and all_diffs[-1] < -500:
-                                comeback_type = "throw"
-                            elif early_dominance < -100 and all_diffs[-1] < -500:
-                                comeback_type = "fell_behind"
-                            print(f"[INSIGHT] comeback_type={comeback_type}")
-                            
-                            result = {
-                                "match_id": match_id,
-                                "puuid": puuid,
-                                "early_dominance_score": round(early_dominance, 2),
-                                "midgame_swing_score": round(midgame_swing, 2),
-                                "consistency_score": round(consistency, 2),
-                                "level_6_timestamp": level_6_time,
-                                "level_11_timestamp": level_11_time,
-                                "level_16_timestamp": level_16_time,
-                                "biggest_spike": round(biggest_spike, 2),
-                                "biggest_throw": round(biggest_throw, 2),
-                                "roam_score": round(roam_score, 2),
-                                "kill_positions": kill_positions,
-                                "objective_presence": objective_counts,
-                                "comeback_type": comeback_type,
-                                "duration": match_duration
-                            }
-                            print(f"[TIMELINE] Successfully processed match {match_id}")
-                            return result
-                    
-                    except Exception as e:
-                        print(f"[TIMELINE] ERROR: Exception processing match {match_id}: {e}")
-                        import traceback
-                        traceback.print_exc()
-                        return None
-                    
-                    retries += 1
-                    await asyncio.sleep(2 ** retries)
+                print(f"[TIMELINE] Timeline data received for {match_id}")
                 
-                print(f"[TIMELINE] ERROR: Max retries reached for {match_id}")
+                # Teams come from the stored match payload, so no second Riot request
+                raw_match = await asyncio.to_thread(payload_store.load, "match", match_id) if payload_store else None
+                if raw_match is not None:
+                    match_requests_saved += 1
+
+                # Parse and score in a worker process; this event loop only does I/O
+                executor = get_timeline_executor()
+                try:
+                    result = await asyncio.get_running_loop().run_in_executor(
+                        executor, process_timeline_payload,
+                        raw_timeline, puuid, raw_match, match_id, match_duration
+                    )
+                except BrokenProcessPool:
+                    discard_timeline_executor(executor)
+                    raise
+                summary = result["summary"]
+                if summary is None:
+                    return None
+                print(f"[INSIGHT] {match_id}: early_dominance={summary['early_dominance_score']} "
+                      f"midgame_swing={summary['midgame_swing_score']} consistency={summary['consistency_score']} "
+                      f"comeback_type={summary['comeback_type']} frames={len(result['frames'])} "
+                      f"events={len(result['events'])}")
+                print(f"[TIMELINE] Successfully processed match {match_id}")
+                return result
+        
+            except Exception as e:
+                print(f"[TIMELINE] ERROR: Exception processing match {match_id}: {e}")
+                import traceback
+                traceback.print_exc()
                 return None
 
-            # Process matches with rate limiting
-            print(f"[TIMELINE] Starting batch processing with semaphore(10)")
-            semaphore = asyncio.Semaphore(10)
-            match_dict = {m.id: m.duration for m in matches if m.id in new_match_ids}
-            print(f"[TIMELINE] Built match_dict with {len(match_dict)} entries")
-            
-            match_counter = 0
-            
-            async def safe_process(mid):
-                nonlocal match_counter
-                match_counter += 1
-                async with semaphore:
-                    result = await process_single_match(mid, match_dict[mid], match_counter, len(new_match_ids))
-                    await asyncio.sleep(1.5)
-                    return result
-
-            results = []
-            heartbeat_counter = 0
-            for i in range(0, len(new_match_ids), 10):
-                batch = new_match_ids[i:i+10]
-                print(f"[TIMELINE] ===== Batch {i//10 + 1}/{(len(new_match_ids)+9)//10} starting =====")
-                batch_results = await asyncio.gather(*(safe_process(mid) for mid in batch))
-                successful = [r for r in batch_results if r]
-                results.extend(successful)
-                heartbeat_counter += len(batch)
-                if heartbeat_counter % 10 == 0 or (i + 10) >= len(new_match_ids):
-                    print(f"[HEARTBEAT] Processed {heartbeat_counter}/{len(new_match_ids)} timeline summaries... (results so far: {len(results)})")
-                print(f"[TIMELINE] Batch {i//10 + 1} complete. Successful: {len(successful)}/{len(batch)}")
-
-            print(f"[TIMELINE] All batches complete. Total results: {len(results)}")
-
-            # Step 5: Insert into database
-            if results:
-                print(f"[DB] Inserting {len(results)} timeline summaries into database")
+        # Process matches on a bounded worker pool (pacing comes from the shared Riot rate limiter)
+        print(f"[TIMELINE] Starting worker pool with {TIMELINE_WORKERS} workers")
+        match_dict = {m.id: m.duration for m in matches if m.id in new_match_ids}
+        print(f"[TIMELINE] Built match_dict with {len(match_dict)} entries")
+        # Return the pooled connection while timelines are fetched; each batch write checks one out again
+        db.session.close()
+        
+        match_counter = 0
+        timelines_done = 0
+        pending = []  # Scored results not yet stored
+        write_lock = asyncio.Lock()
+        write_error = None
+
+        # Step 5: Insert into database, a batch at a time as results arrive
+        async def write_pending(final=False):
+            """Store pending results once a batch has built up (or all of them, at the end)."""
+            nonlocal pending, processed, failed, write_error
+            if not pending or (len(pending) < TIMELINE_WRITE_BATCH and not final):
+                return
+            batch, pending = pending, []
+            async with write_lock:
                 try:
-                    for idx, summary in enumerate(results):
-                        new_summary = MatchTimelineSummary(**summary)
-                        db.session.add(new_summary)
-                        if (idx + 1) % 50 == 0:
-                            print(f"[DB] Added {idx + 1}/{len(results)} to session")
-                    
-                    print(f"[DB] Committing transaction...")
-                    db.session.commit()
-                    processed = len(results)
-                    print(f"[DB] Insert success. Committed {processed} timeline summaries")
+                    written, failed_rows = await write_timeline_results(batch)
                 except Exception as e:
-                    print(f"[DB] ERROR: Failed to insert summaries: {e}")
+                    print(f"[DB] ERROR: Failed to store {len(batch)} timeline results: {e}")
                     import traceback
                     traceback.print_exc()
-                    db.session.rollback()
-                    print(f"[DB] Transaction rolled back")
-                    return jsonify({"error": "Failed to insert timeline summaries", "details": str(e)}), 500
-            else:
-                print(f"[DB] No results to insert")
-
-            print(f"[TIMELINE] Resetting database connection")
-            reset_db_connection()
+                    write_error = e
+                    return
+                processed += written
+                failed += len(failed_rows)
+                print(f"[DB] Stored {written} timeline summaries with their frames and events ({len(failed_rows)} failed)")
+                progress.emit("rows_inserted", summaries_stored=processed, failed=failed)
+
+        async def safe_process(mid):
+            nonlocal match_counter, timelines_done
+            match_counter += 1
+            result = await process_single_match(mid, match_dict[mid], match_counter, len(new_match_ids))
+            timelines_done += 1
+            progress.emit("timeline_scored", timelines_processed=timelines_done)
+            if result is None:
+                return None
+            # Rows are written as batches fill up, so a long backfill never holds them all at once
+            pending.append(result)
+            await write_pending()
+            return mid
+
+        async with WorkerPool(safe_process, TIMELINE_WORKERS, label="timelines", report_every=10) as timeline_pool:
+            for mid in new_match_ids:
+                timeline_pool.submit(mid)
+        await write_pending(final=True)
+
+        print(f"[TIMELINE] All timelines complete. Total results: {len(timeline_pool.results)} ({timeline_pool.rate:.2f} matches/sec)")
+        if payload_store:
+            print(f"[PAYLOAD] Store hits={payload_store.hits} misses={payload_store.misses}")
+        if write_error is not None:
+            return {
+                "error": "Failed to store timeline results",
+                "details": str(write_error),
+                "processed": processed,
+            }, 500
 
-            print(f"[TIMELINE DONE] processed={processed}, skipped={skipped}, total={len(match_ids)}")
-            print(f"[TIMELINE] ==================== TIMELINE PROCESSING COMPLETE ====================")
+        print(f"[TIMELINE DONE] processed={processed}, skipped={skipped}, total={len(match_ids)}")
+        print(f"[TIMELINE] ==================== TIMELINE PROCESSING COMPLETE ====================")
 
-            return jsonify({
-                "processed": processed,
-                "skipped": skipped,
-                "gameName": game_name,
-                "tagLine": tag_line,
-                "puuid": puuid,
-                "message": "Timeline insights processed successfully."
-            }), 200
+        return {
+            "processed": processed,
+            "skipped": skipped,
+            "failed": failed,
+            "gameName": game_name,
+            "tagLine": tag_line,
+            "puuid": puuid,
+            "matches_per_sec": round(timeline_pool.rate, 2),
+            "match_requests_saved": match_requests_saved,
+            "message": "Timeline insights processed successfully."
+        }, 200
 
     except Exception as e:
         print(f"[TIMELINE] FATAL ERROR in process_timelines: {e}")
         import traceback
         traceback.print_exc()
-        return jsonify({"error": str(e)}), 500
+        return {"error": str(e)}, 500
 
 
 # `/get-timeline-stats` - Year-long aggregated timeline insights
 @app.route("/get-timeline-stats", methods=["GET"])
 async def get_timeline_stats():
-    """Get aggregated timeline insights for a player (year-long stats)."""
-    game_name = request.args.get("gameName")
-    tag_line = request.args.get("tagLine")
-
-    if not game_name or not tag_line:
-        return jsonify({"error": "Missing required parameters: gameName and tagLine."}), 400
+    """
+    Get aggregated timeline insights for a player (year-long stats), identified by
+    ?puuid= or ?gameName=&tagLine=. Reads the database only (no Riot calls).
 
+    Raw kill positions are opt-in: ?killPositions=true&page=1&pageSize=50 adds the
+    positions from one page of matches (ordered by match ID) to the heatmap.
+    """
+    include_kill_positions = request.args.get("killPositions", "false").lower() == "true"
     try:
-        async with aiohttp.ClientSession() as session:
-            # Step 1: Get PUUID
-            account_url = f"https://americas.api.riotgames.com/riot/account/v1/accounts/by-riot-id/{game_name}/{tag_line}"
-            async with session.get(account_url, headers={"X-Riot-Token": RIOT_API_KEY}) as account_response:
-                if account_response.status != 200:
-                    return jsonify({"error": "Failed to fetch account"}), account_response.status
-                account_data = await account_response.json()
-                puuid = account_data.get("puuid")
-                if not puuid:
-                    return jsonify({"error": "PUUID not found"}), 500
-
-        # Step 2: Load all timeline summaries for this PUUID
-        rows = MatchTimelineSummary.query.filter_by(puuid=puuid).all()
-        
-        if not rows:
-            return jsonify({"error": "No timeline data found. Run /process-timelines first."}), 404
-
-        total_matches = len(rows)
-
-        # Step 3: Compute averages
-        avg_early_dom = sum(r.early_dominance_score for r in rows if r.early_dominance_score) / total_matches
-        avg_mid_swing = sum(r.midgame_swing_score for r in rows if r.midgame_swing_score) / total_matches
-        avg_consistency = sum(r.consistency_score for r in rows if r.consistency_score) / total_matches
-        avg_roam = sum(r.roam_score for r in rows if r.roam_score) / total_matches
-        avg_spike = sum(r.biggest_spike for r in rows if r.biggest_spike) / total_matches
-        avg_throw = sum(r.biggest_throw for r in rows if r.biggest_throw) / total_matches
-        
-        level_6_times = [r.level_6_timestamp for r in rows if r.level_6_timestamp]
-        level_11_times = [r.level_11_timestamp for r in rows if r.level_11_timestamp]
-        level_16_times = [r.level_16_timestamp for r in rows if r.level_16_timestamp]
-        
-        avg_level6 = sum(level_6_times) / len(level_6_times) if level_6_times else 0
-        avg_level11 = sum(level_11_times) / len(level_11_times) if level_11_times else 0
-        avg_level16 = sum(level_16_times) / len(level_16_times) if level_16_times else 0
-
-        average_insights = {
-            "early_dominance": round(avg_early_dom, 2),
-            "midgame_swing": round(avg_mid_swing, 2),
-            "consistency_score": round(avg_consistency, 2),
-            "roam_score": round(avg_roam, 2),
-            "biggest_spike": round(avg_spike, 2),
-            "biggest_throw": round(avg_throw, 2),
-            "avg_level6_time": round(avg_level6 / 1000, 2) if avg_level6 else 0,  # Convert to seconds
-            "avg_level11_time": round(avg_level11 / 1000, 2) if avg_level11 else 0,
-            "avg_level16_time": round(avg_level16 / 1000, 2) if avg_level16 else 0
-        }
+        page = int(request.args.get("page", "1"))
+        page_size = int(request.args.get("pageSize", "50"))
+    except ValueError:
+        return jsonify({"error": "page and pageSize must be integers."}), 400
+    if page < 1 or not 1 <= page_size <= KILL_POSITIONS_MAX_PAGE_SIZE:
+        return jsonify({"error": f"page must be >= 1 and pageSize between 1 and {KILL_POSITIONS_MAX_PAGE_SIZE}."}), 400
 
-        # Step 4: Playstyle identity
-        early_label = "neutral early"
-        if avg_early_dom > 100:
-            early_label = "strong early"
-        elif avg_early_dom < -100:
-            early_label = "weak early"
-        
-        consistency_label = "moderately consistent"
-        if avg_consistency > 70:
-            consistency_label = "stable"
-        elif avg_consistency < 40:
-            consistency_label = "coinflip"
-        
-        roam_label = "moderate roamer"
-        if avg_roam > 3.5:
-            roam_label = "heavy roamer"
-        elif avg_roam < 1.5:
-            roam_label = "lane anchored"
-        
-        risk_profile = "high impact" if avg_spike > abs(avg_throw) else "high risk"
-
-        playstyle_identity = {
-            "early_game": early_label,
-            "consistency": consistency_label,
-            "roaming": roam_label,
-            "risk_profile": risk_profile
-        }
-
-        # Step 5: Comeback pattern counts
-        comeback_counts = {
-            "comeback_wins": sum(1 for r in rows if r.comeback_type == "comeback"),
-            "throws": sum(1 for r in rows if r.comeback_type == "throw"),
-            "dominant_wins": sum(1 for r in rows if r.comeback_type == "dominated"),
-            "fell_behind_losses": sum(1 for r in rows if r.comeback_type == "fell_behind"),
-            "neutral_games": sum(1 for r in rows if r.comeback_type == "neutral")
-        }
+    try:
+        # Step 1: Get PUUID from the stored account data
+        player, error = await resolve_stored_player(request.args)
+        if error:
+            return jsonify(error[0]), error[1]
+        puuid = player[0]
+
+        # Steps 2-8, unless this request was already answered for the player's current data
+        return cached_response(
+            "timeline-stats", [puuid, [page, page_size] if include_kill_positions else None], puuid,
+            lambda: timeline_stats_response(puuid, include_kill_positions, page, page_size),
+        )
 
-        # Step 6: Heatmap data
-        all_kill_positions = []
-        total_objectives = {"dragon": 0, "baron": 0, "herald": 0, "tower": 0, "inhibitor": 0}
-        
-        for r in rows:
-            if r.kill_positions:
-                all_kill_positions.extend(r.kill_positions)
-            if r.objective_presence:
-                for obj, count in r.objective_presence.items():
-                    if obj in total_objectives:
-                        total_objectives[obj] += count
-
-        heatmap = {
-            "kill_positions": all_kill_positions,
-            "objectives": total_objectives
-        }
+    except Exception as e:
+        print(f"Error in get_timeline_stats: {e}")
+        return jsonify({"error": str(e)}), 500
 
-        # Step 7: Most extreme games
-        max_spike_game = max(rows, key=lambda r: r.biggest_spike if r.biggest_spike else 0)
-        min_throw_game = min(rows, key=lambda r: r.biggest_throw if r.biggest_throw else 0)
 
-        most_extreme_games = {
-            "best_spike_game": {
-                "match_id": max_spike_game.match_id,
-                "spike": max_spike_game.biggest_spike,
-                "early_dominance": max_spike_game.early_dominance_score,
-                "comeback_type": max_spike_game.comeback_type
-            },
-            "worst_throw_game": {
-                "match_id": min_throw_game.match_id,
-                "throw": min_throw_game.biggest_throw,
-                "early_dominance": min_throw_game.early_dominance_score,
-                "comeback_type": min_throw_game.comeback_type
-            }
+def timeline_stats_response(puuid, include_kill_positions, page, page_size):
+    """Build the /get-timeline-stats response for `puuid`; returns (response, status)."""
+    # Step 2: Load the running totals for this PUUID's timeline summaries
+    timeline = load_timeline_stats(puuid)
+
+    if not timeline.total_matches:
+        return jsonify({"error": "No timeline data found. Run /process-timelines first."}), 404
+
+    total_matches = timeline.total_matches
+
+    # Steps 3-5: Averages, playstyle identity and comeback pattern counts
+    average_insights = timeline.average_insights()
+    playstyle_identity = timeline.playstyle_identity()
+    comeback_counts = timeline.comeback_pattern()
+
+    # Step 6: Heatmap data: kills binned on the map grid; raw positions only on request, a page of matches at a time
+    heatmap = {
+        "kills": timeline.kill_heatmap(),
+        "objectives": timeline.objective_totals()
+    }
+    if include_kill_positions:
+        page_rows = (
+            db.session.query(MatchTimelineSummary.match_id, MatchTimelineSummary.kill_positions)
+            .filter_by(puuid=puuid)
+            .order_by(MatchTimelineSummary.match_id)
+            .offset((page - 1) * page_size)
+            .limit(page_size)
+            .all()
+        )
+        heatmap["kill_positions"] = {
+            "page": page,
+            "page_size": page_size,
+            "total_matches": total_matches,
+            "points": [
+                {"match_id": match_id, "x": pos.get("x"), "y": pos.get("y")}
+                for match_id, kill_positions in page_rows
+                for pos in kill_positions or []
+            ]
         }
 
-        # Step 8: Final response
-        return jsonify({
-            "puuid": puuid,
-            "total_matches": total_matches,
-            "average_insights": average_insights,
-            "playstyle_identity": playstyle_identity,
-            "comeback_pattern": comeback_counts,
-            "heatmap": heatmap,
-            "most_extreme_games": most_extreme_games
-        }), 200
+    # Step 7: Most extreme games
+    most_extreme_games = timeline.extreme_games()
 
-    except Exception as e:
-        print(f"Error in get_timeline_stats: {e}")
-        return jsonify({"error": str(e)}), 500
+    # Step 8: Final response
+    return jsonify({
+        "puuid": puuid,
+        "total_matches": total_matches,
+        "average_insights": average_insights,
+        "playstyle_identity": playstyle_identity,
+        "comeback_pattern": comeback_counts,
+        "heatmap": heatmap,
+        "most_extreme_games": most_extreme_games
+    }), 200
 
 
 # ================================================================================================
@@ -1446,6 +1402,7 @@ async def generate_recap():
     """
     Generate an AI-powered year recap using AWS Bedrock (Claude).
     Combines stats and timeline data, then sends to Claude for narrative generation.
+    The player is given as puuid, or gameName and tagLine; their data is read from the database only.
     """
     print("[RECAP] ==================== STARTING AI RECAP GENERATION ====================")
     
@@ -1453,160 +1410,102 @@ async def generate_recap():
         print("[RECAP] ERROR: AWS Bedrock client not initialized")
         return jsonify({"error": "AWS Bedrock not configured"}), 500
     
-    data = request.get_json()
-    game_name = data.get("gameName")
-    tag_line = data.get("tagLine")
-    
-    if not game_name or not tag_line:
-        print("[RECAP] ERROR: Missing required parameters")
-        return jsonify({"error": "Missing required parameters: gameName and tagLine."}), 400
-    
-    print(f"[RECAP] Generating recap for {game_name}#{tag_line}")
+    data = request.get_json() or {}
     
     try:
-        async with aiohttp.ClientSession() as session:
-            # Step 1: Get PUUID
-            print("[RECAP] Fetching account data...")
-            account_url = f"https://americas.api.riotgames.com/riot/account/v1/accounts/by-riot-id/{game_name}/{tag_line}"
-            async with session.get(account_url, headers={"X-Riot-Token": RIOT_API_KEY}) as account_response:
-                if account_response.status != 200:
-                    print(f"[RECAP] ERROR: Failed to fetch account: {account_response.status}")
-                    return jsonify({"error": "Failed to fetch account"}), account_response.status
-                account_data = await account_response.json()
-                puuid = account_data.get("puuid")
-                if not puuid:
-                    print("[RECAP] ERROR: PUUID not found")
-                    return jsonify({"error": "PUUID not found"}), 500
-                print(f"[RECAP] PUUID resolved: {puuid}")
-        
-        # Step 2: Fetch stats data from database
-        print("[RECAP] Querying database for stats...")
-        all_matches = Match.query.filter_by(puuid=puuid).all()
-        
-        if not all_matches:
-            print("[RECAP] ERROR: No matches found")
-            return jsonify({"error": "No matches found. Run /get-stats first."}), 404
-        
-        total_matches = len(all_matches)
-        total_wins = sum(1 for match in all_matches if match.win)
-        total_kills = sum(m.kills for m in all_matches)
-        total_deaths = sum(m.deaths for m in all_matches)
-        total_assists = sum(m.assists for m in all_matches)
-        
-        champion_count = defaultdict(int)
-        role_count = defaultdict(int)
+        # Step 1: Get PUUID from the stored account data
+        player, error = await resolve_stored_player(data)
+        if error:
+            print(f"[RECAP] ERROR: {error[0]['error']}")
+            return jsonify(error[0]), error[1]
+        puuid, game_name, tag_line = player
+        print(f"[RECAP] Generating recap for {game_name}#{tag_line} (PUUID {puuid})")
         
-        for match in all_matches:
-            champion_count[match.champion] += 1
-            role_count[match.role] += 1
-        
-        avg_kills = round(total_kills / total_matches, 2) if total_matches > 0 else 0
-        avg_deaths = round(total_deaths / total_matches, 2) if total_matches > 0 else 0
-        avg_assists = round(total_assists / total_matches, 2) if total_matches > 0 else 0
-        win_rate = f"{(total_wins / total_matches) * 100:.2f}" if total_matches > 0 else "0"
-        most_played_champion = max(champion_count, key=champion_count.get, default="Unknown")
+        # Steps 2-5, unless a recap was already generated for the player's current data
+        return cached_response(
+            "recap", [puuid, game_name, tag_line], puuid,
+            lambda: recap_response(puuid, game_name, tag_line),
+            store_if=lambda body: "error" not in body["recap"],  # Retry unparseable model output
+        )
+    
+    except Exception as e:
+        print(f"[RECAP] FATAL ERROR in generate_recap: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+
+
+def recap_response(puuid, game_name, tag_line):
+    """Build the /generate-recap response for `puuid` (one Bedrock call); returns (response, status)."""
+    # Step 2: Fetch stats data from database
+    print("[RECAP] Querying database for stats...")
+    stats = load_player_stats(puuid)
+    
+    if not stats.total_matches:
+        print("[RECAP] ERROR: No matches found")
+        return jsonify({"error": "No matches found. Run /get-stats first."}), 404
+    
+    total_matches = stats.total_matches
+    total_wins = stats.total_wins
+    core_averages = stats.core_averages()
+    win_rate = f"{stats.win_rate:.2f}"
+    most_played_champion = stats.most_played_champion()
+    
+    stats_json = {
+        "profile": {
+            "gameName": game_name,
+            "tagLine": tag_line,
+            "total_matches": total_matches,
+            "total_wins": total_wins,
+            "win_rate": win_rate
+        },
+        "core_averages": {
+            "kills": core_averages["kills"],
+            "deaths": core_averages["deaths"],
+            "assists": core_averages["assists"]
+        },
+        "most_played_champion": most_played_champion,
+        "role_distribution": dict(stats.role_count)
+    }
+    
+    print(f"[RECAP] Stats compiled: {total_matches} matches, {win_rate}% WR")
+    
+    # Step 3: Fetch timeline stats from database
+    print("[RECAP] Querying database for timeline stats...")
+    timeline = load_timeline_stats(puuid)
+    
+    if not timeline.total_matches:
+        print("[RECAP] WARNING: No timeline data found, proceeding with stats only")
+        cleaned_timeline = {"note": "No timeline data available"}
+    else:
+        total_timeline_matches = timeline.total_matches
+        average_insights = timeline.average_insights()
+        playstyle_identity = timeline.playstyle_identity()
+        comeback_counts = timeline.comeback_pattern()
         
-        stats_json = {
-            "profile": {
-                "gameName": game_name,
-                "tagLine": tag_line,
-                "total_matches": total_matches,
-                "total_wins": total_wins,
-                "win_rate": win_rate
+        # The recap prompt leaves out level timings, risk profile and fell-behind losses
+        cleaned_timeline = {
+            "total_matches": total_timeline_matches,
+            "average_insights": {
+                key: average_insights[key]
+                for key in ("early_dominance", "midgame_swing", "consistency_score",
+                            "roam_score", "biggest_spike", "biggest_throw")
+            },
+            "playstyle_identity": {
+                key: playstyle_identity[key] for key in ("early_game", "consistency", "roaming")
             },
-            "core_averages": {
-                "kills": avg_kills,
-                "deaths": avg_deaths,
-                "assists": avg_assists
+            "comeback_pattern": {
+                key: comeback_counts[key]
+                for key in ("comeback_wins", "throws", "dominant_wins", "neutral_games")
             },
-            "most_played_champion": most_played_champion,
-            "role_distribution": dict(role_count)
+            "objectives": timeline.objective_totals()
         }
         
-        print(f"[RECAP] Stats compiled: {total_matches} matches, {win_rate}% WR")
-        
-        # Step 3: Fetch timeline stats from database
-        print("[RECAP] Querying database for timeline stats...")
-        timeline_rows = MatchTimelineSummary.query.filter_by(puuid=puuid).all()
-        
-        if not timeline_rows:
-            print("[RECAP] WARNING: No timeline data found, proceeding with stats only")
-            cleaned_timeline = {"note": "No timeline data available"}
-        else:
-            # Compute averages
-            total_timeline_matches = len(timeline_rows)
-            avg_early_dom = sum(r.early_dominance_score for r in timeline_rows if r.early_dominance_score) / total_timeline_matches
-            avg_mid_swing = sum(r.midgame_swing_score for r in timeline_rows if r.midgame_swing_score) / total_timeline_matches
-            avg_consistency = sum(r.consistency_score for r in timeline_rows if r.consistency_score) / total_timeline_matches
-            avg_roam = sum(r.roam_score for r in timeline_rows if r.roam_score) / total_timeline_matches
-            avg_spike = sum(r.biggest_spike for r in timeline_rows if r.biggest_spike) / total_timeline_matches
-            avg_throw = sum(r.biggest_throw for r in timeline_rows if r.biggest_throw) / total_timeline_matches
-            
-            # Comeback patterns
-            comeback_counts = {
-                "comeback_wins": sum(1 for r in timeline_rows if r.comeback_type == "comeback"),
-                "throws": sum(1 for r in timeline_rows if r.comeback_type == "throw"),
-                "dominant_wins": sum(1 for r in timeline_rows if r.comeback_type == "dominated"),
-                "neutral_games": sum(1 for r in timeline_rows if r.comeback_type == "neutral")
-            }
-            
-            # Playstyle identity
-            early_label = "neutral early"
-            if avg_early_dom > 100:
-                early_label = "strong early"
-            elif avg_early_dom < -100:
-                early_label = "weak early"
-            
-            consistency_label = "moderately consistent"
-            if avg_consistency > 70:
-                consistency_label = "stable"
-            elif avg_consistency < 40:
-                consistency_label = "coinflip"
-            
-            roam_label = "moderate roamer"
-            if avg_roam > 3.5:
-                roam_label = "heavy roamer"
-            elif avg_roam < 1.5:
-                roam_label = "lane anchored"
-            
-            playstyle_identity = {
-                "early_game": early_label,
-                "consistency": consistency_label,
-                "roaming": roam_label
-            }
-            
-            # Objectives
-            total_objectives = {"dragon": 0, "baron": 0, "herald": 0, "tower": 0, "inhibitor": 0}
-            for r in timeline_rows:
-                if r.objective_presence:
-                    for obj, count in r.objective_presence.items():
-                        if obj in total_objectives:
-                            total_objectives[obj] += count
-            
-            # Clean kill_positions before building cleaned_timeline (OPTION A)
-            for row in timeline_rows:
-                row.kill_positions = []
-            
-            cleaned_timeline = {
-                "total_matches": total_timeline_matches,
-                "average_insights": {
-                    "early_dominance": round(avg_early_dom, 2),
-                    "midgame_swing": round(avg_mid_swing, 2),
-                    "consistency_score": round(avg_consistency, 2),
-                    "roam_score": round(avg_roam, 2),
-                    "biggest_spike": round(avg_spike, 2),
-                    "biggest_throw": round(avg_throw, 2)
-                },
-                "playstyle_identity": playstyle_identity,
-                "comeback_pattern": comeback_counts,
-                "objectives": total_objectives
-            }
-            
-            print(f"[RECAP] Timeline stats compiled: {total_timeline_matches} matches analyzed")
-        
-        # Step 4: Build Claude prompt
-        print("[RECAP] Building Claude prompt...")
-        prompt = f"""
+        print(f"[RECAP] Timeline stats compiled: {total_timeline_matches} matches analyzed")
+    
+    # Step 4: Build Claude prompt
+    print("[RECAP] Building Claude prompt...")
+    prompt = f"""
 You are Rift Rewind AI.
 
 Write the recap DIRECTLY to the player in second person ("you").  
@@ -1635,73 +1534,256 @@ STATS_DATA:
 TIMELINE_DATA (already cleaned):
 {json.dumps(cleaned_timeline, indent=2)}
 """
-        
-        print(f"[RECAP] Prompt length: {len(prompt)} characters")
-        
-        # Step 5: Call AWS Bedrock (Claude)
+    
+    print(f"[RECAP] Prompt length: {len(prompt)} characters")
+    
+    # Step 5: Call AWS Bedrock (Claude), unless these exact inputs were recapped recently
+    request_body = {
+        "anthropic_version": "bedrock-2023-05-31",
+        "max_tokens": 1500,
+        "messages": [
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+    }
+    digest = recap_digest(request_body)
+    recap_json = load_stored_recap(digest)
+    if recap_json is not None:
+        print("[RECAP] Reusing stored recap for identical inputs")
+    else:
         print("[RECAP] Invoking AWS Bedrock Claude model...")
-        
-        request_body = {
-            "anthropic_version": "bedrock-2023-05-31",
-            "max_tokens": 1500,
-            "messages": [
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ]
-        }
-        
         try:
-            response = bedrock.invoke_model(
-                modelId=BEDROCK_MODEL_ID,
-                body=json.dumps(request_body)
-            )
-            
-            response_body = json.loads(response['body'].read())
-            print("[RECAP] Claude response received")
-            
-            # Extract the text content from Claude's response
-            claude_output = response_body.get('content', [{}])[0].get('text', '')
-            
-            print(f"[RECAP] Claude output length: {len(claude_output)} characters")
-            print("[RECAP] ==================== AI RECAP GENERATION COMPLETE ====================")
-            
-            # Try strict JSON parse
-            try:
-                recap_json = json.loads(claude_output)
-            except:
-                import re
-                m = re.search(r"\{.*\}", claude_output, re.DOTALL)
-                if m:
-                    try:
-                        recap_json = json.loads(m.group(0))
-                    except:
-                        recap_json = {"error": "Model returned invalid JSON", "raw": claude_output}
-                else:
-                    recap_json = {"error": "No JSON found", "raw": claude_output}
-            
-            return jsonify({
-                "recap": recap_json,
-                "stats_summary": {
-                    "total_matches": total_matches,
-                    "win_rate": win_rate,
-                    "most_played_champion": most_played_champion
-                }
-            }), 200
-            
+            recap_json = invoke_recap_model(request_body)
         except ClientError as e:
             print(f"[RECAP] ERROR: AWS Bedrock API error: {e}")
             return jsonify({"error": "Failed to generate recap with AWS Bedrock", "details": str(e)}), 500
+        if "error" not in recap_json:
+            store_recap(digest, puuid, recap_json)
     
+    return jsonify({
+        "recap": recap_json,
+        "stats_summary": {
+            "total_matches": total_matches,
+            "win_rate": win_rate,
+            "most_played_champion": most_played_champion
+        }
+    }), 200
+
+
+def invoke_recap_model(request_body):
+    """Send one recap request to Bedrock and parse the JSON recap out of the reply. Raises ClientError."""
+    response = bedrock.invoke_model(
+        modelId=BEDROCK_MODEL_ID,
+        body=json.dumps(request_body)
+    )
+    
+    response_body = json.loads(response['body'].read())
+    print("[RECAP] Claude response received")
+    
+    # Extract the text content from Claude's response
+    claude_output = response_body.get('content', [{}])[0].get('text', '')
+    
+    print(f"[RECAP] Claude output length: {len(claude_output)} characters")
+    print("[RECAP] ==================== AI RECAP GENERATION COMPLETE ====================")
+    
+    # Try strict JSON parse
+    try:
+        recap_json = json.loads(claude_output)
+    except:
+        import re
+        m = re.search(r"\{.*\}", claude_output, re.DOTALL)
+        if m:
+            try:
+                recap_json = json.loads(m.group(0))
+            except:
+                recap_json = {"error": "Model returned invalid JSON", "raw": claude_output}
+        else:
+            recap_json = {"error": "No JSON found", "raw": claude_output}
+    
+    return recap_json
+
+
+def recap_digest(request_body):
+    """sha256 of the model ID and the full request (prompt template, stats and timeline inputs)."""
+    return hashlib.sha256(json.dumps([BEDROCK_MODEL_ID, request_body], sort_keys=True).encode()).hexdigest()
+
+
+def load_stored_recap(digest):
+    """The recap stored for `digest` within the last RECAP_CACHE_TTL seconds, or None."""
+    stored = db.session.get(StoredRecap, digest)
+    if stored is None or stored.created_at <= utc_now() - timedelta(seconds=RECAP_CACHE_TTL):
+        return None
+    return stored.recap
+
+
+def store_recap(digest, puuid, recap):
+    """Save a recap under `digest`, dropping this player's expired ones. Best effort, like save_account."""
+    try:
+        StoredRecap.query.filter(
+            StoredRecap.puuid == puuid, StoredRecap.created_at <= utc_now() - timedelta(seconds=RECAP_CACHE_TTL)
+        ).delete()
+        db.session.merge(StoredRecap(digest=digest, puuid=puuid, recap=recap, created_at=utc_now()))
+        db.session.commit()
     except Exception as e:
-        print(f"[RECAP] FATAL ERROR in generate_recap: {e}")
-        import traceback
-        traceback.print_exc()
-        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+        db.session.rollback()
+        print(f"[RECAP] Failed to store recap for {puuid}: {e}")
+
+
+def drop_stored_recaps(cursor, matches):
+    """Delete the stored recaps of players who just got new Match rows (same transaction)."""
+    cursor.execute("DELETE FROM stored_recap WHERE puuid = ANY(%s)", (list({match.puuid for match in matches}),))
+
+
+# ================================================================================================
+# BACKGROUND JOBS - POST /get-stats and /process-timelines
+# ================================================================================================
+
+def run_job(kind, params, progress):
+    """JobQueue runner: run one ingest pipeline on this worker thread with its own event loop."""
+    with app.app_context():
+        if kind == "stats":
+            pipeline = run_stats_ingest(params["game_name"], params["tag_line"], progress=progress)
+        elif kind == "timelines":
+            pipeline = run_timeline_processing(
+                params["game_name"], params["tag_line"], params.get("reprocess", False), progress=progress
+            )
+        else:
+            raise ValueError(f"Unknown job kind: {kind}")
+        return asyncio.run(pipeline)
+
+
+with app.app_context():
+    job_queue = JobQueue(db.engine, run_job, workers=JOB_WORKERS)
+
+
+# Riot rate limit waits hold up every running job, so they go to every progress stream
+# (at most once a second per routing/method/reason)
+_last_wait_event = {}
+
+
+def publish_rate_limit_wait(routing, method, seconds, reason):
+    key = (routing, method, reason)
+    now = time.monotonic()
+    if now - _last_wait_event.get(key, 0.0) < 1.0:
+        return
+    _last_wait_event[key] = now
+    job_queue.events.broadcast("rate_limit_wait", {
+        "routing": routing, "method": method, "seconds": round(seconds, 2), "reason": reason
+    })
+
+
+riot.add_wait_listener(publish_rate_limit_wait)
+
+
+@app.before_request
+def start_job_workers():
+    """Start this process's job workers with its first request (no-op afterwards)."""
+    job_queue.start()
+
+
+def queued_job_response(kind, params):
+    job_id = job_queue.enqueue(kind, params)
+    print(f"[JOBS] Queued {kind} job {job_id}")
+    return jsonify({
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/jobs/{job_id}"
+    }), 202, {"Location": f"/jobs/{job_id}"}
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    """Status, progress counters and (once finished) the result of a background job."""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found."}), 404
+    return jsonify({
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "progress": job["progress"] or {},
+        "result": job["result"],
+        "result_status": job["result_status"],
+        "error": job["error"],
+        "attempts": job["attempts"],
+        "created_at": job["created_at"].isoformat() + "Z",
+        "started_at": job["started_at"].isoformat() + "Z" if job["started_at"] else None,
+        "finished_at": job["finished_at"].isoformat() + "Z" if job["finished_at"] else None
+    }), 200
+
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.route("/jobs/<job_id>/events", methods=["GET"])
+def stream_job_events(job_id):
+    """
+    Server-Sent Events stream of a job's progress: status, id_page, match_details,
+    rows_inserted, timelines_queued, timeline_scored and rate_limit_wait events as
+    they happen, ending with a done event (fetch /jobs/<id> for the result).
+
+    Jobs run by another process publish nothing here, so while the stream is idle
+    the job row is polled and changed counters are sent as progress events.
+    """
+    subscription = job_queue.events.subscribe(job_id)
+    job = job_queue.get(job_id)
+    if job is None:
+        job_queue.events.unsubscribe(job_id, subscription)
+        return jsonify({"error": "Job not found."}), 404
+
+    def finished(job):
+        return {"status": job["status"], "result_status": job["result_status"], "error": job["error"]}
+
+    def events():
+        try:
+            yield sse("status", {"status": job["status"], "progress": job["progress"] or {}})
+            if job["status"] in (SUCCEEDED, FAILED):
+                yield sse("done", finished(job))
+                return
+            last_progress = job["progress"]
+            idle_since = time.monotonic()
+            while True:
+                try:
+                    event, data = subscription.get(timeout=1.0)
+                except queue.Empty:
+                    current = job_queue.get(job_id)
+                    if current["status"] in (SUCCEEDED, FAILED):
+                        yield sse("done", finished(current))
+                        return
+                    if current["progress"] != last_progress:
+                        last_progress = current["progress"]
+                        yield sse("progress", last_progress or {})
+                    elif time.monotonic() - idle_since >= 15:
+                        idle_since = time.monotonic()
+                        yield ": keepalive\n\n"  # Keeps proxies from closing a quiet stream
+                    continue
+                idle_since = time.monotonic()
+                yield sse(event, data)
+                if event == "done":
+                    return
+        finally:
+            job_queue.events.unsubscribe(job_id, subscription)
+
+    return Response(events(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"  # Don't let nginx buffer the stream
+    })
+
+
+@app.cli.command("run-jobs")
+def run_jobs_command():
+    """Work the background job queue in the foreground (for a dedicated worker process)."""
+    print("[JOBS] Worker process started")
+    job_queue.run_forever()
 
 
 # Run the app
 if __name__ == "__main__":
     print("Starting Rift Rewind Backend. Make sure your RIOT_API_KEY is set in a .env file.")
-    app.run(debug=True)
\ No newline at end of file
+    # Serve through the flask CLI rather than as this script: timeline worker processes
+    # re-import the main script, and importing app.py builds a whole second app
+    # (Bedrock client, job queue) in each. Under the CLI they only load timeline_features.
+    os.execv(sys.executable, [sys.executable, "-m", "flask", "--app", os.path.abspath(__file__), "run", "--debug"])
\ No newline at end of file
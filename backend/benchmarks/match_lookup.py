@@ -0,0 +1,111 @@
+"""
+Benchmark: per-player lookup latency on a synthetic match table, with and without
+the (puuid, timestamp DESC) index.
+
+Builds a scratch table shaped like `match` (composite (id, puuid) key, one row per
+match participant) with --rows rows spread over --players players, then times the
+queries get_stats/process_timelines/generate_recap issue for one player. The table
+is dropped afterwards.
+
+Run from backend/:  python benchmarks/match_lookup.py [--rows 1000000] [--players 20000] [--runs 50]
+Needs DATABASE_URL pointing at a PostgreSQL database you can create tables in.
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+
+import psycopg2
+from dotenv import load_dotenv
+
+TABLE = "match_lookup_bench"
+
+QUERIES = {
+    "latest tracked match": f"SELECT timestamp FROM {TABLE} WHERE puuid = %s AND tracked ORDER BY timestamp DESC LIMIT 1",
+    "all rows for player": f"SELECT * FROM {TABLE} WHERE puuid = %s",
+    "match ids for player": f"SELECT id FROM {TABLE} WHERE puuid = %s",
+}
+
+
+def build_table(cur, rows, players):
+    cur.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    cur.execute(f"""
+        CREATE TABLE {TABLE} (
+            id varchar NOT NULL,
+            puuid varchar NOT NULL,
+            timestamp bigint NOT NULL,
+            tracked boolean NOT NULL DEFAULT true,
+            champion varchar NOT NULL,
+            kills integer NOT NULL,
+            deaths integer NOT NULL,
+            assists integer NOT NULL,
+            PRIMARY KEY (id, puuid)
+        )
+    """)
+    # Ten participants per match; players are assigned pseudo-randomly per row
+    # (%% is a literal modulo; psycopg2 parameters use %s)
+    cur.execute(f"""
+        INSERT INTO {TABLE} (id, puuid, timestamp, tracked, champion, kills, deaths, assists)
+        SELECT 'NA1_' || (n / 10),
+               'puuid-' || ((n * 7919 + (n / 10) * 104729) %% %s),
+               1700000000000 + (n / 10) * 60000,
+               (n %% 10) = 0,
+               'Champ' || (n %% 160),
+               n %% 17, n %% 13, n %% 23
+        FROM generate_series(0::bigint, %s - 1) AS n
+        ON CONFLICT DO NOTHING
+    """, (players, rows))
+    cur.execute(f"CREATE INDEX {TABLE}_timestamp ON {TABLE} (timestamp)")
+    cur.execute(f"ANALYZE {TABLE}")
+
+
+def time_queries(cur, puuids, runs):
+    results = {}
+    for name, sql in QUERIES.items():
+        samples = []
+        for i in range(runs):
+            started = time.perf_counter()
+            cur.execute(sql, (puuids[i % len(puuids)],))
+            cur.fetchall()
+            samples.append((time.perf_counter() - started) * 1000)
+        results[name] = (statistics.median(samples), max(samples))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--players", type=int, default=20_000)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    load_dotenv(dotenv_path=".env")
+    conn = psycopg2.connect(os.environ["DATABASE_URL"])
+    conn.autocommit = True
+    cur = conn.cursor()
+    try:
+        print(f"Building {args.rows:,} rows for {args.players:,} players...")
+        started = time.perf_counter()
+        build_table(cur, args.rows, args.players)
+        print(f"  built in {time.perf_counter() - started:.1f}s")
+
+        rng = random.Random(7)
+        puuids = [f"puuid-{rng.randrange(args.players)}" for _ in range(args.runs)]
+
+        before = time_queries(cur, puuids, args.runs)
+        cur.execute(f"CREATE INDEX {TABLE}_puuid_timestamp ON {TABLE} (puuid, timestamp DESC)")
+        cur.execute(f"ANALYZE {TABLE}")
+        after = time_queries(cur, puuids, args.runs)
+
+        print(f"{'query':<24} {'no index (median/max ms)':>26} {'(puuid, timestamp DESC)':>26}")
+        for name in QUERIES:
+            b, a = before[name], after[name]
+            print(f"{name:<24} {b[0]:>14.2f} / {b[1]:<9.2f} {a[0]:>14.2f} / {a[1]:<9.2f}")
+    finally:
+        cur.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
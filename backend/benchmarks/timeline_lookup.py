@@ -0,0 +1,214 @@
+"""
+Micro-benchmark: per-timeline CPU time of the frame/event loop in process_single_match.
+
+"before" is the original per-frame loop and insight maths, which scan the participants
+list to find a teamId for every (frame, participant) pair and for every objective
+event. "after" is timeline_features.summarize_timeline, which builds a participantId ->
+teamId list once per match. Both run on the same synthetic timelines and must return
+the same summary.
+
+Run from backend/:  python benchmarks/timeline_lookup.py [--frames 20,30,45,60] [--matches 100]
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from timeline_features import summarize_timeline  # noqa: E402
+
+
+def make_timeline(frames=60, seed=7):
+    """Synthetic 10-player timeline shaped like a match-v5 payload."""
+    rng = random.Random(seed)
+    puuids = [f"puuid-{i}" for i in range(1, 11)]
+    gold = [500] * 10
+    out_frames = []
+    for f in range(frames):
+        participant_frames = {}
+        for i in range(10):
+            gold[i] += rng.randint(200, 600)
+            participant_frames[str(i + 1)] = {
+                "participantId": i + 1,
+                "totalGold": gold[i],
+                "level": min(18, 1 + f // 2),
+                "position": {"x": rng.randint(0, 14800), "y": rng.randint(0, 14800)},
+            }
+        events = [
+            {"type": "CHAMPION_KILL", "killerId": rng.randint(1, 10), "position": {"x": 1, "y": 2}},
+            {"type": "ELITE_MONSTER_KILL", "killerId": rng.randint(1, 10), "monsterType": "DRAGON"},
+            {"type": "BUILDING_KILL", "killerId": rng.randint(0, 10), "buildingType": "TOWER_BUILDING"},
+        ]
+        out_frames.append({"timestamp": f * 60000, "participantFrames": participant_frames, "events": events})
+    timeline = {"info": {
+        "frames": out_frames,
+        "participants": [{"participantId": i + 1, "puuid": p} for i, p in enumerate(puuids)],
+    }}
+    participants = [{"puuid": p, "teamId": 100 if i < 5 else 200} for i, p in enumerate(puuids)]
+    return timeline, participants
+
+
+def legacy_summarize(timeline, puuid, participants, match_id=None, duration=None):
+    """The original frame/event loop and insight maths from process_single_match (debug prints removed)."""
+    info = timeline.get("info", {})
+    participants_meta = info.get("participants", [])
+    pid_to_puuid = {p["participantId"]: p["puuid"] for p in participants_meta}
+    my_pid = next((pid for pid, p in pid_to_puuid.items() if p == puuid), None)
+    my_team_id = next((p.get("teamId") for p in participants if p.get("puuid") == puuid), None)
+
+    frames = info.get("frames", [])
+    gold_diffs = []
+    level_6_time = None
+    level_11_time = None
+    level_16_time = None
+    positions = []
+    for frame in frames:
+        ts = frame.get("timestamp", 0)
+        pf_all = frame.get("participantFrames", {})
+        if not pf_all:
+            continue
+        pf = pf_all.get(str(my_pid))
+        if not pf:
+            continue
+
+        level = pf.get("level", 1)
+        if level >= 6 and level_6_time is None:
+            level_6_time = ts
+        if level >= 11 and level_11_time is None:
+            level_11_time = ts
+        if level >= 16 and level_16_time is None:
+            level_16_time = ts
+
+        my_gold = int(pf.get("totalGold", 0))
+        enemy_golds = []
+        for pid_str, other_pf in pf_all.items():
+            pid_int = int(pid_str)
+            if pid_int == my_pid:
+                continue
+            other_puuid = pid_to_puuid.get(pid_int)
+            if other_puuid and participants and my_team_id:
+                for p in participants:
+                    if p.get("puuid") == other_puuid and p.get("teamId") != my_team_id:
+                        enemy_golds.append(int(other_pf.get("totalGold", 0)))
+                        break
+        if enemy_golds:
+            gold_diffs.append((ts, my_gold - sum(enemy_golds) // len(enemy_golds)))
+
+        pos = pf.get("position", {})
+        if pos.get("x") is not None and pos.get("y") is not None:
+            positions.append((pos.get("x"), pos.get("y")))
+
+    kill_positions = []
+    objective_counts = {"dragon": 0, "baron": 0, "herald": 0, "tower": 0, "inhibitor": 0}
+    for frame in frames:
+        for event in frame.get("events", []):
+            event_type = event.get("type")
+            if event_type == "CHAMPION_KILL":
+                if event.get("killerId") == my_pid:
+                    pos = event.get("position", {})
+                    if pos.get("x") is not None and pos.get("y") is not None:
+                        kill_positions.append({"x": pos.get("x"), "y": pos.get("y")})
+            elif event_type in ("ELITE_MONSTER_KILL", "BUILDING_KILL") and my_team_id:
+                killer_puuid = pid_to_puuid.get(event.get("killerId"))
+                if not killer_puuid:
+                    continue
+                killer_team = next((p.get("teamId") for p in participants if p.get("puuid") == killer_puuid), None)
+                if killer_team != my_team_id:
+                    continue
+                if event_type == "ELITE_MONSTER_KILL":
+                    monster_type = event.get("monsterType", "").lower()
+                    if "dragon" in monster_type:
+                        objective_counts["dragon"] += 1
+                    elif "baron" in monster_type:
+                        objective_counts["baron"] += 1
+                    elif "herald" in monster_type or "riftherald" in monster_type:
+                        objective_counts["herald"] += 1
+                else:
+                    building_type = event.get("buildingType", "").lower()
+                    if "tower" in building_type:
+                        objective_counts["tower"] += 1
+                    elif "inhibitor" in building_type:
+                        objective_counts["inhibitor"] += 1
+
+    if not gold_diffs:
+        return None
+
+    early_diffs = [diff for ts, diff in gold_diffs if ts <= 600000]
+    early_dominance = sum(early_diffs) / len(early_diffs) if early_diffs else 0
+    mid_diffs = [diff for ts, diff in gold_diffs if 600000 < ts <= 1200000]
+    midgame_swing = max(mid_diffs) - min(mid_diffs) if len(mid_diffs) > 1 else 0
+    all_diffs = [diff for ts, diff in gold_diffs]
+    mean_diff = sum(all_diffs) / len(all_diffs)
+    variance = sum((x - mean_diff) ** 2 for x in all_diffs) / len(all_diffs)
+    consistency = 100 - min(variance / 100, 100)
+    deltas = [all_diffs[i] - all_diffs[i-1] for i in range(1, len(all_diffs))]
+    biggest_spike = max(deltas) if deltas else 0
+    biggest_throw = min(deltas) if deltas else 0
+
+    roam_score = 0
+    if len(positions) > 1:
+        significant_moves = 0
+        for i in range(1, len(positions)):
+            x1, y1 = positions[i-1]
+            x2, y2 = positions[i]
+            if ((x2-x1)**2 + (y2-y1)**2) ** 0.5 > 3000:
+                significant_moves += 1
+        roam_score = significant_moves / (len(positions) / 10)
+
+    comeback_type = "neutral"
+    if early_dominance > 100 and all_diffs[-1] > 500:
+        comeback_type = "dominated"
+    elif early_dominance < -100 and all_diffs[-1] > 500:
+        comeback_type = "comeback"
+    elif early_dominance > 100 and all_diffs[-1] < -500:
+        comeback_type = "throw"
+    elif early_dominance < -100 and all_diffs[-1] < -500:
+        comeback_type = "fell_behind"
+
+    return {
+        "match_id": match_id,
+        "puuid": puuid,
+        "early_dominance_score": round(early_dominance, 2),
+        "midgame_swing_score": round(midgame_swing, 2),
+        "consistency_score": round(consistency, 2),
+        "level_6_timestamp": level_6_time,
+        "level_11_timestamp": level_11_time,
+        "level_16_timestamp": level_16_time,
+        "biggest_spike": round(biggest_spike, 2),
+        "biggest_throw": round(biggest_throw, 2),
+        "roam_score": round(roam_score, 2),
+        "kill_positions": kill_positions,
+        "objective_presence": objective_counts,
+        "comeback_type": comeback_type,
+        "duration": duration
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--frames", default="20,30,45,60",
+                        help="comma-separated frames per timeline (one frame per minute of game)")
+    parser.add_argument("--matches", type=int, default=100, help="timelines per run, e.g. one /process-timelines call")
+    args = parser.parse_args()
+
+    puuid = "puuid-3"
+    print(f"{'frames':>6}  {'before ms/timeline':>18}  {'after ms/timeline':>17}  {'speedup':>7}  {f'after ms/{args.matches} matches':>22}")
+    for frames in (int(f) for f in args.frames.split(",")):
+        batch = [make_timeline(frames, seed) for seed in range(args.matches)]
+        for timeline, participants in batch:
+            assert legacy_summarize(timeline, puuid, participants) == summarize_timeline(timeline, puuid, participants)
+
+        def run(summarize):
+            for timeline, participants in batch:
+                summarize(timeline, puuid, participants)
+
+        before = min(timeit.repeat(lambda: run(legacy_summarize), number=1, repeat=5))
+        after = min(timeit.repeat(lambda: run(summarize_timeline), number=1, repeat=5))
+        print(f"{frames:>6}  {before / args.matches * 1000:>18.3f}  {after / args.matches * 1000:>17.3f}"
+              f"  {before / after:>6.2f}x  {after * 1000:>22.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+COPY-based bulk ingest for the match and timeline tables (PostgreSQL).
+
+Rows are streamed with psycopg2's copy_expert into a temp table, then moved
+into the real table with one INSERT ... ON CONFLICT DO NOTHING (or DO UPDATE for
+upserts), so a whole ingest lands in a single round of COPY + INSERT inside the
+caller's transaction instead of many small INSERT batches.
+"""
+import csv
+import io
+import json
+from collections import namedtuple
+
+import psycopg2
+
+# touched: columns set to now() when an upsert overwrites a row (new rows get the column default)
+TableSpec = namedtuple("TableSpec", ["columns", "conflict", "json_columns", "touched"], defaults=((),))
+
+TABLES = {
+    "match": TableSpec(
+        columns=(
+            "id", "game_mode", "duration", "win", "timestamp",
+            "role", "champion", "puuid", "tracked",
+            "kills", "deaths", "assists", "damage", "damage_taken", "time_dead",
+            "gold",
+            "cs", "neutral_cs", "enemy_jungle_cs", "ally_jungle_cs",
+            "vision", "wards_placed", "wards_killed",
+            "dragons", "barons", "heralds", "towers", "inhibitors",
+            "team_kills", "team_damage", "team_gold", "team_vision",
+        ),
+        conflict=("id", "puuid"),
+        json_columns=(),
+    ),
+    "match_timeline_summary": TableSpec(
+        columns=(
+            "match_id", "puuid",
+            "early_dominance_score", "midgame_swing_score", "consistency_score",
+            "level_6_timestamp", "level_11_timestamp", "level_16_timestamp",
+            "biggest_spike", "biggest_throw", "roam_score",
+            "kill_positions", "objective_presence", "comeback_type", "duration",
+        ),
+        conflict=("match_id", "puuid"),
+        json_columns=("kill_positions", "objective_presence"),
+        touched=("updated_at",),
+    ),
+    "match_timeline": TableSpec(
+        columns=(
+            "match_id", "puuid", "frame_index", "timestamp",
+            "gold", "xp", "cs", "jungle_cs", "level", "cc_time",
+            "position_x", "position_y", "gold_diff", "xp_diff", "cs_diff",
+        ),
+        conflict=("match_id", "puuid", "frame_index"),
+        json_columns=(),
+    ),
+    "match_events": TableSpec(
+        columns=(
+            "match_id", "puuid", "timestamp", "event_type",
+            "killer_champion", "victim_champion", "assisting_champions", "objective_type",
+            "position_x", "position_y",
+        ),
+        conflict=("match_id", "puuid", "timestamp", "event_type"),
+        json_columns=("assisting_champions",),
+    ),
+}
+
+NULL = r"\N"
+
+
+def _value(row, column):
+    return row[column] if isinstance(row, dict) else getattr(row, column)
+
+
+def _key(row, spec):
+    return tuple(_value(row, column) for column in spec.conflict)
+
+
+def _returned_rows(rows, spec, keys, last=False):
+    """Pick the rows whose conflict key is in `keys`: the first one per key, or the last with `last`."""
+    keys = set(keys)
+    written = []
+    for row in (reversed(rows) if last else rows):
+        key = _key(row, spec)
+        if key in keys:
+            keys.discard(key)
+            written.append(row)
+    return written[::-1] if last else written
+
+
+def to_csv(rows, spec):
+    """Render rows (dicts or objects with the spec's columns as attributes) as COPY CSV."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        record = []
+        for column in spec.columns:
+            value = _value(row, column)
+            if value is None:
+                record.append(NULL)
+            elif column in spec.json_columns:
+                record.append(json.dumps(value))
+            else:
+                record.append(value)
+        writer.writerow(record)
+    buffer.seek(0)
+    return buffer
+
+
+def _conflict_clause(spec, update):
+    keys = ", ".join(spec.conflict)
+    if not update:
+        return f"ON CONFLICT ({keys}) DO NOTHING"
+    assignments = ", ".join(
+        [f"{c} = EXCLUDED.{c}" for c in spec.columns if c not in spec.conflict] + [f"{c} = now()" for c in spec.touched]
+    )
+    return f"ON CONFLICT ({keys}) DO UPDATE SET {assignments}"
+
+
+def copy_rows(cursor, table, rows, update=False, returning=False):
+    """
+    Insert `rows` into `table`. Rows whose conflict key already exists are skipped,
+    or overwritten when `update` is set.
+
+    Runs inside the cursor's current transaction; the caller commits. Returns the
+    number of rows inserted or updated, or with `returning` those rows themselves.
+    """
+    spec = TABLES[table]
+    rows = list(rows)
+    columns = ", ".join(spec.columns)
+    staging = f"bulk_{table}"
+
+    cursor.execute(f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS SELECT {columns} FROM {table} WITH NO DATA")
+    cursor.execute(f"ALTER TABLE {staging} ADD COLUMN bulk_seq bigserial")  # Numbers rows in COPY order
+    cursor.copy_expert(
+        f"COPY {staging} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '{NULL}')",
+        to_csv(rows, spec),
+    )
+    # DO UPDATE may touch each target row only once per statement, so keep one row per
+    # key: the last one given, as if the rows had been upserted one after another
+    conflict = ", ".join(spec.conflict)
+    source = f"SELECT DISTINCT ON ({conflict}) {columns} FROM {staging} ORDER BY {conflict}, bulk_seq DESC" if update \
+        else f"SELECT {columns} FROM {staging}"
+    suffix = f" RETURNING {conflict}" if returning else ""
+    cursor.execute(f"INSERT INTO {table} ({columns}) {source} {_conflict_clause(spec, update)}{suffix}")
+    written = _returned_rows(rows, spec, cursor.fetchall(), last=update) if returning else cursor.rowcount
+    cursor.execute(f"DROP TABLE {staging}")
+    return written
+
+
+def write_rows_individually(cursor, table, rows, update=False, returning=False):
+    """
+    Fallback for when a batch fails: write rows one at a time, each under its own
+    savepoint, so a bad row is skipped instead of aborting the rest.
+
+    Returns (rows written, [(row, error), ...] for rows that failed); the first item
+    is the written rows themselves with `returning`.
+    """
+    spec = TABLES[table]
+    sql = (
+        f"INSERT INTO {table} ({', '.join(spec.columns)}) "
+        f"VALUES ({', '.join(['%s'] * len(spec.columns))}) {_conflict_clause(spec, update)}"
+    )
+    written = []
+    failed = []
+    for row in rows:
+        values = [
+            json.dumps(_value(row, c)) if c in spec.json_columns and _value(row, c) is not None else _value(row, c)
+            for c in spec.columns
+        ]
+        cursor.execute("SAVEPOINT bulk_row")
+        try:
+            cursor.execute(sql, values)
+        except psycopg2.Error as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT bulk_row")
+            failed.append((row, e))
+            continue
+        if cursor.rowcount > 0:
+            written.append(row)
+        cursor.execute("RELEASE SAVEPOINT bulk_row")
+    return (written if returning else len(written)), failed
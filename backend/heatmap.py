@@ -0,0 +1,45 @@
+"""
+Kill-position heatmaps binned on a fixed Summoner's Rift grid.
+
+Positions are map units in [0, MAP_SIZE) on both axes; the map is cut into
+grid_size x grid_size equal cells. Heatmaps travel as sparse cells, so a player's
+heatmap stays bounded by the grid however many kills they have:
+
+    {"grid_size": 64, "map_size": 15000, "total": 812, "cells": [[x_cell, y_cell, count], ...]}
+
+Cell (0, 0) is the bottom-left corner (blue side fountain).
+"""
+import numpy as np
+
+MAP_SIZE = 15000        # Summoner's Rift spans roughly 0-14900 on both axes
+DEFAULT_GRID_SIZE = 64
+
+
+def bin_positions(positions, grid_size=DEFAULT_GRID_SIZE):
+    """Return a (grid_size, grid_size) int array of counts for [{"x", "y"}, ...] positions."""
+    points = np.array(
+        [(p["x"], p["y"]) for p in positions or () if p.get("x") is not None and p.get("y") is not None],
+        dtype=float,
+    ).reshape(-1, 2)
+    # Points on or past the edge land in the border cells instead of being dropped
+    points = np.clip(points, 0, np.nextafter(MAP_SIZE, 0))
+    counts, _, _ = np.histogram2d(
+        points[:, 0], points[:, 1], bins=grid_size, range=[[0, MAP_SIZE], [0, MAP_SIZE]]
+    )
+    return counts.astype(np.int64)
+
+
+def to_cells(counts):
+    """Sparse [[x_cell, y_cell, count], ...] for the non-empty cells of a counts grid."""
+    xs, ys = np.nonzero(counts)
+    return [[int(x), int(y), int(counts[x, y])] for x, y in zip(xs, ys)]
+
+
+def heatmap(cells, grid_size=DEFAULT_GRID_SIZE):
+    """Response payload for sparse cells."""
+    return {
+        "grid_size": grid_size,
+        "map_size": MAP_SIZE,
+        "total": sum(count for _, _, count in cells),
+        "cells": sorted(cells),
+    }
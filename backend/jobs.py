@@ -0,0 +1,334 @@
+"""
+Database-backed background jobs for the long ingest runs (/get-stats, /process-timelines).
+
+A job is a row in ingest_job. enqueue() inserts one and wakes the local workers;
+worker threads claim the oldest queued job with SELECT ... FOR UPDATE SKIP LOCKED,
+so any number of threads or processes can share the table without running a job
+twice. No broker or external service is involved. Like the ingest pipelines the
+jobs run (COPY via bulk_insert), this needs PostgreSQL.
+
+While a job runs, a heartbeat thread writes its progress counters back to the row
+(what /jobs/<id> reports) and touches it at least every `heartbeat_interval`
+seconds, however long the pipeline goes without progress. A running job whose row
+hasn't been touched for `stale_after` seconds (its process died) is claimed again,
+up to `max_attempts` runs in all; after that it is marked failed. Every progress
+event is also published on the queue's in-process EventBus, which the
+/jobs/<id>/events stream relays as it happens.
+"""
+import queue
+import threading
+import time
+import traceback
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import sqlalchemy as sa
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+jobs = sa.table(
+    "ingest_job",
+    sa.column("id", sa.String),
+    sa.column("kind", sa.String),
+    sa.column("params", sa.JSON),
+    sa.column("status", sa.String),
+    sa.column("progress", sa.JSON),
+    sa.column("result", sa.JSON),
+    sa.column("result_status", sa.Integer),
+    sa.column("error", sa.Text),
+    sa.column("attempts", sa.Integer),
+    sa.column("created_at", sa.DateTime),
+    sa.column("started_at", sa.DateTime),
+    sa.column("updated_at", sa.DateTime),
+    sa.column("finished_at", sa.DateTime),
+)
+
+
+def _now():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class EventBus:
+    """
+    Fan-out of (event, data) pairs to in-process subscribers, keyed by job ID.
+
+    Subscribers get a bounded queue; if a client falls that far behind, newer events
+    are dropped for it (counters are cumulative, so the next event catches it up).
+    """
+
+    def __init__(self, max_pending=1000):
+        self.max_pending = max_pending
+        self._subscribers = {}  # job_id -> set of queues
+        self._lock = threading.Lock()
+
+    def subscribe(self, job_id):
+        subscription = queue.Queue(self.max_pending)
+        with self._lock:
+            self._subscribers.setdefault(job_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, job_id, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(job_id, set())
+            subscribers.discard(subscription)
+            if not subscribers:
+                self._subscribers.pop(job_id, None)
+
+    def publish(self, job_id, event, data):
+        with self._lock:
+            subscribers = list(self._subscribers.get(job_id, ()))
+        self._deliver(subscribers, event, data)
+
+    def broadcast(self, event, data):
+        """Publish to every subscriber of every job (e.g. shared rate limit waits)."""
+        with self._lock:
+            subscribers = [s for subs in self._subscribers.values() for s in subs]
+        self._deliver(subscribers, event, data)
+
+    @staticmethod
+    def _deliver(subscribers, event, data):
+        for subscription in subscribers:
+            try:
+                subscription.put_nowait((event, data))
+            except queue.Full:
+                pass
+
+
+class Progress:
+    """Progress sink for pipelines run outside a job (e.g. the synchronous GET endpoints): ignores events."""
+
+    def emit(self, event, **counters):
+        pass
+
+    def flush(self):
+        pass
+
+
+class JobProgress(Progress):
+    """
+    Counters for one running job. emit() publishes each event to the job's
+    subscribers and merges its counters without touching the database, so it is safe
+    to call from the pipeline's event loop. Between start() and stop() a heartbeat
+    thread writes changed counters to the job row every `interval` seconds, and
+    touches the row every `heartbeat_interval` seconds even if nothing changed.
+    """
+
+    def __init__(self, job_queue, job_id, attempt, interval=1.0, heartbeat_interval=30):
+        self.job_queue = job_queue
+        self.job_id = job_id
+        self.attempt = attempt
+        self.interval = interval
+        self.heartbeat_interval = heartbeat_interval
+        self.counters = {}
+        self._changed = False
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def emit(self, event, **counters):
+        with self._lock:
+            self.counters.update(counters)
+            self._changed = True
+        self.job_queue.events.publish(self.job_id, event, counters)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counters)
+
+    def flush(self):
+        with self._lock:
+            counters = dict(self.counters)
+            self._changed = False
+        self.job_queue.heartbeat(self.job_id, self.attempt, counters)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._beat, name=f"job-heartbeat-{self.job_id}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _beat(self):
+        written_at = time.monotonic()
+        while not self._stopped.wait(self.interval):
+            if not self._changed and time.monotonic() - written_at < self.heartbeat_interval:
+                continue
+            try:
+                self.flush()
+                written_at = time.monotonic()
+            except Exception as e:
+                print(f"[JOBS] ERROR: Heartbeat for job {self.job_id} failed: {e}")
+
+
+class JobQueue:
+    """
+    Runs queued jobs with `runner(kind, params, progress)`, which returns
+    (result body, HTTP status) like the synchronous endpoint would.
+
+        queue = JobQueue(db.engine, run_job, workers=2)
+        job_id = queue.enqueue("stats", {"game_name": ..., "tag_line": ...})
+        queue.get(job_id)["status"]
+    """
+
+    def __init__(self, engine, runner, workers=2, poll_interval=1.0, stale_after=600, heartbeat_interval=30,
+                 max_attempts=3):
+        self.engine = engine
+        self.runner = runner
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.heartbeat_interval = heartbeat_interval
+        self.max_attempts = max_attempts
+        self.events = EventBus()
+
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    # --- Queue operations -------------------------------------------------------------------
+
+    def enqueue(self, kind, params):
+        job_id = str(uuid.uuid4())
+        now = _now()
+        with self.engine.begin() as conn:
+            conn.execute(jobs.insert().values(
+                id=job_id, kind=kind, params=params, status=QUEUED, progress={}, attempts=0,
+                created_at=now, updated_at=now,
+            ))
+        self._wake.set()
+        return job_id
+
+    def get(self, job_id):
+        """The job row as a dict, or None."""
+        with self.engine.connect() as conn:
+            row = conn.execute(sa.select(jobs).where(jobs.c.id == job_id)).mappings().first()
+        return dict(row) if row else None
+
+    def claim(self):
+        """
+        Mark the oldest runnable job as running and return (id, kind, params, attempt),
+        or None. A stale job that has already been run max_attempts times is marked
+        failed instead.
+        """
+        now = _now()
+        runnable = sa.or_(
+            jobs.c.status == QUEUED,
+            sa.and_(jobs.c.status == RUNNING, jobs.c.updated_at < now - timedelta(seconds=self.stale_after)),
+        )
+        with self.engine.begin() as conn:
+            job = conn.execute(
+                sa.select(jobs.c.id, jobs.c.kind, jobs.c.params, jobs.c.status, jobs.c.updated_at, jobs.c.attempts)
+                .where(runnable)
+                .order_by(jobs.c.created_at)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            ).first()
+            if job is None:
+                return None
+            if job.status == RUNNING and job.attempts >= self.max_attempts:
+                conn.execute(
+                    jobs.update()
+                    .where(jobs.c.id == job.id, jobs.c.status == RUNNING, jobs.c.updated_at == job.updated_at)
+                    .values(status=FAILED, error=f"Abandoned after {job.attempts} attempts",
+                            updated_at=now, finished_at=now)
+                )
+                print(f"[JOBS] Gave up on job {job.id} after {job.attempts} attempts")
+                return None
+            # The status/updated_at guard makes the claim a no-op if the row changed since it was read
+            claimed = conn.execute(
+                jobs.update()
+                .where(jobs.c.id == job.id, jobs.c.status == job.status, jobs.c.updated_at == job.updated_at)
+                .values(status=RUNNING, attempts=jobs.c.attempts + 1, started_at=now, updated_at=now)
+            ).rowcount
+        if not claimed:
+            return None
+        if job.status == RUNNING:
+            print(f"[JOBS] Reclaimed stale job {job.id}")
+        return job.id, job.kind, job.params, job.attempts + 1
+
+    @staticmethod
+    def _current(job_id, attempt):
+        """Matches the job row only while `attempt` is the run that holds it (not reclaimed or given up on)."""
+        return sa.and_(jobs.c.id == job_id, jobs.c.status == RUNNING, jobs.c.attempts == attempt)
+
+    def heartbeat(self, job_id, attempt, progress):
+        with self.engine.begin() as conn:
+            conn.execute(jobs.update().where(self._current(job_id, attempt)).values(
+                progress=dict(progress), updated_at=_now()
+            ))
+
+    def finish(self, job_id, attempt, status, progress, result=None, result_status=None, error=None):
+        """Record the outcome of `attempt`; returns False (and stores nothing) if that run no longer holds the job."""
+        now = _now()
+        with self.engine.begin() as conn:
+            updated = conn.execute(jobs.update().where(self._current(job_id, attempt)).values(
+                status=status, progress=dict(progress), result=result, result_status=result_status,
+                error=error, updated_at=now, finished_at=now,
+            )).rowcount
+        return updated > 0
+
+    # --- Workers ----------------------------------------------------------------------------
+
+    def start(self):
+        """Start the worker threads (once per process; no-op when workers is 0)."""
+        with self._lock:
+            if self._threads or self.workers <= 0:
+                return
+            self._threads = [
+                threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+        print(f"[JOBS] Started {self.workers} job workers")
+
+    def run_forever(self):
+        """Work the queue on the calling thread (for a dedicated worker process)."""
+        self._work()
+
+    def _work(self):
+        while True:
+            try:
+                job = self.claim()
+            except Exception as e:
+                print(f"[JOBS] ERROR: Failed to claim a job: {e}")
+                job = None
+            if job is None:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            try:
+                self._run(*job)
+            except Exception as e:
+                # Keep the worker alive; the job row is reclaimed once it goes stale
+                print(f"[JOBS] ERROR: Failed to run job {job[0]}: {e}")
+                traceback.print_exc()
+
+    def _run(self, job_id, kind, params, attempt):
+        print(f"[JOBS] Running {kind} job {job_id} (attempt {attempt})")
+        self.events.publish(job_id, "status", {"status": RUNNING})
+        progress = JobProgress(self, job_id, attempt, heartbeat_interval=self.heartbeat_interval)
+        progress.start()
+        result, status, error = None, None, None
+        try:
+            result, status = self.runner(kind, params, progress)
+            outcome = SUCCEEDED if status < 400 else FAILED
+            if outcome == FAILED and isinstance(result, dict):
+                error = result.get("error")
+        except Exception as e:
+            traceback.print_exc()
+            outcome, error = FAILED, str(e)
+        finally:
+            progress.stop()
+        if not self.finish(job_id, attempt, outcome, progress.snapshot(), result=result, result_status=status,
+                           error=error):
+            print(f"[JOBS] Dropped the {outcome} result of {kind} job {job_id} attempt {attempt}: "
+                  f"the job was reclaimed or given up on")
+            return
+        self.events.publish(job_id, "done", {"status": outcome, "result_status": status, "error": error})
+        print(f"[JOBS] {kind} job {job_id} {outcome} ({status})")
@@ -0,0 +1,33 @@
+"""match composite key for all-participant ingestion
+
+Revision ID: 4b7e1f9a2c31
+Revises: 853f56d15357
+Create Date: 2026-10-15 10:12:03.418227
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b7e1f9a2c31'
+down_revision = '853f56d15357'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Rows are now stored for every participant of a match, so the key becomes (id, puuid)
+    with op.batch_alter_table('match', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('tracked', sa.Boolean(), server_default=sa.text('true'), nullable=False))
+        batch_op.drop_constraint('match_pkey', type_='primary')
+        batch_op.create_primary_key('match_pkey', ['id', 'puuid'])
+
+
+def downgrade():
+    # Untracked participant rows cannot live under a single-column key
+    op.execute("DELETE FROM match WHERE NOT tracked")
+    with op.batch_alter_table('match', schema=None) as batch_op:
+        batch_op.drop_constraint('match_pkey', type_='primary')
+        batch_op.create_primary_key('match_pkey', ['id'])
+        batch_op.drop_column('tracked')
@@ -0,0 +1,34 @@
+"""match (puuid, timestamp DESC) index
+
+Revision ID: 9d2e6b41c7f3
+Revises: 4b7e1f9a2c31
+Create Date: 2026-10-15 14:52:40.118364
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d2e6b41c7f3'
+down_revision = '4b7e1f9a2c31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Every per-player read filters on puuid (and get_stats orders by timestamp DESC);
+    # the (id, puuid) primary key leads with id, so it can't serve those lookups
+    with op.batch_alter_table('match', schema=None) as batch_op:
+        batch_op.create_index('ix_match_puuid_timestamp', ['puuid', sa.text('timestamp DESC')], unique=False)
+
+    with op.batch_alter_table('match_timeline_summary', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_match_timeline_summary_puuid'), ['puuid'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('match_timeline_summary', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_match_timeline_summary_puuid'))
+
+    with op.batch_alter_table('match', schema=None) as batch_op:
+        batch_op.drop_index('ix_match_puuid_timestamp')
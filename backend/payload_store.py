@@ -0,0 +1,60 @@
+"""Local gzip-compressed store for raw Riot match and timeline payloads."""
+import gzip
+import hashlib
+import os
+import tempfile
+
+
+class PayloadStore:
+    """
+    Keeps the exact JSON bytes Riot returned, keyed by kind ("match" or
+    "timeline") and match ID. Match payloads never change once a game is over,
+    so a stored copy is always valid and can be re-read for free when scoring
+    formulas change or stats need recomputing.
+
+    Files live at <root>/<kind>/<2-char shard>/<match_id>.json.gz.
+    """
+
+    def __init__(self, root, compresslevel=6):
+        self.root = root
+        self.compresslevel = compresslevel
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, kind, match_id):
+        shard = hashlib.sha1(match_id.encode()).hexdigest()[:2]
+        return os.path.join(self.root, kind, shard, f"{match_id}.json.gz")
+
+    def load(self, kind, match_id):
+        """Return the stored raw JSON bytes, or None if this payload was never saved."""
+        try:
+            with gzip.open(self.path(kind, match_id), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, EOFError) as e:
+            print(f"[PAYLOAD] Corrupt {kind} payload for {match_id}, ignoring: {e}")
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def save(self, kind, match_id, raw):
+        """Write raw JSON bytes atomically (temp file + rename) so readers never see partial files."""
+        path = self.path(kind, match_id)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw_file:
+                with gzip.GzipFile(fileobj=raw_file, mode="wb", compresslevel=self.compresslevel, mtime=0) as f:
+                    f.write(raw)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def contains(self, kind, match_id):
+        return os.path.exists(self.path(kind, match_id))
@@ -0,0 +1,58 @@
+"""Cache of built analytics responses, validated by the data version they were built from."""
+import hashlib
+import json
+
+from ttl_cache import TTLCache
+
+
+class ResponseCache:
+    """
+    JSON response bodies keyed by endpoint and request (the player plus any
+    parameters that shape the body). Each is stored with the ETag of the data version
+    it was built from and only the latest one is kept, in memory and, if a
+    PayloadStore is given, on disk, so it survives restarts and is shared between
+    processes.
+
+        etag = ResponseCache.etag("recap", key, version)
+        body = cache.get("recap", key, etag)  # None unless built for this version
+    """
+
+    def __init__(self, store=None, maxsize=1000):
+        self.store = store
+        self.memory = TTLCache(maxsize, ttl=float("inf"))  # Entries go stale by ETag, not by age
+
+    @staticmethod
+    def etag(endpoint, key, version):
+        return hashlib.sha1(json.dumps([endpoint, key, version], default=str).encode()).hexdigest()
+
+    @staticmethod
+    def _slot(key):
+        return hashlib.sha1(json.dumps(key, default=str).encode()).hexdigest()
+
+    def get(self, endpoint, key, etag):
+        """Return the body stored for `key` if it was built for `etag`, else None."""
+        slot = self._slot(key)
+        cached = self.memory.get((endpoint, slot), None)
+        if cached and cached[0] == etag:
+            return cached[1]
+        if self.store is None:
+            return None
+
+        raw = self.store.load(endpoint, slot)
+        if raw is None:
+            return None
+        stored_etag, _, body = raw.partition(b"\n")
+        if stored_etag.decode() != etag:
+            return None
+        body = json.loads(body)
+        self.memory.set((endpoint, slot), (etag, body))
+        return body
+
+    def put(self, endpoint, key, etag, body):
+        slot = self._slot(key)
+        self.memory.set((endpoint, slot), (etag, body))
+        if self.store is not None:
+            try:
+                self.store.save(endpoint, slot, etag.encode() + b"\n" + json.dumps(body).encode())
+            except OSError as e:
+                print(f"[CACHE] Failed to store {endpoint} response: {e}")
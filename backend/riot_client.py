@@ -0,0 +1,267 @@
+"""Shared Riot Games API client with process-wide rate limiting."""
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import aiohttp
+
+# Default development key limits; replaced by X-App-Rate-Limit once Riot answers
+DEFAULT_APP_LIMITS = "20:1,100:120"
+
+RIOT_HOST_TEMPLATE = "https://{routing}.api.riotgames.com"
+
+
+def parse_rate_limits(header_value):
+    """Parse a Riot rate limit header like '20:1,100:120' into [(count, seconds)]."""
+    limits = []
+    for part in (header_value or "").split(","):
+        try:
+            count, seconds = part.strip().split(":")
+            limits.append((int(count), int(seconds)))
+        except ValueError:
+            continue
+    return limits
+
+
+def parse_retry_after(header_value):
+    """
+    Seconds to wait from a Retry-After header, given as delay-seconds or an HTTP-date.
+    Returns None when the header is missing or unparseable.
+    """
+    if header_value is None:
+        return None
+    try:
+        seconds = float(header_value)
+    except ValueError:
+        pass
+    else:
+        return max(seconds, 0.0) if math.isfinite(seconds) else None
+    try:
+        retry_at = parsedate_to_datetime(header_value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class RateLimitBucket:
+    """Enforces several (count, seconds) windows at once for one Riot limit scope."""
+
+    def __init__(self, limits=None):
+        self.windows = {}  # seconds -> (count, deque of request times)
+        self.blocked_until = 0.0
+        self.update_limits(limits or [])
+
+    def update_limits(self, limits):
+        """Replace the window definitions, keeping history for windows that survive."""
+        windows = {}
+        for count, seconds in limits:
+            history = self.windows.get(seconds, (None, deque()))[1]
+            windows[seconds] = (count, history)
+        self.windows = windows
+
+    def sync_counts(self, counts, now):
+        """Pad local history up to the counts Riot reports (e.g. other processes on the same key)."""
+        for used, seconds in counts:
+            if seconds not in self.windows:
+                continue
+            history = self.windows[seconds][1]
+            self._expire(history, seconds, now)
+            for _ in range(used - len(history)):
+                history.append(now)
+
+    def block(self, seconds, now):
+        """Stop handing out requests for `seconds` (used after a 429 with Retry-After)."""
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+    def wait_time(self, now):
+        """Seconds until a request fits in every window (0 if it fits now)."""
+        wait = self.blocked_until - now
+        for seconds, (count, history) in self.windows.items():
+            self._expire(history, seconds, now)
+            if len(history) >= count:
+                wait = max(wait, history[0] + seconds - now)
+        return max(wait, 0.0)
+
+    def record(self, now):
+        for _, history in self.windows.values():
+            history.append(now)
+
+    @staticmethod
+    def _expire(history, seconds, now):
+        while history and history[0] <= now - seconds:
+            history.popleft()
+
+
+class RiotClient:
+    """
+    Process-wide Riot API client.
+
+    All requests run on one background event loop that owns a pooled aiohttp
+    session, so every Flask request (each of which gets its own event loop)
+    shares the same connections and the same app/method rate limit budget.
+    Limits are tracked per routing value (americas, europe, ...) and learned
+    from the X-App-Rate-Limit / X-Method-Rate-Limit response headers.
+    """
+
+    def __init__(self, api_key, app_limits=DEFAULT_APP_LIMITS, max_connections=50,
+                 max_retries=5, host_template=RIOT_HOST_TEMPLATE, timeout=30, connect_timeout=10):
+        self.api_key = api_key
+        self.default_app_limits = parse_rate_limits(app_limits)
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        # Per request, in seconds; a hung connection fails the call instead of holding a worker
+        self.timeout = aiohttp.ClientTimeout(total=timeout, sock_connect=connect_timeout)
+        self.host_template = host_template
+
+        self._app_buckets = {}     # routing -> RateLimitBucket
+        self._method_buckets = {}  # (routing, method) -> RateLimitBucket
+        self._loop = None
+        self._session = None
+        self._start_lock = threading.Lock()
+        self._wait_listeners = []
+
+    # --- Public API (callable from any event loop) ---
+
+    async def get(self, routing, path, method, params=None, raw=False):
+        """
+        GET `path` on the given routing host, waiting for rate limit budget first.
+
+        Returns (status, data): data is the decoded JSON body (or the raw bytes when
+        raw=True) for a 200 response and None otherwise. 429s and 5xx responses are
+        retried internally; the final status is returned once retries run out.
+        """
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(
+            self._get(routing, path, method, params, raw), loop
+        )
+        return await asyncio.wrap_future(future)
+
+    def add_wait_listener(self, listener):
+        """
+        Call listener(routing, method, seconds, reason) whenever a request is about to
+        wait: reason is "rate_limit" (no budget left in a window), "retry_after" (Riot
+        answered 429 with Retry-After) or "backoff" (429 without it, or a 5xx).
+
+        Listeners run on the client's event loop thread and must not block.
+        """
+        self._wait_listeners.append(listener)
+
+    def close(self):
+        """Close the pooled session and stop the background loop."""
+        with self._start_lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        if self._session is not None:
+            asyncio.run_coroutine_threadsafe(self._session.close(), loop).result()
+            self._session = None
+        loop.call_soon_threadsafe(loop.stop)
+
+    # --- Internals (run on the client loop only) ---
+
+    def _ensure_loop(self):
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="riot-client", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers={"X-Riot-Token": self.api_key},
+                timeout=self.timeout,
+            )
+        return self._session
+
+    def _buckets(self, routing, method):
+        app_bucket = self._app_buckets.get(routing)
+        if app_bucket is None:
+            app_bucket = self._app_buckets[routing] = RateLimitBucket(self.default_app_limits)
+        method_bucket = self._method_buckets.get((routing, method))
+        if method_bucket is None:
+            # Method limits are unknown until the first response tells us
+            method_bucket = self._method_buckets[(routing, method)] = RateLimitBucket()
+        return app_bucket, method_bucket
+
+    async def _acquire(self, routing, method):
+        app_bucket, method_bucket = self._buckets(routing, method)
+        while True:
+            now = time.monotonic()
+            wait = max(app_bucket.wait_time(now), method_bucket.wait_time(now))
+            if wait <= 0:
+                app_bucket.record(now)
+                method_bucket.record(now)
+                return
+            self._notify_wait(routing, method, wait, "rate_limit")
+            await asyncio.sleep(wait)
+
+    def _notify_wait(self, routing, method, seconds, reason):
+        for listener in self._wait_listeners:
+            try:
+                listener(routing, method, seconds, reason)
+            except Exception as e:
+                print(f"[RIOT] Wait listener failed: {e}")
+
+    def _update_from_headers(self, routing, method, headers):
+        app_bucket, method_bucket = self._buckets(routing, method)
+        now = time.monotonic()
+        for bucket, limit_header, count_header in (
+            (app_bucket, "X-App-Rate-Limit", "X-App-Rate-Limit-Count"),
+            (method_bucket, "X-Method-Rate-Limit", "X-Method-Rate-Limit-Count"),
+        ):
+            limits = parse_rate_limits(headers.get(limit_header))
+            if limits:
+                bucket.update_limits(limits)
+                bucket.sync_counts(parse_rate_limits(headers.get(count_header)), now)
+
+    async def _get(self, routing, path, method, params, raw):
+        url = self.host_template.format(routing=routing) + path
+        session = self._get_session()
+        retries = 0
+        while True:
+            await self._acquire(routing, method)
+            async with session.get(url, params=params) as response:
+                self._update_from_headers(routing, method, response.headers)
+
+                if response.status == 200:
+                    data = await response.read() if raw else await response.json()
+                    return response.status, data
+
+                if retries >= self.max_retries:
+                    print(f"[RIOT] Max retries reached for {method} ({response.status})")
+                    return response.status, None
+
+                if response.status == 429:
+                    retries += 1
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    limit_type = response.headers.get("X-Rate-Limit-Type", "service")
+                    if retry_after is None:
+                        # Underlying service throttling (or a Retry-After we can't read): back off this call only
+                        self._notify_wait(routing, method, 2 ** retries, "backoff")
+                        await asyncio.sleep(2 ** retries)
+                        continue
+                    # App/method limit exceeded: pause the shared bucket for everyone
+                    app_bucket, method_bucket = self._buckets(routing, method)
+                    bucket = app_bucket if limit_type == "application" else method_bucket
+                    bucket.block(retry_after, time.monotonic())
+                    print(f"[RIOT] {limit_type} rate limit hit on {method}, pausing {retry_after:g}s")
+                    self._notify_wait(routing, method, retry_after, "retry_after")
+                    continue
+
+                if response.status in {500, 502, 503, 504}:
+                    retries += 1
+                    self._notify_wait(routing, method, 2 ** retries, "backoff")
+                    await asyncio.sleep(2 ** retries)  # Exponential backoff
+                    continue
+
+                return response.status, None
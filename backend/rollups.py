@@ -0,0 +1,195 @@
+"""
+Per-player running totals maintained at ingest time (PostgreSQL).
+
+player_rollup holds a StatsAccumulator snapshot of everything except the monthly
+buckets, which live one row per month in player_month_rollup. New Match rows are
+merged in by the same transaction that inserts them, so /get-stats and
+/generate-recap read one rollup row (plus one per month) however many matches a
+player has.
+
+A player's rollup is built from their Match rows the first time it is read; until
+then ingest leaves it alone. Both paths hold a per-player advisory lock, so a build
+can't miss rows that another transaction is about to commit.
+
+timeline_rollup does the same for MatchTimelineSummary rows with a
+TimelineAccumulator, for /get-timeline-stats, including the binned kill heatmap
+(rebuilt if the grid size changes).
+"""
+import json
+from types import SimpleNamespace
+
+from stats_accumulator import StatsAccumulator
+from timeline_accumulator import TimelineAccumulator
+
+# First key of pg_advisory_xact_lock(int, int), one per rollup table; the second is hashtext(puuid)
+LOCK_SPACE = 7301
+TIMELINE_LOCK_SPACE = 7302
+MONTH_STATE = ("month_sums", "monthly_roles", "monthly_champions")
+
+UPSERT_ROLLUP_SQL = """
+    INSERT INTO player_rollup (puuid, timezone, matches, state, updated_at)
+    VALUES (%s, %s, %s, %s, now())
+    ON CONFLICT (puuid) DO UPDATE SET
+        timezone = EXCLUDED.timezone, matches = EXCLUDED.matches,
+        state = EXCLUDED.state, updated_at = EXCLUDED.updated_at
+"""
+
+UPSERT_MONTH_SQL = """
+    INSERT INTO player_month_rollup (puuid, month, sums, roles, champions)
+    VALUES (%s, %s, %s, %s, %s)
+    ON CONFLICT (puuid, month) DO UPDATE SET
+        sums = EXCLUDED.sums, roles = EXCLUDED.roles, champions = EXCLUDED.champions
+"""
+
+UPSERT_TIMELINE_SQL = """
+    INSERT INTO timeline_rollup (puuid, matches, state, updated_at)
+    VALUES (%s, %s, %s, now())
+    ON CONFLICT (puuid) DO UPDATE SET
+        matches = EXCLUDED.matches, state = EXCLUDED.state, updated_at = EXCLUDED.updated_at
+"""
+
+
+def lock_players(cursor, puuids, space=LOCK_SPACE):
+    """Hold the rollup locks for `puuids` until the transaction ends (taken in a fixed order)."""
+    cursor.execute(
+        "SELECT pg_advisory_xact_lock(%s, hashtext(puuid)) "
+        "FROM (SELECT DISTINCT unnest(%s::text[]) AS puuid ORDER BY 1) AS players",
+        (space, list(puuids)),
+    )
+
+
+def read_rollup(cursor, puuid, timezone, months=None):
+    """
+    Return the stored StatsAccumulator for `puuid`, or None if it has no rollup
+    bucketed in `timezone`. `months` limits which monthly buckets are loaded.
+    """
+    cursor.execute("SELECT timezone, state FROM player_rollup WHERE puuid = %s", (puuid,))
+    found = cursor.fetchone()
+    if found is None or found[0] != timezone:
+        return None
+    acc = StatsAccumulator.from_state(found[1])
+
+    if months is None:
+        cursor.execute("SELECT month, sums, roles, champions FROM player_month_rollup WHERE puuid = %s", (puuid,))
+    else:
+        cursor.execute(
+            "SELECT month, sums, roles, champions FROM player_month_rollup WHERE puuid = %s AND month = ANY(%s)",
+            (puuid, list(months)),
+        )
+    for month, sums, roles, champions in cursor.fetchall():
+        acc.month_sums[month] = sums
+        acc.monthly_roles[month] = roles
+        acc.monthly_champions[month] = champions
+    return acc
+
+
+def write_rollup(cursor, puuid, acc, months=None):
+    """Store `acc` as the rollup for `puuid`, writing only `months` of its monthly buckets if given."""
+    state = {key: value for key, value in acc.to_state().items() if key not in MONTH_STATE}
+    cursor.execute(UPSERT_ROLLUP_SQL, (puuid, acc.timezone, acc.total_matches, json.dumps(state)))
+    for month in (acc.month_sums if months is None else months):
+        cursor.execute(UPSERT_MONTH_SQL, (
+            puuid, month,
+            json.dumps(acc.month_sums[month]),
+            json.dumps(acc.monthly_roles.get(month, {})),
+            json.dumps(acc.monthly_champions.get(month, {})),
+        ))
+
+
+def build_rollup(cursor, puuid, acc):
+    """Replace the rollup for `puuid` with `acc`, a full aggregate of their Match rows."""
+    cursor.execute("DELETE FROM player_month_rollup WHERE puuid = %s", (puuid,))
+    write_rollup(cursor, puuid, acc)
+
+
+def merge_new_matches(cursor, matches, timezone):
+    """
+    Fold freshly inserted Match rows into the rollups of their players. Players
+    without a rollup (in `timezone`) are skipped; theirs is built on first read.
+
+    Call in the inserting transaction, after the insert. Returns the number of
+    rollups updated.
+    """
+    deltas = {}
+    for match in matches:
+        deltas.setdefault(match.puuid, StatsAccumulator(timezone=timezone)).add(match)
+    if not deltas:
+        return 0
+
+    lock_players(cursor, deltas)
+    cursor.execute(
+        "SELECT puuid FROM player_rollup WHERE puuid = ANY(%s) AND timezone = %s",
+        (list(deltas), timezone),
+    )
+    updated = 0
+    for (puuid,) in cursor.fetchall():
+        delta = deltas[puuid]
+        acc = read_rollup(cursor, puuid, timezone, months=delta.month_sums)
+        write_rollup(cursor, puuid, acc.merge(delta), months=delta.month_sums)
+        updated += 1
+    return updated
+
+
+# --- Timeline summaries -------------------------------------------------------------------------
+
+def read_timeline_rollup(cursor, puuid, grid_size):
+    """Return the stored TimelineAccumulator for `puuid`, or None if it has no rollup on a `grid_size` grid."""
+    cursor.execute("SELECT state FROM timeline_rollup WHERE puuid = %s", (puuid,))
+    found = cursor.fetchone()
+    if found is None or found[0].get("grid_size") != grid_size:
+        return None
+    return TimelineAccumulator.from_state(found[0])
+
+
+def write_timeline_rollup(cursor, puuid, acc):
+    cursor.execute(UPSERT_TIMELINE_SQL, (puuid, acc.total_matches, json.dumps(acc.to_state())))
+
+
+def aggregate_timeline_summaries(cursor, puuid, grid_size):
+    """Build a TimelineAccumulator from every stored timeline summary of `puuid`."""
+    cursor.execute("SELECT * FROM match_timeline_summary WHERE puuid = %s", (puuid,))
+    columns = [column.name for column in cursor.description]
+    return TimelineAccumulator(grid_size).add_all(SimpleNamespace(**dict(zip(columns, row))) for row in cursor)
+
+
+def build_timeline_rollup(cursor, puuid, grid_size):
+    """(Re)build and store the timeline rollup for `puuid`; returns it."""
+    acc = aggregate_timeline_summaries(cursor, puuid, grid_size)
+    write_timeline_rollup(cursor, puuid, acc)
+    return acc
+
+
+def merge_new_summaries(cursor, summaries, grid_size):
+    """
+    Fold freshly written timeline summaries (dicts) into their players' timeline
+    rollups. Players without one are skipped; theirs is built on first read.
+
+    Summaries may be upserts: if any of a player's rows replaced an existing summary
+    (stored count != rollup count + new rows), that rollup is rebuilt from the table
+    instead, so reprocessed games aren't counted twice; so is one binned on a
+    different grid. Call in the writing transaction, after the write. Returns the
+    number of rollups updated.
+    """
+    deltas = {}
+    for summary in summaries:
+        row = SimpleNamespace(**summary) if isinstance(summary, dict) else summary
+        deltas.setdefault(row.puuid, TimelineAccumulator(grid_size)).add(row)
+    if not deltas:
+        return 0
+
+    lock_players(cursor, deltas, TIMELINE_LOCK_SPACE)
+    cursor.execute("""
+        SELECT r.puuid, r.matches, r.state,
+               (SELECT COUNT(*) FROM match_timeline_summary s WHERE s.puuid = r.puuid) AS stored
+        FROM timeline_rollup r
+        WHERE r.puuid = ANY(%s)
+    """, (list(deltas),))
+    updated = 0
+    for puuid, matches, state, stored in cursor.fetchall():
+        delta = deltas[puuid]
+        if matches + delta.total_matches == stored and state.get("grid_size") == grid_size:
+            write_timeline_rollup(cursor, puuid, TimelineAccumulator.from_state(state).merge(delta))
+        else:
+            build_timeline_rollup(cursor, puuid, grid_size)
+        updated += 1
+    return updated
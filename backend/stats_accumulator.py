@@ -0,0 +1,258 @@
+"""Single-pass aggregation of Match rows into the /get-stats and /generate-recap analytics."""
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from accumulator import Accumulator, bump, merge_counts
+
+SHARE_KEYS = ("damage_share", "gold_share", "vision_share", "kp")
+ROLE_SUM_KEYS = ("kills", "deaths", "assists", "damage", "cs", "kp")
+MONTH_SUM_KEYS = (
+    "matches", "wins", "total_kills", "total_deaths", "total_assists", "total_cs",
+    "total_duration", "total_kp", "total_damage_share", "total_gold_share",
+)
+
+
+def kda(match):
+    return (match.kills + match.assists) / match.deaths if match.deaths > 0 else match.kills + match.assists
+
+
+def cs_per_min(match):
+    return (match.cs + match.neutral_cs) / (match.duration / 60) if match.duration > 0 else 0
+
+
+def match_month(timestamp, timezone=None):
+    """Bucket a gameStartTimestamp (ms) into a "YYYY-MM" month in `timezone` (server local time if None)."""
+    tz = ZoneInfo(timezone) if timezone else None
+    return datetime.fromtimestamp(timestamp / 1000, tz).strftime("%Y-%m")
+
+
+def _game_ref(match):
+    return {"match_id": match.id, "champion": match.champion, "role": match.role}
+
+
+# name -> (max or min, sort key, fields reported alongside match_id/champion/role)
+EXTREMES = {
+    "highest_kill_game": (max, lambda m: m.kills, lambda m: {"kills": m.kills}),
+    "highest_death_game": (max, lambda m: m.deaths, lambda m: {"deaths": m.deaths}),
+    "highest_assist_game": (max, lambda m: m.assists, lambda m: {"assists": m.assists}),
+    "highest_damage_game": (max, lambda m: m.damage, lambda m: {"damage": m.damage}),
+    "highest_damage_taken_game": (max, lambda m: m.damage_taken, lambda m: {"damage_taken": m.damage_taken}),
+    "highest_cs_game": (max, lambda m: m.cs + m.neutral_cs, lambda m: {"cs": m.cs + m.neutral_cs}),
+    "highest_cs_per_min_game": (max, cs_per_min, lambda m: {"cs_per_min": round(cs_per_min(m), 2)}),
+    "best_kda_game": (max, kda, lambda m: {
+        "kda": round(kda(m), 2), "kills": m.kills, "deaths": m.deaths, "assists": m.assists
+    }),
+    "worst_kda_game": (min, kda, lambda m: {
+        "kda": round(kda(m), 2), "kills": m.kills, "deaths": m.deaths, "assists": m.assists
+    }),
+    "fastest_game": (min, lambda m: m.duration, lambda m: {"duration": m.duration}),
+    "longest_game": (max, lambda m: m.duration, lambda m: {"duration": m.duration}),
+}
+
+
+class StatsAccumulator(Accumulator):
+    """
+    Running totals for a player's matches (see Accumulator for merge() and state).
+
+    Every /get-stats section (profile totals, impact shares, role performance and
+    impact, extreme games, monthly buckets) is derived from these totals, so a
+    player's whole history is walked once.
+
+        acc = StatsAccumulator()
+        for match in Match.query.filter_by(puuid=puuid):
+            acc.add(match)
+        acc.core_averages()
+    """
+
+    EXTREMES = EXTREMES
+
+    def __init__(self, timezone=None):
+        super().__init__()
+        self.timezone = timezone  # IANA name used for monthly buckets
+        self.total_wins = 0
+        self.total_kills = 0
+        self.total_deaths = 0
+        self.total_assists = 0
+        self.champion_count = {}
+        self.game_mode_count = {}
+
+        # Per-match ratios summed across matches (0 when the team total is 0)
+        self.total_kp = 0
+        self.total_damage_share = 0
+        self.total_gold_share = 0
+        self.total_vision_share = 0
+        self.total_cs_per_min = 0
+
+        self.role_count = {}
+        self.role_sums = {}    # role -> ROLE_SUM_KEYS totals
+        self.role_shares = {}  # role -> SHARE_KEYS totals, only for roles with a non-zero team total
+
+        self.month_sums = {}   # month -> MONTH_SUM_KEYS totals
+        self.monthly_roles = {}
+        self.monthly_champions = {}
+
+    def add(self, match):
+        kp = (match.kills + match.assists) / match.team_kills if match.team_kills > 0 else 0
+        damage_share = match.damage / match.team_damage if match.team_damage > 0 else 0
+        gold_share = match.gold / match.team_gold if match.team_gold > 0 else 0
+        vision_share = match.vision / match.team_vision if match.team_vision > 0 else 0
+        total_cs = match.cs + match.neutral_cs
+
+        self.total_matches += 1
+        self.total_wins += 1 if match.win else 0
+        self.total_kills += match.kills
+        self.total_deaths += match.deaths
+        self.total_assists += match.assists
+        bump(self.champion_count, match.champion)
+        bump(self.game_mode_count, match.game_mode)
+
+        self.total_kp += kp
+        self.total_damage_share += damage_share
+        self.total_gold_share += gold_share
+        self.total_vision_share += vision_share
+        self.total_cs_per_min += cs_per_min(match)
+
+        # Role breakdown
+        role = match.role
+        bump(self.role_count, role)
+        sums = self.role_sums.setdefault(role, dict.fromkeys(ROLE_SUM_KEYS, 0.0))
+        sums["kills"] += match.kills
+        sums["deaths"] += match.deaths
+        sums["assists"] += match.assists
+        sums["damage"] += match.damage
+        sums["cs"] += total_cs
+        sums["kp"] += kp
+
+        # Role impact only averages shares whose team total was non-zero
+        present = {
+            "damage_share": match.team_damage > 0,
+            "gold_share": match.team_gold > 0,
+            "vision_share": match.team_vision > 0,
+            "kp": match.team_kills > 0,
+        }
+        if any(present.values()):
+            shares = self.role_shares.setdefault(role, dict.fromkeys(SHARE_KEYS, 0.0))
+            for key, value in (("damage_share", damage_share), ("gold_share", gold_share),
+                               ("vision_share", vision_share), ("kp", kp)):
+                if present[key]:
+                    shares[key] += value
+
+        # Extreme games
+        for name, (_, value_of, fields_of) in EXTREMES.items():
+            value = value_of(match)
+            if self._beats(name, value):
+                self.extremes[name] = [value, {**_game_ref(match), **fields_of(match)}]
+
+        # Monthly buckets
+        month = match_month(match.timestamp, self.timezone)
+        if month not in self.month_sums:
+            self.month_sums[month] = dict.fromkeys(MONTH_SUM_KEYS, 0)
+            self.monthly_roles[month] = {}
+            self.monthly_champions[month] = {}
+        bucket = self.month_sums[month]
+        bucket["matches"] += 1
+        bucket["wins"] += 1 if match.win else 0
+        bucket["total_kills"] += match.kills
+        bucket["total_deaths"] += match.deaths
+        bucket["total_assists"] += match.assists
+        bucket["total_cs"] += total_cs
+        bucket["total_duration"] += match.duration
+        bucket["total_kp"] += kp
+        bucket["total_damage_share"] += damage_share
+        bucket["total_gold_share"] += gold_share
+        bump(self.monthly_roles[month], role)
+        bump(self.monthly_champions[month], match.champion)
+
+    def merge(self, other):
+        """Fold in totals for a disjoint set of matches."""
+        super().merge(other)
+        for attr in ("total_matches", "total_wins", "total_kills", "total_deaths", "total_assists",
+                     "total_kp", "total_damage_share", "total_gold_share", "total_vision_share",
+                     "total_cs_per_min"):
+            setattr(self, attr, getattr(self, attr) + getattr(other, attr))
+        merge_counts(self.champion_count, other.champion_count)
+        merge_counts(self.game_mode_count, other.game_mode_count)
+        merge_counts(self.role_count, other.role_count)
+        for role, sums in other.role_sums.items():
+            merge_counts(self.role_sums.setdefault(role, dict.fromkeys(ROLE_SUM_KEYS, 0.0)), sums)
+        for role, shares in other.role_shares.items():
+            merge_counts(self.role_shares.setdefault(role, dict.fromkeys(SHARE_KEYS, 0.0)), shares)
+        for month, sums in other.month_sums.items():
+            merge_counts(self.month_sums.setdefault(month, dict.fromkeys(MONTH_SUM_KEYS, 0)), sums)
+            merge_counts(self.monthly_roles.setdefault(month, {}), other.monthly_roles.get(month, {}))
+            merge_counts(self.monthly_champions.setdefault(month, {}), other.monthly_champions.get(month, {}))
+        return self
+
+    # --- Derived sections -------------------------------------------------------------------
+
+    @property
+    def win_rate(self):
+        return (self.total_wins / self.total_matches) * 100 if self.total_matches else 0
+
+    def most_played_champion(self):
+        return max(self.champion_count, key=self.champion_count.get, default="Unknown")
+
+    def core_averages(self):
+        n = self.total_matches
+        return {
+            "kills": round(self.total_kills / n, 2) if n else 0,
+            "deaths": round(self.total_deaths / n, 2) if n else 0,
+            "assists": round(self.total_assists / n, 2) if n else 0,
+            "cs_per_min": round(self.total_cs_per_min / n, 2) if n else 0,
+        }
+
+    def impact_stats(self):
+        n = self.total_matches
+        return {
+            "kill_participation": round((self.total_kp / n) * 100, 2) if n else 0,
+            "damage_share": round((self.total_damage_share / n) * 100, 2) if n else 0,
+            "gold_share": round((self.total_gold_share / n) * 100, 2) if n else 0,
+            "vision_share": round((self.total_vision_share / n) * 100, 2) if n else 0,
+        }
+
+    def role_performance(self):
+        performance = {}
+        for role, sums in self.role_sums.items():
+            count = self.role_count[role]
+            performance[role] = {
+                **sums,
+                "avg_kills": round(sums["kills"] / count, 2),
+                "avg_deaths": round(sums["deaths"] / count, 2),
+                "avg_assists": round(sums["assists"] / count, 2),
+                "avg_damage": round(sums["damage"] / count, 2),
+                "avg_cs": round(sums["cs"] / count, 2),
+                "avg_kp": round((sums["kp"] / count) * 100, 2),
+            }
+        return performance
+
+    def role_impact_stats(self):
+        impact = {}
+        for role, shares in self.role_shares.items():
+            count = self.role_count[role]
+            impact[role] = {
+                **shares,
+                "avg_damage_share": round((shares["damage_share"] / count) * 100, 2),
+                "avg_gold_share": round((shares["gold_share"] / count) * 100, 2),
+                "avg_vision_share": round((shares["vision_share"] / count) * 100, 2),
+                "avg_kp": round((shares["kp"] / count) * 100, 2),
+            }
+        return impact
+
+    def monthly_stats(self):
+        monthly = {}
+        for month, sums in self.month_sums.items():
+            count = sums["matches"]
+            monthly[month] = {
+                "matches": count,
+                "wins": sums["wins"],
+                "winrate": round((sums["wins"] / count) * 100, 2),
+                "avg_kills": round(sums["total_kills"] / count, 2),
+                "avg_deaths": round(sums["total_deaths"] / count, 2),
+                "avg_assists": round(sums["total_assists"] / count, 2),
+                "avg_cs_per_min": round((sums["total_cs"] / count) / ((sums["total_duration"] / count) / 60), 2)
+                if sums["total_duration"] > 0 else 0,
+                "avg_kp": round((sums["total_kp"] / count) * 100, 2),
+                "avg_damage_share": round((sums["total_damage_share"] / count) * 100, 2),
+                "avg_gold_share": round((sums["total_gold_share"] / count) * 100, 2),
+            }
+        return monthly
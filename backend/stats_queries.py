@@ -0,0 +1,137 @@
+"""
+Grouped SQL for the /get-stats analytics (PostgreSQL).
+
+Instead of hydrating every Match row, Postgres returns per-(role, month) and
+per-(champion, month) aggregates plus one row per extreme game, and those are
+folded into a StatsAccumulator. Reads stay proportional to the number of
+roles/champions/months a player has, not the number of games.
+"""
+from sqlalchemy import text
+
+from stats_accumulator import EXTREMES, MONTH_SUM_KEYS, ROLE_SUM_KEYS, SHARE_KEYS, StatsAccumulator
+
+# Shared SQL expressions; ratios are 0 when the team total is 0, matching StatsAccumulator.add
+MONTH = "to_char(to_timestamp(timestamp / 1000.0) AT TIME ZONE :tz, 'YYYY-MM')"
+KP = "CASE WHEN team_kills > 0 THEN (kills + assists)::float8 / team_kills ELSE 0 END"
+DAMAGE_SHARE = "CASE WHEN team_damage > 0 THEN damage::float8 / team_damage ELSE 0 END"
+GOLD_SHARE = "CASE WHEN team_gold > 0 THEN gold::float8 / team_gold ELSE 0 END"
+VISION_SHARE = "CASE WHEN team_vision > 0 THEN vision::float8 / team_vision ELSE 0 END"
+CS_PER_MIN = "CASE WHEN duration > 0 THEN (cs + neutral_cs) / (duration / 60.0::float8) ELSE 0 END"
+KDA = "CASE WHEN deaths > 0 THEN (kills + assists)::float8 / deaths ELSE kills + assists END"
+
+ROLE_MONTH_SQL = text(f"""
+    SELECT role, {MONTH} AS month,
+           COUNT(*) AS matches,
+           COUNT(*) FILTER (WHERE win) AS wins,
+           SUM(kills) AS kills, SUM(deaths) AS deaths, SUM(assists) AS assists,
+           SUM(damage) AS damage, SUM(cs + neutral_cs) AS cs, SUM(duration) AS duration,
+           SUM({KP}) AS kp,
+           SUM({DAMAGE_SHARE}) AS damage_share,
+           SUM({GOLD_SHARE}) AS gold_share,
+           SUM({VISION_SHARE}) AS vision_share,
+           SUM({CS_PER_MIN}) AS cs_per_min,
+           COUNT(*) FILTER (
+               WHERE team_damage > 0 OR team_gold > 0 OR team_vision > 0 OR team_kills > 0
+           ) AS with_team_totals
+    FROM match
+    WHERE puuid = :puuid
+    GROUP BY role, month
+""")
+
+CHAMPION_MONTH_SQL = text(f"""
+    SELECT champion, {MONTH} AS month, COUNT(*) AS matches
+    FROM match
+    WHERE puuid = :puuid
+    GROUP BY champion, month
+""")
+
+GAME_MODE_SQL = text("""
+    SELECT game_mode, COUNT(*) AS matches
+    FROM match
+    WHERE puuid = :puuid
+    GROUP BY game_mode
+""")
+
+# name -> ORDER BY expression; direction comes from EXTREMES (max -> DESC, min -> ASC)
+EXTREME_ORDER = {
+    "highest_kill_game": "kills",
+    "highest_death_game": "deaths",
+    "highest_assist_game": "assists",
+    "highest_damage_game": "damage",
+    "highest_damage_taken_game": "damage_taken",
+    "highest_cs_game": "cs + neutral_cs",
+    "highest_cs_per_min_game": CS_PER_MIN,
+    "best_kda_game": KDA,
+    "worst_kda_game": KDA,
+    "fastest_game": "duration",
+    "longest_game": "duration",
+}
+
+EXTREMES_SQL = text(" UNION ALL ".join(
+    f"""(SELECT '{name}' AS name, id, champion, role, kills, deaths, assists, damage,
+                damage_taken, cs, neutral_cs, duration
+         FROM match
+         WHERE puuid = :puuid
+         ORDER BY {order} {"DESC" if EXTREMES[name][0] is max else "ASC"}, timestamp
+         LIMIT 1)"""
+    for name, order in EXTREME_ORDER.items()
+))
+
+
+def aggregate_player_stats(session, puuid, timezone="UTC"):
+    """Build a StatsAccumulator for every Match row of `puuid` from grouped SQL."""
+    params = {"puuid": puuid, "tz": timezone}
+    acc = StatsAccumulator(timezone=timezone)
+
+    for row in session.execute(ROLE_MONTH_SQL, params):
+        acc.total_matches += row.matches
+        acc.total_wins += row.wins
+        acc.total_kills += row.kills
+        acc.total_deaths += row.deaths
+        acc.total_assists += row.assists
+        acc.total_kp += row.kp
+        acc.total_damage_share += row.damage_share
+        acc.total_gold_share += row.gold_share
+        acc.total_vision_share += row.vision_share
+        acc.total_cs_per_min += row.cs_per_min
+
+        acc.role_count[row.role] = acc.role_count.get(row.role, 0) + row.matches
+        sums = acc.role_sums.setdefault(row.role, dict.fromkeys(ROLE_SUM_KEYS, 0.0))
+        for key in ROLE_SUM_KEYS:
+            sums[key] += float(getattr(row, key))
+        if row.with_team_totals:
+            shares = acc.role_shares.setdefault(row.role, dict.fromkeys(SHARE_KEYS, 0.0))
+            for key in SHARE_KEYS:
+                shares[key] += getattr(row, key)
+
+        bucket = acc.month_sums.setdefault(row.month, dict.fromkeys(MONTH_SUM_KEYS, 0))
+        bucket["matches"] += row.matches
+        bucket["wins"] += row.wins
+        bucket["total_kills"] += row.kills
+        bucket["total_deaths"] += row.deaths
+        bucket["total_assists"] += row.assists
+        bucket["total_cs"] += row.cs
+        bucket["total_duration"] += row.duration
+        bucket["total_kp"] += row.kp
+        bucket["total_damage_share"] += row.damage_share
+        bucket["total_gold_share"] += row.gold_share
+        roles = acc.monthly_roles.setdefault(row.month, {})
+        roles[row.role] = roles.get(row.role, 0) + row.matches
+
+    for row in session.execute(CHAMPION_MONTH_SQL, params):
+        acc.champion_count[row.champion] = acc.champion_count.get(row.champion, 0) + row.matches
+        champions = acc.monthly_champions.setdefault(row.month, {})
+        champions[row.champion] = row.matches
+
+    for row in session.execute(GAME_MODE_SQL, params):
+        acc.game_mode_count[row.game_mode] = row.matches
+
+    if acc.total_matches:
+        for row in session.execute(EXTREMES_SQL, params):
+            _, value_of, fields_of = EXTREMES[row.name]
+            acc.extremes[row.name] = [
+                value_of(row),
+                {"match_id": row.id, "champion": row.champion, "role": row.role, **fields_of(row)},
+            ]
+
+    return acc
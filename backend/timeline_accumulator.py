@@ -0,0 +1,142 @@
+"""Single-pass aggregation of MatchTimelineSummary rows into the /get-timeline-stats insights."""
+from accumulator import Accumulator, merge_counts
+from heatmap import DEFAULT_GRID_SIZE, bin_positions, heatmap, to_cells
+
+SCORE_KEYS = ("early_dominance_score", "midgame_swing_score", "consistency_score",
+              "roam_score", "biggest_spike", "biggest_throw")
+LEVEL_KEYS = ("level_6_timestamp", "level_11_timestamp", "level_16_timestamp")
+OBJECTIVE_KEYS = ("dragon", "baron", "herald", "tower", "inhibitor")
+
+# name -> (max or min, summary column, key the value is reported under)
+EXTREMES = {
+    "best_spike_game": (max, "biggest_spike", "spike"),
+    "worst_throw_game": (min, "biggest_throw", "throw"),
+}
+
+
+class TimelineAccumulator(Accumulator):
+    """
+    Running totals for a player's timeline summaries (see Accumulator for merge()
+    and state). Kill positions are kept only as counts on a grid_size x grid_size
+    heatmap (see heatmap.py).
+    """
+
+    EXTREMES = EXTREMES
+
+    def __init__(self, grid_size=DEFAULT_GRID_SIZE):
+        super().__init__()
+        self.grid_size = grid_size
+        self.score_sums = dict.fromkeys(SCORE_KEYS, 0.0)  # None/0 scores add nothing
+        self.level_sums = dict.fromkeys(LEVEL_KEYS, 0)
+        self.level_counts = dict.fromkeys(LEVEL_KEYS, 0)  # games that reached each level
+        self.comeback_counts = {}
+        self.objectives = dict.fromkeys(OBJECTIVE_KEYS, 0)
+        self.kill_cells = {}  # "x_cell,y_cell" -> kills
+
+    def add(self, summary):
+        self.total_matches += 1
+        for key in SCORE_KEYS:
+            self.score_sums[key] += getattr(summary, key) or 0
+        for key in LEVEL_KEYS:
+            value = getattr(summary, key)
+            if value:
+                self.level_sums[key] += value
+                self.level_counts[key] += 1
+        self.comeback_counts[summary.comeback_type] = self.comeback_counts.get(summary.comeback_type, 0) + 1
+        for obj, count in (summary.objective_presence or {}).items():
+            if obj in self.objectives:
+                self.objectives[obj] += count
+        if summary.kill_positions:
+            for x, y, count in to_cells(bin_positions(summary.kill_positions, self.grid_size)):
+                key = f"{x},{y}"
+                self.kill_cells[key] = self.kill_cells.get(key, 0) + count
+
+        for name, (_, column, label) in EXTREMES.items():
+            value = getattr(summary, column) or 0
+            if self._beats(name, value):
+                self.extremes[name] = [value, {
+                    "match_id": summary.match_id,
+                    label: getattr(summary, column),
+                    "early_dominance": summary.early_dominance_score,
+                    "comeback_type": summary.comeback_type,
+                }]
+
+    def merge(self, other):
+        """Fold in totals for a disjoint set of summaries."""
+        super().merge(other)
+        self.total_matches += other.total_matches
+        for into, more in ((self.score_sums, other.score_sums), (self.level_sums, other.level_sums),
+                           (self.level_counts, other.level_counts), (self.comeback_counts, other.comeback_counts),
+                           (self.objectives, other.objectives), (self.kill_cells, other.kill_cells)):
+            merge_counts(into, more)
+        return self
+
+    # --- Derived sections -------------------------------------------------------------------
+
+    def _average(self, key):
+        return self.score_sums[key] / self.total_matches if self.total_matches else 0
+
+    def _level_average(self, key):
+        return self.level_sums[key] / self.level_counts[key] if self.level_counts[key] else 0
+
+    def average_insights(self):
+        insights = {
+            "early_dominance": round(self._average("early_dominance_score"), 2),
+            "midgame_swing": round(self._average("midgame_swing_score"), 2),
+            "consistency_score": round(self._average("consistency_score"), 2),
+            "roam_score": round(self._average("roam_score"), 2),
+            "biggest_spike": round(self._average("biggest_spike"), 2),
+            "biggest_throw": round(self._average("biggest_throw"), 2),
+        }
+        for key, label in zip(LEVEL_KEYS, ("avg_level6_time", "avg_level11_time", "avg_level16_time")):
+            average = self._level_average(key)
+            insights[label] = round(average / 1000, 2) if average else 0  # Convert to seconds
+        return insights
+
+    def playstyle_identity(self):
+        avg_early_dom = self._average("early_dominance_score")
+        avg_consistency = self._average("consistency_score")
+        avg_roam = self._average("roam_score")
+
+        early_label = "neutral early"
+        if avg_early_dom > 100:
+            early_label = "strong early"
+        elif avg_early_dom < -100:
+            early_label = "weak early"
+
+        consistency_label = "moderately consistent"
+        if avg_consistency > 70:
+            consistency_label = "stable"
+        elif avg_consistency < 40:
+            consistency_label = "coinflip"
+
+        roam_label = "moderate roamer"
+        if avg_roam > 3.5:
+            roam_label = "heavy roamer"
+        elif avg_roam < 1.5:
+            roam_label = "lane anchored"
+
+        return {
+            "early_game": early_label,
+            "consistency": consistency_label,
+            "roaming": roam_label,
+            "risk_profile": "high impact"
+            if self._average("biggest_spike") > abs(self._average("biggest_throw")) else "high risk",
+        }
+
+    def comeback_pattern(self):
+        counts = self.comeback_counts
+        return {
+            "comeback_wins": counts.get("comeback", 0),
+            "throws": counts.get("throw", 0),
+            "dominant_wins": counts.get("dominated", 0),
+            "fell_behind_losses": counts.get("fell_behind", 0),
+            "neutral_games": counts.get("neutral", 0),
+        }
+
+    def objective_totals(self):
+        return dict(self.objectives)
+
+    def kill_heatmap(self):
+        cells = [[*map(int, key.split(",")), count] for key, count in self.kill_cells.items()]
+        return heatmap(cells, self.grid_size)
@@ -0,0 +1,399 @@
+"""
+Turns a Riot match-v5 timeline into MatchTimelineSummary fields.
+
+The per-player summary is one pass over the frames in plain Python: it reads a
+few dozen values per match, where NumPy's per-call overhead costs more than the
+loop (see benchmarks/timeline_lookup.py). frame_rows(), which computes diffs for
+every participant against every enemy in every frame, is vectorized with NumPy.
+Nothing here touches Flask or the database, so the same code runs inside
+/process-timelines and in offline batch jobs over stored payloads:
+
+    python timeline_features.py payload_cache <puuid>
+"""
+import json
+import os
+import sys
+
+import numpy as np
+
+EARLY_GAME_END = 600000   # 10 minutes, in ms
+MID_GAME_END = 1200000    # 20 minutes, in ms
+ROAM_DISTANCE = 3000      # Map units between frames that count as a significant move
+
+# participantFrames fields stored per frame in match_timeline, in column order
+FRAME_FIELDS = ("totalGold", "xp", "minionsKilled", "jungleMinionsKilled", "level", "timeEnemySpentControlled")
+# Timeline events stored in match_events
+STORED_EVENT_TYPES = ("CHAMPION_KILL", "ELITE_MONSTER_KILL", "BUILDING_KILL")
+
+
+def build_team_lookup(participants_meta, participants):
+    """
+    Return a list indexed by participantId holding each participant's teamId.
+
+    `participants_meta` is the timeline's info.participants (participantId -> puuid)
+    and `participants` is a list of {"puuid", "teamId"} dicts. Building this once per
+    match turns every "which team is this pid on?" question into a list index.
+    """
+    team_by_puuid = {p.get("puuid"): p.get("teamId") for p in participants}
+    size = max((p["participantId"] for p in participants_meta), default=0) + 1
+    team_of = [None] * size
+    for p in participants_meta:
+        team_of[p["participantId"]] = team_by_puuid.get(p["puuid"])
+    return team_of
+
+
+def summarize_timeline(timeline, puuid, participants, match_id=None, duration=None):
+    """
+    Compute the MatchTimelineSummary fields for `puuid` from a timeline payload.
+
+    `participants` gives team membership as [{"puuid", "teamId"}]. Returns None when
+    the timeline is unusable (missing info, player not in the match, no gold data).
+    """
+    info = timeline.get("info", {})
+    if not info:
+        print(f"[TIMELINE] ERROR: No 'info' key in timeline for {match_id}")
+        return None
+
+    participants_meta = info.get("participants", [])
+    if not participants_meta:
+        print(f"[TIMELINE] ERROR: No participants metadata for {match_id}")
+        return None
+
+    my_pid = next((p["participantId"] for p in participants_meta if p["puuid"] == puuid), None)
+    if not my_pid:
+        print(f"[TIMELINE] ERROR: Player PUUID {puuid} not found in match {match_id}")
+        return None
+
+    team_of = build_team_lookup(participants_meta, participants)
+    my_team_id = team_of[my_pid]
+    # Enemy participantIds as frame keys, resolved once for every frame
+    enemy_keys = [
+        str(pid) for pid in range(1, len(team_of))
+        if pid != my_pid and my_team_id and team_of[pid] is not None and team_of[pid] != my_team_id
+    ]
+    my_key = str(my_pid)
+
+    # Process frames
+    frames = info.get("frames", [])
+    gold_diffs = []
+    level_6_time = None
+    level_11_time = None
+    level_16_time = None
+    positions = []
+
+    for frame in frames:
+        ts = frame.get("timestamp", 0)
+        pf_all = frame.get("participantFrames", {})
+        if not pf_all:
+            continue
+
+        pf = pf_all.get(my_key)
+        if not pf:
+            continue
+
+        # Track level milestones
+        level = pf.get("level", 1)
+        if level >= 6 and level_6_time is None:
+            level_6_time = ts
+        if level >= 11 and level_11_time is None:
+            level_11_time = ts
+        if level >= 16 and level_16_time is None:
+            level_16_time = ts
+
+        # Calculate gold diff against the enemy team average
+        my_gold = int(pf.get("totalGold", 0))
+        enemy_golds = [int(pf_all[key].get("totalGold", 0)) for key in enemy_keys if pf_all.get(key)]
+        if enemy_golds:
+            avg_enemy_gold = sum(enemy_golds) // len(enemy_golds)
+            gold_diffs.append((ts, my_gold - avg_enemy_gold))
+
+        # Track position for roam score
+        pos = pf.get("position", {})
+        if pos.get("x") is not None and pos.get("y") is not None:
+            positions.append((pos.get("x"), pos.get("y")))
+
+    # Process events
+    kill_positions = []
+    objective_counts = {"dragon": 0, "baron": 0, "herald": 0, "tower": 0, "inhibitor": 0}
+
+    def on_my_team(pid):
+        return my_team_id is not None and isinstance(pid, int) and 0 < pid < len(team_of) and team_of[pid] == my_team_id
+
+    for frame in frames:
+        for event in frame.get("events", []):
+            event_type = event.get("type")
+
+            if event_type == "CHAMPION_KILL":
+                if event.get("killerId") == my_pid:
+                    pos = event.get("position", {})
+                    if pos.get("x") is not None and pos.get("y") is not None:
+                        kill_positions.append({"x": pos.get("x"), "y": pos.get("y")})
+
+            elif event_type == "ELITE_MONSTER_KILL" and on_my_team(event.get("killerId")):
+                monster_type = event.get("monsterType", "").lower()
+                if "dragon" in monster_type:
+                    objective_counts["dragon"] += 1
+                elif "baron" in monster_type:
+                    objective_counts["baron"] += 1
+                elif "herald" in monster_type or "riftherald" in monster_type:
+                    objective_counts["herald"] += 1
+
+            elif event_type == "BUILDING_KILL" and on_my_team(event.get("killerId")):
+                building_type = event.get("buildingType", "").lower()
+                if "tower" in building_type:
+                    objective_counts["tower"] += 1
+                elif "inhibitor" in building_type:
+                    objective_counts["inhibitor"] += 1
+
+    # Calculate insights
+    if not gold_diffs:
+        print(f"[TIMELINE] ERROR: No gold diffs calculated for {match_id}, cannot compute insights")
+        return None
+
+    # Early dominance (0-10 min)
+    early_diffs = [diff for ts, diff in gold_diffs if ts <= EARLY_GAME_END]
+    early_dominance = sum(early_diffs) / len(early_diffs) if early_diffs else 0
+
+    # Midgame swing (10-20 min)
+    mid_diffs = [diff for ts, diff in gold_diffs if EARLY_GAME_END < ts <= MID_GAME_END]
+    midgame_swing = max(mid_diffs) - min(mid_diffs) if len(mid_diffs) > 1 else 0
+
+    # Consistency score (variance)
+    all_diffs = [diff for ts, diff in gold_diffs]
+    mean_diff = sum(all_diffs) / len(all_diffs)
+    variance = sum((x - mean_diff) ** 2 for x in all_diffs) / len(all_diffs)
+    consistency = 100 - min(variance / 100, 100)
+
+    # Biggest spike/throw
+    deltas = [all_diffs[i] - all_diffs[i-1] for i in range(1, len(all_diffs))]
+    biggest_spike = max(deltas) if deltas else 0
+    biggest_throw = min(deltas) if deltas else 0
+
+    # Roam score (position changes)
+    roam_score = 0
+    if len(positions) > 1:
+        significant_moves = 0
+        for i in range(1, len(positions)):
+            x1, y1 = positions[i-1]
+            x2, y2 = positions[i]
+            dist = ((x2-x1)**2 + (y2-y1)**2) ** 0.5
+            if dist > ROAM_DISTANCE:
+                significant_moves += 1
+        roam_score = significant_moves / (len(positions) / 10)  # Normalize per 10 frames
+
+    # Comeback type
+    comeback_type = "neutral"
+    if early_dominance > 100 and all_diffs[-1] > 500:
+        comeback_type = "dominated"
+    elif early_dominance < -100 and all_diffs[-1] > 500:
+        comeback_type = "comeback"
+    elif early_dominance > 100 and all_diffs[-1] < -500:
+        comeback_type = "throw"
+    elif early_dominance < -100 and all_diffs[-1] < -500:
+        comeback_type = "fell_behind"
+
+    return {
+        "match_id": match_id,
+        "puuid": puuid,
+        "early_dominance_score": round(early_dominance, 2),
+        "midgame_swing_score": round(midgame_swing, 2),
+        "consistency_score": round(consistency, 2),
+        "level_6_timestamp": level_6_time,
+        "level_11_timestamp": level_11_time,
+        "level_16_timestamp": level_16_time,
+        "biggest_spike": round(biggest_spike, 2),
+        "biggest_throw": round(biggest_throw, 2),
+        "roam_score": round(roam_score, 2),
+        "kill_positions": kill_positions,
+        "objective_presence": objective_counts,
+        "comeback_type": comeback_type,
+        "duration": duration
+    }
+
+
+def participant_teams(match_participants, participants_meta):
+    """
+    Return [{"puuid", "teamId"}] for a timeline's participants.
+
+    Uses the match payload's info.participants when available; otherwise, for a
+    5v5 game (exactly 10 participants), participantIds 1-5 are team 100 and 6-10
+    team 200. Other queues (e.g. Arena's 2-player teams) can't be split by ID, so
+    their teams are left unknown (None) and the team diffs come out as 0.
+    """
+    if match_participants:
+        return [{"puuid": p.get("puuid"), "teamId": p.get("teamId")} for p in match_participants]
+    if len(participants_meta) != 10:
+        return [{"puuid": p["puuid"], "teamId": None} for p in participants_meta]
+    return [
+        {"puuid": p["puuid"], "teamId": 100 if p["participantId"] <= 5 else 200}
+        for p in participants_meta
+    ]
+
+
+def frame_rows(timeline, participants, match_id):
+    """
+    Return match_timeline rows: one per (participant, frame) for all participants.
+
+    gold_diff, xp_diff and cs_diff compare each participant with the average of the
+    enemy team in the same frame (integer floor division, like the summary gold
+    diff); cs is minions plus jungle camps. They are 0 when no enemy is present.
+    """
+    info = timeline.get("info", {})
+    participants_meta = info.get("participants", [])
+    frames = info.get("frames", [])
+    if not participants_meta or not frames:
+        return []
+
+    team_of = build_team_lookup(participants_meta, participants)
+    pids = [p["participantId"] for p in participants_meta]
+    puuids = [p["puuid"] for p in participants_meta]
+    keys = [str(pid) for pid in pids]
+
+    blank = {}
+    present, values, x, y = [], [], [], []
+    for frame in frames:
+        pf_all = frame.get("participantFrames") or blank
+        pfs = [pf_all.get(key) or blank for key in keys]
+        positions = [pf.get("position") or blank for pf in pfs]
+        present.append([bool(pf) for pf in pfs])
+        values.append([[int(pf.get(field) or 0) for field in FRAME_FIELDS] for pf in pfs])
+        x.append([pos.get("x") for pos in positions])
+        y.append([pos.get("y") for pos in positions])
+
+    frame_count, player_count = len(frames), len(pids)
+    present = np.array(present, dtype=bool).reshape(frame_count, player_count)
+    values = np.array(values, dtype=np.int64).reshape(frame_count, player_count, len(FRAME_FIELDS))
+    x = np.array(x, dtype=float).reshape(frame_count, player_count)
+    y = np.array(y, dtype=float).reshape(frame_count, player_count)
+
+    # Per-frame enemy averages of gold, xp and total cs for every participant at once
+    teams = np.array([team_of[pid] or 0 for pid in pids])
+    enemies = (teams[:, None] != teams[None, :]) & (teams[:, None] != 0) & (teams[None, :] != 0)
+    weights = (present[:, None, :] & enemies[None, :, :]).astype(np.int64)  # (frames, player, other)
+    tracked = np.stack([values[..., 0], values[..., 1], values[..., 2] + values[..., 3]], axis=-1)
+    enemy_count = weights.sum(axis=2)
+    enemy_total = np.einsum("fpo,fok->fpk", weights, tracked)
+    enemy_avg = enemy_total // np.maximum(enemy_count, 1)[..., None]
+    diffs = np.where(enemy_count[..., None] > 0, tracked - enemy_avg, 0)
+
+    timestamps = [frame.get("timestamp", 0) for frame in frames]
+    values, diffs = values.tolist(), diffs.tolist()
+    x = np.where(np.isnan(x), None, x).tolist()
+    y = np.where(np.isnan(y), None, y).tolist()
+    rows = []
+    for f, p in zip(*np.nonzero(present)):
+        f, p = int(f), int(p)
+        gold, xp, cs, jungle_cs, level, cc_time = values[f][p]
+        gold_diff, xp_diff, cs_diff = diffs[f][p]
+        rows.append({
+            "match_id": match_id, "puuid": puuids[p], "frame_index": f, "timestamp": timestamps[f],
+            "gold": gold, "xp": xp, "cs": cs, "jungle_cs": jungle_cs, "level": level, "cc_time": cc_time,
+            "position_x": x[f][p], "position_y": y[f][p],
+            "gold_diff": gold_diff, "xp_diff": xp_diff, "cs_diff": cs_diff,
+        })
+    return rows
+
+
+def event_rows(timeline, match_participants, match_id):
+    """
+    Return match_events rows for kills and objectives, attributed to the killer.
+
+    Champion names come from the match payload's participants (None when it isn't
+    available); events without a participant killer (executes, minions) are skipped.
+    """
+    info = timeline.get("info", {})
+    puuid_of = {p["participantId"]: p["puuid"] for p in info.get("participants", [])}
+    champion_of = {p.get("puuid"): p.get("championName") for p in match_participants}
+
+    def champion(pid):
+        return champion_of.get(puuid_of.get(pid))
+
+    rows = []
+    for frame in info.get("frames", []):
+        for event in frame.get("events", []):
+            event_type = event.get("type")
+            killer = event.get("killerId")
+            if event_type not in STORED_EVENT_TYPES or killer not in puuid_of:
+                continue
+            pos = event.get("position") or {}
+            rows.append({
+                "match_id": match_id,
+                "puuid": puuid_of[killer],
+                "timestamp": event.get("timestamp", frame.get("timestamp", 0)),
+                "event_type": event_type,
+                "killer_champion": champion(killer),
+                "victim_champion": champion(event.get("victimId")) if event_type == "CHAMPION_KILL" else None,
+                "assisting_champions": [champion(pid) for pid in event.get("assistingParticipantIds") or []],
+                "objective_type": event.get("monsterType") or event.get("buildingType"),
+                "position_x": pos.get("x"),
+                "position_y": pos.get("y"),
+            })
+    return rows
+
+
+def summarize_timeline_payload(raw_timeline, puuid, raw_match=None, match_id=None, duration=None):
+    """
+    Parse raw timeline (and optional match) JSON bytes and summarize them for `puuid`.
+
+    Module-level and bytes-in/dict-out so it can run in a ProcessPoolExecutor worker:
+    parsing hundreds of KB of JSON is the expensive part and happens off the event loop.
+    """
+    return process_timeline_payload(raw_timeline, puuid, raw_match, match_id, duration, with_rows=False)["summary"]
+
+
+def process_timeline_payload(raw_timeline, puuid, raw_match=None, match_id=None, duration=None, with_rows=True):
+    """
+    Parse raw timeline (and optional match) JSON bytes into everything stored for a match:
+    {"summary": summary dict or None, "frames": match_timeline rows, "events": match_events rows}.
+
+    Module-level and bytes-in/dicts-out so it can run in a ProcessPoolExecutor worker.
+    """
+    timeline = json.loads(raw_timeline)
+    match_participants = json.loads(raw_match).get("info", {}).get("participants", []) if raw_match else []
+    participants_meta = timeline.get("info", {}).get("participants", [])
+    participants = participant_teams(match_participants, participants_meta)
+    summary = summarize_timeline(timeline, puuid, participants, match_id=match_id, duration=duration)
+    if summary is None or not with_rows:
+        return {"summary": summary, "frames": [], "events": []}
+    return {
+        "summary": summary,
+        "frames": frame_rows(timeline, participants, match_id),
+        "events": event_rows(timeline, match_participants, match_id),
+    }
+
+
+def summarize_stored_timelines(store, puuid):
+    """
+    Yield summaries for every stored timeline `puuid` appears in.
+
+    Team membership comes from the matching stored match payload; timelines whose
+    match payload was never saved are skipped.
+    """
+    timeline_root = os.path.join(store.root, "timeline")
+    for shard, _, files in os.walk(timeline_root):
+        for name in sorted(files):
+            if not name.endswith(".json.gz"):
+                continue
+            match_id = name[:-len(".json.gz")]
+            raw_match = store.load("match", match_id)
+            raw_timeline = store.load("timeline", match_id)
+            if raw_match is None or raw_timeline is None:
+                continue
+            match_info = json.loads(raw_match).get("info", {})
+            if not any(p.get("puuid") == puuid for p in match_info.get("participants", [])):
+                continue
+            summary = summarize_timeline_payload(
+                raw_timeline, puuid, raw_match,
+                match_id=match_id, duration=match_info.get("gameDuration"),
+            )
+            if summary:
+                yield summary
+
+
+if __name__ == "__main__":
+    from payload_store import PayloadStore
+
+    if len(sys.argv) != 3:
+        sys.exit("usage: python timeline_features.py <payload_cache_dir> <puuid>")
+    for row in summarize_stored_timelines(PayloadStore(sys.argv[1]), sys.argv[2]):
+        print(json.dumps(row))
@@ -0,0 +1,48 @@
+"""Small thread-safe TTL + LRU cache for hot lookups shared by every request thread."""
+import threading
+import time
+from collections import OrderedDict
+
+MISSING = object()  # get() default, so a cached None (e.g. a remembered 404) can be told apart from a miss
+
+
+class TTLCache:
+    """
+    Maps keys to values that expire `ttl` seconds after being set (set() can use a
+    shorter ttl, e.g. for negative entries). Holds at most `maxsize` entries and
+    evicts the least recently used one first.
+    """
+
+    def __init__(self, maxsize=10000, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=MISSING):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at <= now:
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
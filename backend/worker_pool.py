@@ -0,0 +1,93 @@
+"""Bounded asyncio worker pool used to fan out per-match Riot fetches."""
+import asyncio
+import time
+
+
+class WorkerPool:
+    """
+    Runs `handler(item)` for every submitted item on a fixed number of workers.
+
+    Items can be submitted while the pool is already running (e.g. as ID pages
+    arrive), so one slow or rate-limited match only occupies one worker instead
+    of stalling a whole batch. Pacing comes from the shared Riot rate limiter,
+    not from sleeps here.
+
+        async with WorkerPool(fetch, 15, label="match details") as pool:
+            for mid in ids:
+                pool.submit(mid)
+        results = pool.results
+    """
+
+    def __init__(self, handler, workers, label="matches", report_every=25):
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.label = label
+        self.report_every = report_every
+
+        self.results = []
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.started_at = None
+        self.finished_at = None
+
+        self._queue = asyncio.Queue()
+        self._tasks = []
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def submit(self, item):
+        self.submitted += 1
+        self._queue.put_nowait(item)
+
+    async def close(self):
+        """Wait for every submitted item to finish, then stop the workers."""
+        for _ in self._tasks:
+            self._queue.put_nowait(None)
+        await asyncio.gather(*self._tasks)
+        self.finished_at = time.perf_counter()
+        print(f"[POOL] {self.summary()}")
+
+    @property
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    @property
+    def rate(self):
+        """Completed items per second since the pool started."""
+        return self.completed / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self):
+        return (
+            f"{self.completed}/{self.submitted} {self.label} in {self.elapsed:.1f}s "
+            f"({self.rate:.2f} matches/sec, {self.failed} failed)"
+        )
+
+    async def _worker(self):
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            try:
+                result = await self.handler(item)
+            except Exception as e:
+                print(f"[POOL] {self.label}: {item} failed: {e}")
+                result = None
+            self.completed += 1
+            if result is None:
+                self.failed += 1
+            else:
+                self.results.append(result)
+            if self.completed % self.report_every == 0 and self.completed < self.submitted:
+                print(f"[POOL] {self.summary()}")